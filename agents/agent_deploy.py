@@ -1,6 +1,5 @@
-from crewai import Agent, Task
 import subprocess
-from langchain.tools import tool
+from langchain_core.tools import tool
 
 
 import time
@@ -12,11 +11,7 @@ def run_command(command):
         stderr=subprocess.PIPE
     )
     stdout, stderr = process.communicate()
-    return stdout.decode(), stderr.decode()
-
-# Generate commit message with timestamp
-timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-commit_message = f"deploy: run at {timestamp}"
+    return stdout.decode(), stderr.decode(), process.returncode
 
 @tool
 def deploy_dashboard(file_path: str) -> str:
@@ -26,30 +21,37 @@ def deploy_dashboard(file_path: str) -> str:
         str: STATUS
     """
     try:
+        # Generate commit message with timestamp
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        commit_message = f"deploy: run at {timestamp}"
+
         # Start Streamlit in background
         # 1. git add .
         print("Running: git add .")
-        out, err = run_command(["git", "add", "."])
+        out, err, _ = run_command(["git", "add", "."])
         print("ADD STDOUT:", out)
         print("ADD STDERR:", err)
 
         # 2. git commit -m "deploy: run at ..."
         print(f"Running: git commit -m \"{commit_message}\"")
-        out, err = run_command(["git", "commit", "-m", commit_message])
+        out, err, _ = run_command(["git", "commit", "-m", commit_message])
         print("COMMIT STDOUT:", out)
         print("COMMIT STDERR:", err)
 
         # 3. git push
         print("Running: git push")
-        out, err = run_command(["git", "push"])
+        out, err, code = run_command(["git", "push"])
         print("PUSH STDOUT:", out)
         print("PUSH STDERR:", err)
+        if code != 0:
+            return f"❌ Error deploying dashboard: git push exited with {code}: {err.strip()}"
 
         # Open ngrok tunnel
         # public_url = ngrok.connect(8501, bind_tls=True)
 
         print("✅ Website deployed successfully!")
-        
+        return "✅ Website deployed successfully!"
+
 
     except Exception as e:
         return f"❌ Error deploying dashboard: {e}"
@@ -1,7 +1,6 @@
-from crewai import Agent, Task
-import subprocess
+import json
 
-from langchain.tools import tool
+from langchain_core.tools import tool
 
 @tool
 def generate_insights(file_path: str) -> str:
@@ -14,11 +13,9 @@ def generate_insights(file_path: str) -> str:
         str: STRING of FUNC
     """
     try:
-        result = subprocess.run(
-            ["python", "gen_insights_force.py", file_path],
-            capture_output=True, text=True
-        )
-        return result.stdout if result.stdout else "No insights generated."
+        # In-process pack build (see pipeline.py); the pack covers the whole table.
+        from pipeline import get_pipeline
+        pack = get_pipeline().insights()
+        return json.dumps(pack, default=str)
     except Exception as e:
         return f"Error generating insights: {e}"
-
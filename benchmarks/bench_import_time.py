@@ -0,0 +1,154 @@
+# benchmarks/bench_import_time.py
+"""
+Cold-start import time of each entry point, from `python -X importtime`, in
+a fresh interpreter per run. Fails (exit 1) when an entry point
+
+  - imports a module it must defer (DEFERRED: dask for small-file loads,
+    the LLM / agent stack for direct mode, mcp_monkdb, crewai), or
+  - takes longer than its budget in import_budget.json, plus --tolerance.
+
+    python benchmarks/bench_import_time.py                   # check
+    python benchmarks/bench_import_time.py --update-budget   # record this machine's times
+    python benchmarks/bench_import_time.py --module langchain_orch --top 15
+
+Budgets are machine-specific: record them on the machine (or CI runner) that
+runs the check.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "import_budget.json")
+
+# entry point -> modules (and their submodules) it must not import at startup
+DEFERRED = {
+    "csv_insertion_batch": ("dask", "mcp_monkdb"),
+    "gen_insights_force": ("mcp_monkdb", "dask", "duckdb"),
+    "query_client": ("mcp_monkdb", "duckdb"),
+    "pipeline": ("dask", "mcp_monkdb", "langchain", "langchain_core", "crewai"),
+    "langchain_orch": ("langchain_ollama", "langchain.agents", "crewai", "dask", "mcp_monkdb"),
+    "agents.agent_upload": ("crewai", "langchain", "dask"),
+    "agents.agent_insights": ("crewai", "langchain", "dask"),
+    "agents.agent_deploy": ("crewai", "langchain", "dask"),
+    "watchdog_": ("pandas", "dask", "langchain", "langchain_core"),
+}
+SLACK_MS = 25.0  # absolute allowance on top of --tolerance, for timer noise on fast imports
+
+
+def parse_importtime(stderr: str) -> list:
+    """[(depth, module, self_us, cumulative_us)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|", 2)
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        raw = parts[2].rstrip()
+        depth = (len(raw) - len(raw.lstrip()) - 1) // 2
+        rows.append((depth, raw.strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+def measure(code: str) -> dict:
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=REPO, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    rows = parse_importtime(proc.stderr)
+    error = None
+    if proc.returncode:
+        tail = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        error = tail[-1] if tail else f"exit code {proc.returncode}"
+    return {"rows": rows, "wall_ms": wall * 1000, "error": error}
+
+
+def profile(module: str, startup: set) -> dict:
+    """Import time of `module` beyond interpreter startup, and the modules it pulled in."""
+    run = measure(f"import {module}")
+    fresh = [r for r in run["rows"] if r[1] not in startup]
+    roots = {}
+    for _, name, _, cum in fresh:
+        root = name.split(".")[0]
+        if name == root and root != module.split(".")[0]:
+            roots[root] = max(roots.get(root, 0), cum)
+    return {
+        "import_ms": sum(cum for depth, _, _, cum in fresh if depth == 0) / 1000,
+        "wall_ms": run["wall_ms"],
+        "modules": {name for _, name, _, _ in fresh},
+        "roots": roots,
+        "error": run["error"],
+    }
+
+
+def leaked(modules: set, deferred: tuple) -> list:
+    return sorted(d for d in deferred if any(m == d or m.startswith(d + ".") for m in modules))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Import-time budget for the pipeline entry points")
+    ap.add_argument("--module", action="append", help="entry point(s) to check (default: all in DEFERRED)")
+    ap.add_argument("--repeat", type=int, default=5, help="fresh interpreters per entry point (median)")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed fraction over budget")
+    ap.add_argument("--top", type=int, default=5, help="heaviest packages listed per entry point")
+    ap.add_argument("--budget-file", default=BUDGET_FILE)
+    ap.add_argument("--update-budget", action="store_true", help="write the measured medians as the budget")
+    args = ap.parse_args()
+
+    modules = args.module or list(DEFERRED)
+    startup = {name for _, name, _, _ in measure("pass")["rows"]}
+    try:
+        with open(args.budget_file, encoding="utf-8") as f:
+            budget = json.load(f)
+    except (OSError, ValueError):
+        budget = {}
+
+    failures, measured = [], {}
+    print(f"{'entry point':<24}{'import':>10}{'wall':>10}{'budget':>10}  heaviest packages")
+    for module in modules:
+        measure(f"import {module}")  # warm-up: bytecode caches
+        runs = [profile(module, startup) for _ in range(max(1, args.repeat))]
+        last = runs[-1]
+        if last["error"]:
+            failures.append(f"{module}: import failed: {last['error']}")
+            print(f"{module:<24}{'error':>10}")
+            continue
+        import_ms = statistics.median(r["import_ms"] for r in runs)
+        wall_ms = statistics.median(r["wall_ms"] for r in runs)
+        measured[module] = round(import_ms, 1)
+
+        limit = budget.get(module)
+        heavy = sorted(last["roots"].items(), key=lambda kv: -kv[1])[:args.top]
+        print(f"{module:<24}{import_ms:>8.0f}ms{wall_ms:>8.0f}ms"
+              f"{(f'{limit:.0f}ms' if limit else 'n/a'):>10}  "
+              + ", ".join(f"{name} {us / 1000:.0f}ms" for name, us in heavy))
+
+        for name in leaked(last["modules"], DEFERRED.get(module, ())):
+            failures.append(f"{module}: imports {name} at startup (must be deferred)")
+        if limit and not args.update_budget and import_ms > limit * (1 + args.tolerance) + SLACK_MS:
+            failures.append(f"{module}: {import_ms:.0f}ms over its {limit:.0f}ms budget "
+                            f"(+{args.tolerance:.0%} tolerance)")
+
+    if args.update_budget:
+        budget.update(measured)
+        with open(args.budget_file, "w", encoding="utf-8") as f:
+            json.dump(budget, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n📝 Budget for {len(measured)} entry points written to {args.budget_file}")
+    elif not budget:
+        print(f"\nNo budget at {args.budget_file}; only deferred imports were checked "
+              f"(record one with --update-budget).")
+
+    if failures:
+        print("\n❌ Startup regressions:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\n✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
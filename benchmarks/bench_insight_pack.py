@@ -0,0 +1,63 @@
+# benchmarks/bench_insight_pack.py
+"""
+Insight-pack latency against MonkDB for each gen_insights_force query plan,
+run serially and with the concurrent executor.
+
+    python benchmarks/bench_insight_pack.py --repeat 10 \
+        --filters-json '{"brands": ["Puma"], "min_discount": 20}'
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import gen_insights_force as g  # noqa: E402
+import query_client  # noqa: E402
+
+
+def _query_count() -> int:
+    return sum(s["count"] for s in query_client.metrics_json()["queries"].values())
+
+
+def run_once(plan: str, filters: dict, max_workers: int):
+    where_no_rating = g.build_where(filters, include_rating=False)
+    where_with_rating = g.build_where(filters, include_rating=True)
+    top_limit = int(filters.get("top_limit", 10))
+    before = _query_count()
+    t0 = time.perf_counter()
+    pack = g.run_plan(plan, where_no_rating, where_with_rating, top_limit, max_workers=max_workers)
+    return time.perf_counter() - t0, _query_count() - before, pack
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--filters-json", default="{}")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--max-concurrency", type=int, default=g.MAX_CONCURRENT_QUERIES)
+    args = ap.parse_args()
+    filters = json.loads(args.filters_json)
+
+    packs = {}
+    runs = [(plan, workers) for plan in ("separate", "combined") for workers in (1, args.max_concurrency)]
+    for plan, workers in runs:
+        run_once(plan, filters, workers)  # warm-up
+        times = []
+        for _ in range(args.repeat):
+            secs, n_queries, packs[plan] = run_once(plan, filters, workers)
+            times.append(secs)
+        times.sort()
+        p95 = times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))]
+        print(f"{plan:<9} x{workers:<2} queries={n_queries}  median={statistics.median(times)*1000:8.1f} ms"
+              f"  p95={p95*1000:8.1f} ms  min={times[0]*1000:8.1f} ms")
+
+    ks, kc = packs["separate"][0], packs["combined"][0]
+    for key in ("products", "no_discount_items", "avg_price", "avg_mrp", "avg_discount_pct"):
+        if abs(g.sf(ks.get(key)) - g.sf(kc.get(key))) > 0.01:
+            print(f"⚠️ KPI mismatch on {key}: separate={ks.get(key)} combined={kc.get(key)}")
+
+
+if __name__ == "__main__":
+    main()
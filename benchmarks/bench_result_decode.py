@@ -0,0 +1,83 @@
+# benchmarks/bench_result_decode.py
+"""
+Result deserialization cost per query: list-of-dicts -> DataFrame versus the
+columnar (Arrow) path of query_backend.select_df, on the configured backend.
+
+    MONK_QUERY_BACKEND=duckdb python benchmarks/bench_result_decode.py --repeat 20
+    MONK_QUERY_BACKEND=monkdb python benchmarks/bench_result_decode.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import query_backend as qb  # noqa: E402
+import sampling  # noqa: E402
+
+QUERIES = {
+    "top_discounted_rated_1000": """
+        SELECT product_id, title, brand, price, mrp, discount_percent, rating, rating_total
+        FROM trent.products
+        WHERE rating_total > 0
+        ORDER BY discount_percent DESC, price ASC
+        LIMIT 1000
+    """,
+    "sample_price_vs_mrp_1000": f"""
+        SELECT product_id, brand, price, mrp, discount_percent
+        FROM trent.products
+        WHERE price IS NOT NULL AND mrp IS NOT NULL
+        ORDER BY {sampling.hash_sql()}
+        LIMIT 1000
+    """,
+    "brand_metrics": """
+        SELECT brand, COUNT(*) AS items, AVG(price) AS avg_price, AVG(discount_percent) AS avg_discount_percent
+        FROM trent.products
+        GROUP BY brand
+    """,
+}
+
+
+def dict_path(sql: str, backend: str):
+    t0 = time.perf_counter()
+    res = qb.run_select_query(sql, backend)
+    if isinstance(res, dict) and res.get("status") == "error":
+        raise RuntimeError(res["message"])
+    t1 = time.perf_counter()
+    df = pd.DataFrame(res or [])
+    return df, t1 - t0, time.perf_counter() - t1
+
+
+def columnar_path(name: str, sql: str, backend: str):
+    before = qb.decode_stats().get(name, {"fetch_secs": 0.0, "decode_secs": 0.0})
+    df = qb.select_df(sql, name=name, backend=backend)
+    after = qb.decode_stats()[name]
+    return df, after["fetch_secs"] - before["fetch_secs"], after["decode_secs"] - before["decode_secs"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--backend", default=qb.QUERY_BACKEND)
+    args = ap.parse_args()
+
+    print(f"backend={args.backend}  repeat={args.repeat}")
+    for name, sql in QUERIES.items():
+        for label, run in (("dicts", lambda: dict_path(sql, args.backend)),
+                           ("columnar", lambda: columnar_path(name, sql, args.backend))):
+            run()  # warm-up
+            fetch, decode = [], []
+            for _ in range(args.repeat):
+                df, f, d = run()
+                fetch.append(f)
+                decode.append(d)
+            print(f"{name:<28} {label:<8} rows={len(df):<6} cols={df.shape[1]:<3}"
+                  f" fetch={statistics.median(fetch)*1000:8.2f} ms"
+                  f" decode={statistics.median(decode)*1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
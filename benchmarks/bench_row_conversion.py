@@ -0,0 +1,106 @@
+# benchmarks/bench_row_conversion.py
+"""
+Rows/sec of the partition -> executemany tuple conversion, per-row
+(iterrows + _as_*) vs columnar (_partition_to_rows). No DB writes.
+
+    python benchmarks/bench_row_conversion.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import csv_insertion_batch as cib  # noqa: E402
+
+
+def make_products_csv(path: str, n_rows: int, seed: int = 7) -> None:
+    rng = np.random.default_rng(seed)
+    mrp = rng.integers(199, 9999, n_rows).astype(float)
+    disc = rng.integers(0, 80, n_rows)
+    price = np.round(mrp * (100 - disc) / 100.0, 2)
+    rating = np.round(rng.uniform(0, 5, n_rows), 1)
+    df = pd.DataFrame({
+        "product_id": np.arange(1, n_rows + 1),
+        "style_id": rng.integers(1, 10_000_000, n_rows),
+        "title": [f"Women Printed Kurta {i}" for i in range(n_rows)],
+        "brand": rng.choice(["Libas", "HERE&NOW", "Roadster", "Puma", "Nike", "W"], n_rows),
+        "price": price,
+        "mrp": mrp,
+        "discount_percent": disc,
+        "rating": rating,
+        "rating_total": rng.integers(0, 5000, n_rows),
+        "img_primary": [f"https://assets.example.com/{i}.jpg" for i in range(n_rows)],
+        "img_count": rng.integers(0, 8, n_rows),
+    })
+    # sprinkle missing / junk values like real dumps
+    df.loc[df.sample(frac=0.02, random_state=seed).index, "rating"] = np.nan
+    df.loc[df.sample(frac=0.01, random_state=seed + 1).index, "brand"] = np.nan
+    df.to_csv(path, index=False)
+
+
+def rows_iterrows(pdf: pd.DataFrame) -> list:
+    """The pre-columnar conversion loop from _ingest_partition."""
+    out = []
+    for _, row in pdf.iterrows():
+        out.append((
+            cib._as_int(row["product_id"]),
+            cib._as_int(row["style_id"]),
+            cib._as_str(row["title"]),
+            cib._as_str(row["brand"]),
+            cib._as_float(row["price"]),
+            cib._as_float(row["mrp"]),
+            cib._as_float(row["discount_percent"]),
+            cib._as_float(row["rating"]),
+            cib._as_int(row["rating_total"]),
+            cib._as_str(row["img_primary"]),
+            cib._as_int(row["img_count"]),
+        ))
+    return out
+
+
+def bench(fn, parts) -> float:
+    n = 0
+    t0 = time.perf_counter()
+    for pdf in parts:
+        n += len(fn(pdf))
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--partition-rows", type=int, default=250_000,
+                    help="rows per partition (~64MB block of a products dump)")
+    ap.add_argument("--csv", default=None, help="reuse an existing products CSV")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.csv or os.path.join(tmp, "products_synth.csv")
+        if not args.csv:
+            t0 = time.perf_counter()
+            make_products_csv(path, args.rows)
+            print(f"generated {args.rows:,} rows in {time.perf_counter()-t0:.1f}s -> {path}")
+
+        parts = list(pd.read_csv(path, dtype=str, chunksize=args.partition_rows))
+        total = sum(len(p) for p in parts)
+
+        # sanity: both paths must agree on the first partition
+        head = parts[0].head(1000)
+        assert rows_iterrows(head) == cib._partition_to_rows(head), "conversion mismatch"
+
+        before = bench(rows_iterrows, parts)
+        after = bench(cib._partition_to_rows, parts)
+
+    print(f"rows           : {total:,}")
+    print(f"iterrows (old) : {before:,.0f} rows/s")
+    print(f"columnar (new) : {after:,.0f} rows/s")
+    print(f"speedup        : {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
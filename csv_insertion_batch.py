@@ -1,14 +1,33 @@
 import os
+import argparse
 import math
 import sys
 import configparser
 import logging
+import itertools
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING
+import numpy as np
 import pandas as pd
-import dask.dataframe as dd
-from dask.distributed import Client, LocalCluster
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# dask / dask.distributed are imported in start_cluster() and ingest_dask():
+# streaming and Parquet loads never need them.
+if TYPE_CHECKING:
+    from dask.distributed import Client
 
 # ---- MonkDB client (your existing lib) ----
 from monkdb import client as monk_client
+from monk_pool import get_pool, pool_stats
+from ingest_checkpoint import CheckpointManifest, PartitionCheckpoint, file_hash
+from ingest_metrics import PartitionMetrics, Progress, RunMetrics
+from ingest_retry import DeadLetterFile, RetryPolicy, classify, insert_isolating
+from pack_cache import invalidate as invalidate_packs
+import rollups
+import sampling
 
 # ---------------- Logging ------------------
 LOG_FILE = "orchestrator.log"
@@ -38,15 +57,95 @@ TABLE_NAME = config["database"]["TABLE_NAME"]
 BLOCKSIZE = "64MB"
 N_WORKERS = min(os.cpu_count() or 4, 8)
 THREADS_PER_W = 2
-BATCH_SIZE = 5000
+
+# Adaptive executemany batching: start at BATCH_SIZE rows, then steer each
+# batch toward TARGET_BATCH_SECS of insert latency within [MIN, MAX] rows and
+# MAX_BATCH_BYTES of payload. Commits happen every COMMIT_EVERY_BATCHES
+# batches or COMMIT_EVERY_SECS seconds, whichever comes first.
+BATCH_SIZE = config.getint("ingest", "BATCH_SIZE", fallback=5000)
+MIN_BATCH_ROWS = config.getint("ingest", "MIN_BATCH_ROWS", fallback=500)
+MAX_BATCH_ROWS = config.getint("ingest", "MAX_BATCH_ROWS", fallback=50000)
+MAX_BATCH_BYTES = config.getint("ingest", "MAX_BATCH_BYTES", fallback=8 * 1024 * 1024)
+TARGET_BATCH_SECS = config.getfloat("ingest", "TARGET_BATCH_SECS", fallback=1.0)
+COMMIT_EVERY_BATCHES = config.getint("ingest", "COMMIT_EVERY_BATCHES", fallback=5)
+COMMIT_EVERY_SECS = config.getfloat("ingest", "COMMIT_EVERY_SECS", fallback=5.0)
+
+# Streaming mode (--stream): rows per parsed chunk, chunks buffered between
+# the parser and the writers, and number of writer threads/connections.
+# Resident data is bounded by (STREAM_QUEUE_DEPTH + STREAM_WRITERS + 1) chunks.
+STREAM_CHUNK_ROWS = 20000
+STREAM_QUEUE_DEPTH = 4
+STREAM_WRITERS = 2
+
+# Per-process connection pool shared by all partitions on a worker.
+POOL_SIZE = config.getint("ingest", "POOL_SIZE", fallback=4)
+POOL_HEALTH_CHECK_SECS = config.getfloat("ingest", "POOL_HEALTH_CHECK_SECS", fallback=30.0)
+
+# Typed Parquet copies of source CSVs (--parquet), one per file hash.
+PARQUET_DIR = os.path.join(CURRENT_DIR, config.get("ingest", "PARQUET_DIR", fallback="parquet_cache"))
+
+# Fold each fully committed partition into the local rollup store (rollups.py)
+# and the bottom-k sample reservoirs (sampling.py). Opt-in: seed the stores
+# first (`python rollups.py rebuild`, `python sampling.py rebuild`), since
+# readers ignore them until then, and the extra work is a large share of
+# client-side ingest time.
+MAINTAIN_ROLLUPS = config.getboolean("ingest", "MAINTAIN_ROLLUPS", fallback=False)
+MAINTAIN_SAMPLES = config.getboolean("ingest", "MAINTAIN_SAMPLES", fallback=False)
+MAINTAIN_AGGREGATES = MAINTAIN_ROLLUPS or MAINTAIN_SAMPLES
+
+# Resume manifest: one row per (file, partition layout, partition).
+CHECKPOINT_DB = os.path.join(
+    CURRENT_DIR, config.get("ingest", "CHECKPOINT_DB", fallback="checkpoints/ingest_manifest.sqlite")
+)
+
+# Per-run JSON summaries (see ingest_metrics.py); progress is logged every
+# PROGRESS_LOG_SECS when stderr is not a terminal.
+RUN_SUMMARY_DIR = os.path.join(
+    CURRENT_DIR, config.get("ingest", "RUN_SUMMARY_DIR", fallback="checkpoints/runs")
+)
+PROGRESS_LOG_SECS = config.getfloat("ingest", "PROGRESS_LOG_SECS", fallback=10.0)
+
+# Transient insert errors are retried RETRY_ATTEMPTS times with exponential
+# backoff (RETRY_BASE_SECS doubling, capped at RETRY_MAX_SECS, full jitter).
+# Rejected rows are isolated by bisection and written per partition under
+# DEAD_LETTER_DIR; more than MAX_REJECTED_ROWS in one partition stops it.
+RETRY_ATTEMPTS = config.getint("ingest", "RETRY_ATTEMPTS", fallback=5)
+RETRY_BASE_SECS = config.getfloat("ingest", "RETRY_BASE_SECS", fallback=0.5)
+RETRY_MAX_SECS = config.getfloat("ingest", "RETRY_MAX_SECS", fallback=30.0)
+DEAD_LETTER_DIR = os.path.join(
+    CURRENT_DIR, config.get("ingest", "DEAD_LETTER_DIR", fallback="checkpoints/dead_letter")
+)
+MAX_REJECTED_ROWS = config.getint("ingest", "MAX_REJECTED_ROWS", fallback=10000)
 # ------------------------------------------
 
+DSN = f"http://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}"
+
+# Target columns in INSERT order, with the caster applied to each.
+COLUMNS = [
+    ("product_id", "int"),
+    ("style_id", "int"),
+    ("title", "str"),
+    ("brand", "str"),
+    ("price", "float"),
+    ("mrp", "float"),
+    ("discount_percent", "float"),
+    ("rating", "float"),
+    ("rating_total", "int"),
+    ("img_primary", "str"),
+    ("img_count", "int"),
+]
+
 INSERT_SQL = f"""
 INSERT INTO {DB_SCHEMA}.{TABLE_NAME}
 (product_id, style_id, title, brand, price, mrp, discount_percent, rating, rating_total, img_primary, img_count)
 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
 """
 
+# --upsert: replayed rows overwrite instead of duplicating (product_id must be the PK).
+UPSERT_SQL = INSERT_SQL.rstrip() + """
+ON CONFLICT (product_id) DO UPDATE SET
+""" + ",\n".join(f"{c} = excluded.{c}" for c, _ in COLUMNS if c != "product_id") + "\n"
+
 # ---------------- Utils -------------------
 def _as_int(x):
     try:
@@ -73,83 +172,684 @@ def _as_str(x):
     except Exception:
         return None
 
+# ---------------- Columnar casters -------------------
+# Same semantics as _as_int/_as_float/_as_str above, applied to a whole
+# column at once. _parse_* return (values, valid-mask); the *_column
+# wrappers turn those into object ndarrays of Python scalars or None,
+# ready to be zipped into executemany tuples.
+# What int(str) accepts from ASCII text: sign, digits, single underscores
+# between digits. Non-ASCII text (other digit scripts) goes through int().
+_INT_TEXT = r"[+-]?[0-9]+(?:_[0-9]+)*"
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+def _parse_int(s: pd.Series):
+    # Parsed from the text, never through float64: exact past 2**53, and
+    # "3.0" / "1e3" stay invalid as they were for int(). Values outside
+    # BIGINT are invalid too.
+    txt = s.astype(object).where(s.notna(), "").astype(str).str.strip()
+    ok = txt.str.fullmatch(_INT_TEXT).to_numpy(dtype=bool, copy=True)
+    values = np.zeros(len(txt), dtype=np.int64)
+    digits = txt[ok].str.replace("_", "", regex=False)
+    short = (digits.str.lstrip("+-").str.lstrip("0").str.len() <= 18).to_numpy()
+    idx = np.flatnonzero(ok)
+    values[idx[short]] = digits[short].astype(np.int64).to_numpy()
+    rest = np.concatenate([idx[~short], np.flatnonzero(~ok & ~txt.str.isascii().to_numpy(dtype=bool))])
+    for i in rest:
+        try:
+            v = int(txt.iat[i])
+        except ValueError:
+            v = None
+        ok[i] = v is not None and _INT64_MIN <= v <= _INT64_MAX
+        values[i] = v if ok[i] else 0
+    return values, ok
+
+def _parse_float(s: pd.Series):
+    num = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    return num, ~np.isnan(num)
+
+def _parse_str(s: pd.Series):
+    present = s.notna()
+    txt = s.astype(object).where(present, "").astype(str)
+    ok = present.to_numpy() & (txt.str.lower() != "nan").to_numpy()
+    return txt.to_numpy(dtype=object), ok
+
+def _as_object(values: np.ndarray, ok: np.ndarray) -> np.ndarray:
+    out = np.full(len(values), None, dtype=object)
+    out[ok] = values[ok].tolist()
+    return out
+
+def _int_column(s: pd.Series) -> np.ndarray:
+    return _as_object(*_parse_int(s))
+
+def _float_column(s: pd.Series) -> np.ndarray:
+    return _as_object(*_parse_float(s))
+
+def _str_column(s: pd.Series) -> np.ndarray:
+    return _as_object(*_parse_str(s))
+
+_CASTERS = {"int": _int_column, "float": _float_column, "str": _str_column}
+_PARSERS = {"int": _parse_int, "float": _parse_float, "str": _parse_str}
+_ARROW_TYPES = {"int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+
+PRODUCTS_SCHEMA = pa.schema([(name, _ARROW_TYPES[kind]) for name, kind in COLUMNS])
+
+def _partition_to_rows(pdf: pd.DataFrame) -> list:
+    """Convert a partition into executemany parameter tuples, one column at a time."""
+    cols = []
+    for name, kind in COLUMNS:
+        if name in pdf.columns:
+            cols.append(_CASTERS[kind](pdf[name]))
+        else:
+            cols.append(np.full(len(pdf), None, dtype=object))
+    return list(zip(*cols))
+
+def _partition_to_batch(pdf: pd.DataFrame) -> pa.RecordBatch:
+    """Cast a string-typed partition to a PRODUCTS_SCHEMA record batch (bad values -> null)."""
+    arrays = []
+    for name, kind in COLUMNS:
+        if name in pdf.columns:
+            values, ok = _PARSERS[kind](pdf[name])
+            arrays.append(pa.array(values, type=_ARROW_TYPES[kind], mask=~ok))
+        else:
+            arrays.append(pa.nulls(len(pdf), type=_ARROW_TYPES[kind]))
+    return pa.RecordBatch.from_arrays(arrays, schema=PRODUCTS_SCHEMA)
+
+def _batch_to_rows(batch: pa.RecordBatch) -> list:
+    """executemany tuples straight from typed Arrow columns; no per-value casting."""
+    return list(zip(*(col.to_pylist() for col in batch.columns)))
+
 def _connect():
-    return monk_client.connect(
-        f"http://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}",
-        username=DB_USER
-    )
+    return monk_client.connect(DSN, username=DB_USER)
 
-# ---------------- Partition Insert -------------------
-def _ingest_partition(pdf: pd.DataFrame) -> pd.DataFrame:
-    if pdf.empty:
-        return pd.DataFrame({"rows_inserted": [0]})
+def _pool():
+    return get_pool(DSN, _connect, size=POOL_SIZE, check_after=POOL_HEALTH_CHECK_SECS)
+
+def _sum_pool_stats(per_process: list) -> dict:
+    totals = {"hits": 0, "misses": 0, "reconnects": 0, "discarded": 0}
+    for stats in per_process:
+        for s in stats.values():
+            for k in totals:
+                totals[k] += s.get(k, 0)
+    return totals
+
+# ---------------- Adaptive Batching -------------------
+_BYTES_SAMPLE_ROWS = 200
+
+def _estimate_bytes(batch: list) -> int:
+    """Approximate executemany payload size from a sample of rows."""
+    if not batch:
+        return 0
+    step = max(1, len(batch) // _BYTES_SAMPLE_ROWS)
+    sample = batch[::step]
+    size = sum(len(v) if isinstance(v, str) else 8 for row in sample for v in row)
+    return int(size * len(batch) / len(sample))
+
+class AdaptiveBatcher:
+    """
+    Picks the next executemany batch size from the latency and payload of the
+    previous ones: scale toward TARGET_BATCH_SECS at the observed rows/sec
+    (smoothed, at most 2x per step), capped by MAX_BATCH_BYTES.
+    """
+
+    def __init__(self, size: int = BATCH_SIZE, target_secs: float = TARGET_BATCH_SECS,
+                 min_rows: int = MIN_BATCH_ROWS, max_rows: int = MAX_BATCH_ROWS,
+                 max_bytes: int = MAX_BATCH_BYTES):
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.target_secs = target_secs
+        self.size = self._clamp(size)
+        self.row_bytes = None
 
-    needed = ["product_id", "style_id", "title", "brand", "price", "mrp",
-              "discount_percent", "rating", "rating_total", "img_primary", "img_count"]
-    for c in needed:
-        if c not in pdf.columns:
-            pdf[c] = None
+    def _clamp(self, n: float) -> int:
+        return int(max(self.min_rows, min(self.max_rows, n)))
 
-    batch = []
-    total = 0
-    conn = _connect()
-    cur = conn.cursor()
+    def observe(self, rows: int, nbytes: int, secs: float):
+        if rows <= 0:
+            return
+        self.row_bytes = nbytes / rows
+        ideal = rows / max(secs, 1e-3) * self.target_secs
+        ideal = min(max(ideal, self.size / 2), self.size * 2)
+        nxt = 0.5 * self.size + 0.5 * ideal
+        if self.row_bytes:
+            nxt = min(nxt, self.max_bytes / self.row_bytes)
+        self.size = self._clamp(nxt)
 
+# last size chosen in this process; seeds the batcher of the next partition
+_batch_hint = BATCH_SIZE
+
+# The per-batch line goes to INFO at most every PROGRESS_LOG_SECS per process
+# (DEBUG otherwise); every size chosen is also in the run summary's batch_rows.
+_last_batch_log = 0.0
+
+def _log_batch(msg: str):
+    global _last_batch_log
+    now = time.monotonic()
+    if now - _last_batch_log >= PROGRESS_LOG_SECS:
+        _last_batch_log = now
+        logger.info(msg)
+    else:
+        logger.debug(msg)
+
+# ---------------- Batch Insert -------------------
+def _rejected_rows(results, retried: bool = False) -> list:
+    """
+    Bulk executemany reports per-row failures as rowcount -2 instead of raising.
+    After a retry, a duplicate key means the earlier attempt got the row in.
+    """
+    if not isinstance(results, list):
+        return []
+    failed = []
+    for i, r in enumerate(results):
+        if isinstance(r, dict) and r.get("rowcount") == -2:
+            msg = r.get("error_message") or "rejected by bulk insert"
+            if retried and "DuplicateKey" in msg:
+                continue
+            failed.append((i, msg))
+    return failed
+
+def _insert_batches(conn, cur, rows: list, batcher: AdaptiveBatcher = None,
+                    sql: str = INSERT_SQL, checkpoint: PartitionCheckpoint = None,
+                    metrics: PartitionMetrics = None, dead_letter: DeadLetterFile = None,
+                    finish: bool = True):
+    """
+    executemany `rows` in adaptive slices; returns (rows inserted, finished).
+    Transient errors are retried with backoff; rows the database rejects go to
+    `dead_letter` (see ingest_retry.py) and the rest of their batch is still
+    inserted. `finished` is False when an error stopped the partition early.
+    Connection-level errors that outlast the retries are re-raised instead, so
+    the pool drops the connection (see _insert_pooled).
+    With a checkpoint, progress (inserted + rejected rows) is recorded after
+    every commit and the partition is marked done once all rows are handled
+    (finish=False leaves that to the caller, see _finish_partition).
+    Insert and commit times go to `metrics` when given.
+    """
+    global _batch_hint
+    batcher = batcher or AdaptiveBatcher(size=_batch_hint)
+    metrics = metrics or PartitionMetrics(part=-1)
+    first_row = checkpoint.resume_from if checkpoint else 0
+    policy = RetryPolicy(RETRY_ATTEMPTS, RETRY_BASE_SECS, RETRY_MAX_SECS)
+
+    def execute(batch, attempt):
+        return _rejected_rows(cur.executemany(sql, batch), retried=attempt > 0)
+
+    def reject(position, row, error):
+        metrics.rejected += 1
+        if dead_letter:
+            dead_letter.reject(position, row, error)
+        else:
+            logger.warning(f"⚠️ Row {position} rejected: {error}")
+
+    def on_retry():
+        metrics.retries += 1
+
+    handled = inserted = 0  # committed
+    handled_batches = 0
+    pending = pending_inserted = pending_batches = 0
+    last_commit = time.monotonic()
+    finished = False
     try:
-        for _, row in pdf.iterrows():
-            values = (
-                _as_int(row["product_id"]),
-                _as_int(row["style_id"]),
-                _as_str(row["title"]),
-                _as_str(row["brand"]),
-                _as_float(row["price"]),
-                _as_float(row["mrp"]),
-                _as_float(row["discount_percent"]),
-                _as_float(row["rating"]),
-                _as_int(row["rating_total"]),
-                _as_str(row["img_primary"]),
-                _as_int(row["img_count"]),
-            )
-            batch.append(values)
+        start = 0
+        while start < len(rows):
+            batch = rows[start:start + batcher.size]
+            nbytes = _estimate_bytes(batch)
+            t0 = time.monotonic()
+            ok = insert_isolating(execute, batch, policy, reject, first_row + start, on_retry)
+            secs = time.monotonic() - t0
+            metrics.batch(nbytes, secs, len(batch))
+            start += len(batch)
+            pending += len(batch)
+            pending_inserted += ok
+            pending_batches += 1
 
-            if len(batch) >= BATCH_SIZE:
-                cur.executemany(INSERT_SQL, batch)
+            if pending_batches >= COMMIT_EVERY_BATCHES or time.monotonic() - last_commit >= COMMIT_EVERY_SECS:
+                t0 = time.monotonic()
                 conn.commit()
-                total += len(batch)
-                logger.info(f"Inserted batch of {len(batch)} rows")
-                batch.clear()
+                metrics.add("commit", time.monotonic() - t0)
+                handled += pending
+                inserted += pending_inserted
+                handled_batches += pending_batches
+                pending = pending_inserted = pending_batches = 0
+                last_commit = time.monotonic()
+                if checkpoint:
+                    checkpoint.commit(handled, handled_batches)
 
-        if batch:
-            cur.executemany(INSERT_SQL, batch)
+            used = batcher.size
+            batcher.observe(len(batch), nbytes, secs)
+            _batch_hint = batcher.size
+            _log_batch(
+                f"Inserted {ok}/{len(batch)} rows ({nbytes / 1024:.0f} KB) in {secs:.2f}s "
+                f"→ {len(batch) / max(secs, 1e-3):,.0f} rows/s; batch size {used} → {batcher.size}"
+            )
+
+        if pending:
+            t0 = time.monotonic()
             conn.commit()
-            total += len(batch)
-            logger.info(f"Inserted final batch of {len(batch)} rows")
+            metrics.add("commit", time.monotonic() - t0)
+            handled += pending
+            inserted += pending_inserted
+            handled_batches += pending_batches
+        if checkpoint:
+            checkpoint.commit(handled, handled_batches, done=finish)
+        finished = True
 
     except Exception as e:
+        if classify(e) == "transient":
+            raise
+        metrics.errors += 1
         logger.error(f"❌ Error inserting partition: {e}", exc_info=True)
     finally:
+        metrics.rows += inserted
+    return inserted, finished
+
+def _insert_pooled(rows: list, metrics: PartitionMetrics, **kwargs):
+    """
+    _insert_batches on a pooled connection. A connection lost mid-partition
+    is discarded by the pool (the next partition gets a fresh one) and the
+    partition is left unfinished for the next run to resume; returns
+    (rows inserted, finished). Failing to connect at all raises.
+    """
+    conn = None
+    before = metrics.rows
+    try:
+        with _pool().connection() as conn:
+            cur = conn.cursor()
+            try:
+                return _insert_batches(conn, cur, rows, metrics=metrics, **kwargs)
+            finally:
+                _close_cursor(cur)
+    except Exception as e:
+        if conn is None:
+            raise
+        metrics.errors += 1
+        logger.error(f"❌ Connection failed in partition {metrics.part}, dropped from the pool: {e}",
+                     exc_info=True)
+        return metrics.rows - before, False
+
+def _close_cursor(cur):
+    try:
+        cur.close()
+    except Exception:
+        pass
+
+# ---------------- Rollups & samples -------------------
+_AGGREGATES = (
+    ("rollups", MAINTAIN_ROLLUPS, rollups.partition_rollup, lambda part, key: rollups.merge(part, key=key)),
+    ("samples", MAINTAIN_SAMPLES, sampling.partition_sample, lambda part, key: sampling.merge(part)),
+)
+
+def _count_rollups(csv_file_path: str, fhash: str, upsert: bool, fresh: bool) -> bool:
+    """
+    Whether this load can be added to the rollup store exactly. Upserts
+    overwrite rows the store already counted, and a --fresh replay of a file
+    it has seen would count it again: the store is marked dirty instead.
+    """
+    if not MAINTAIN_ROLLUPS:
+        return False
+    if upsert:
+        reason = f"--upsert load of {csv_file_path}"
+    elif fresh and fhash in rollups.merged_files():
+        reason = f"--fresh replay of {csv_file_path}"
+    else:
+        return True
+    rollups.mark_dirty(reason)
+    logger.warning(f"⚠️ Rollup store not updated ({reason}); readers query the table "
+                   f"until `python rollups.py rebuild`")
+    return False
+
+def _partition_aggregates(typed: pd.DataFrame, count_rollups: bool = True) -> dict:
+    parts = {}
+    for name, enabled, build, _ in _AGGREGATES:
+        if not enabled or (name == "rollups" and not count_rollups):
+            continue
         try:
-            cur.close()
-        except Exception:
-            pass
+            parts[name] = build(typed)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not aggregate partition for {name}: {e}")
+    return parts
+
+def _merge_aggregates(parts: dict, key: tuple = None) -> bool:
+    """
+    Fold one partition into the stores; False if any merge failed. A failure
+    never fails the load. `key` (fhash, layout, part) makes the rollup merge
+    happen at most once per partition; the sample merge is an idempotent upsert.
+    """
+    ok = True
+    for name, _, _, merge in _AGGREGATES:
+        if (parts or {}).get(name) is None:
+            continue
         try:
-            conn.close()
-        except Exception:
-            pass
+            merge(parts[name], key)
+        except Exception as e:
+            ok = False
+            logger.warning(f"⚠️ Could not update {name}: {e}")
+    return ok
+
+def _finish_partition(ckpt: PartitionCheckpoint, typed: pd.DataFrame, dead: DeadLetterFile,
+                      count_rollups: bool, metrics: PartitionMetrics):
+    """
+    Aggregate a fully inserted partition, then mark it done. If a merge fails
+    the partition stays unfinished: its rows are all committed, so the next
+    run inserts nothing and only retries the merge.
+    """
+    t0 = time.monotonic()
+    merged = _merge_aggregates(_partition_aggregates(_accepted(typed, dead), count_rollups),
+                               ckpt.key if ckpt else None)
+    metrics.add("aggregate", time.monotonic() - t0)
+    if not ckpt:
+        return
+    if merged:
+        ckpt.mark_done()
+    else:
+        logger.warning(f"⚠️ Partition {ckpt.key[2]} left unfinished: the next run retries its aggregates")
+
+def _accepted(typed: pd.DataFrame, dead_letter: DeadLetterFile = None) -> pd.DataFrame:
+    """Drop dead-lettered rows (by position in the partition) before aggregating."""
+    if dead_letter is None or not dead_letter.positions:
+        return typed
+    return typed[~np.isin(np.arange(len(typed)), list(dead_letter.positions))]
+
+# ---------------- Partition Insert -------------------
+def _dead_letter_path(csv_file_path: str, fhash: str, layout: str, part: int) -> str:
+    stem = os.path.splitext(os.path.basename(csv_file_path))[0]
+    return os.path.join(DEAD_LETTER_DIR, f"{stem}-{fhash[:12]}", f"{layout.replace(':', '-')}-{part:05d}.csv")
+
+def _dead_letter(path: str, ckpt: PartitionCheckpoint = None) -> DeadLetterFile:
+    # A partition starting from row 0 starts a fresh file; a resumed one keeps the earlier rejects.
+    return DeadLetterFile(path, [c for c, _ in COLUMNS], reset=not (ckpt and ckpt.resume_from),
+                          limit=MAX_REJECTED_ROWS)
+
+def _partition_result(metrics: PartitionMetrics) -> pd.DataFrame:
+    """One-row frame: rows_inserted plus the partition's metrics, for the client to aggregate."""
+    record = metrics.finish().to_dict()
+    return pd.DataFrame([{"rows_inserted": record["rows"], **record}])
+
+def _ingest_partition(pdf: pd.DataFrame, checkpoint: dict = None, upsert: bool = False,
+                      dead_letter: str = None, count_rollups: bool = True) -> pd.DataFrame:
+    ckpt = PartitionCheckpoint(**checkpoint) if checkpoint else None
+    dead = _dead_letter(dead_letter, ckpt) if dead_letter else None
+    metrics = PartitionMetrics(
+        part=checkpoint["part"] if checkpoint else -1,
+        source_bytes=checkpoint["offset_end"] - checkpoint["offset_start"] if checkpoint else 0,
+    )
+    if pdf.empty:
+        if ckpt:
+            ckpt.finish(0, 0)
+        return _partition_result(metrics)
+
+    t0 = time.monotonic()
+    rows = _partition_to_rows(pdf)
+    metrics.add("convert", time.monotonic() - t0)
+    if ckpt and ckpt.resume_from:
+        logger.info(f"↩️ Resuming partition {checkpoint['part']} after {ckpt.resume_from} committed rows")
+        rows = rows[ckpt.resume_from:]
+    _, finished = _insert_pooled(rows, metrics, sql=UPSERT_SQL if upsert else INSERT_SQL,
+                                 checkpoint=ckpt, dead_letter=dead, finish=not MAINTAIN_AGGREGATES)
+
+    # Counted once, when the whole partition is in (including rows from an earlier run).
+    if finished and MAINTAIN_AGGREGATES:
+        _finish_partition(ckpt, _partition_to_batch(pdf).to_pandas(), dead, count_rollups, metrics)
+
+    return _partition_result(metrics)
+
+# ---------------- Parquet Pre-stage -------------------
+def stage_parquet(csv_file_path: str, fhash: str = None) -> str:
+    """
+    Convert the CSV once into typed Parquet under PARQUET_DIR and return its path.
+    The file is keyed by the CSV hash, so re-ingests of an unchanged CSV reuse it.
+    """
+    fhash = fhash or file_hash(csv_file_path)
+    stem = os.path.splitext(os.path.basename(csv_file_path))[0]
+    out_path = os.path.join(PARQUET_DIR, f"{stem}-{fhash[:12]}.parquet")
+    if os.path.exists(out_path):
+        logger.info(f"📦 Reusing staged Parquet: {out_path}")
+        return out_path
+
+    os.makedirs(PARQUET_DIR, exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    rows = 0
+    with pq.ParquetWriter(tmp_path, PRODUCTS_SCHEMA, compression="zstd") as writer:
+        for pdf in _iter_csv_chunks(csv_file_path, STREAM_CHUNK_ROWS):
+            writer.write_batch(_partition_to_batch(pdf))
+            rows += len(pdf)
+    os.replace(tmp_path, out_path)
+    logger.info(f"📦 Staged {rows} rows as Parquet: {out_path}")
+    return out_path
+
+def _iter_parquet_chunks(parquet_path: str, chunk_rows: int):
+    """Yield record batches of at most `chunk_rows` rows from a memory-mapped Parquet file."""
+    pf = pq.ParquetFile(parquet_path, memory_map=True)
+    yield from pf.iter_batches(batch_size=chunk_rows)
 
-    return pd.DataFrame({"rows_inserted": [total]})
+# ---------------- Streaming Insert -------------------
+_STOP = object()
+
+def _iter_csv_chunks(csv_file_path: str, chunk_rows: int, offsets: list = None):
+    """
+    Yield the CSV as DataFrames of at most `chunk_rows` string-typed rows.
+    With `offsets`, the reader's byte position after each chunk is appended to
+    it (approximate: the parser reads ahead in blocks).
+    """
+    with open(csv_file_path, "rb") as fh:
+        reader = pd.read_csv(
+            fh,
+            dtype=str,
+            chunksize=chunk_rows,
+            encoding="utf-8",
+            on_bad_lines="skip",
+        )
+        with reader:
+            warned = False
+            for pdf in reader:
+                if not warned:
+                    for col, _ in COLUMNS:
+                        if col not in pdf.columns:
+                            logger.warning(f"⚠️ Column {col} missing in input. Filling with None.")
+                    warned = True
+                if offsets is not None:
+                    offsets.append(fh.tell())
+                yield pdf
+
+def _drain(chunks: queue.Queue):
+    """Consume (and drop) chunks up to this writer's _STOP, so the parser never blocks on a dead writer."""
+    while True:
+        item = chunks.get()
+        chunks.task_done()
+        if item is _STOP:
+            return
+
+def _stream_writer(chunks: queue.Queue, totals: list, sql: str,
+                   run: RunMetrics = None, progress: Progress = None, count_rollups: bool = True,
+                   errors: list = None):
+    """
+    Insert chunks until _STOP, each on a pooled connection. An error that
+    ends the writer (no database connection) goes to `errors`, and the writer
+    keeps draining the queue so the parser can finish; ingest_streaming
+    raises it.
+    """
+    inserted = 0
+    batcher = AdaptiveBatcher(size=_batch_hint)
+    stopped = False
+    try:
+        while True:
+            item = chunks.get()
+            try:
+                if item is _STOP:
+                    stopped = True
+                    return
+                rows, ckpt, typed, dead, metrics, units = item
+                n, finished = _insert_pooled(rows, metrics, batcher=batcher, sql=sql, checkpoint=ckpt,
+                                             dead_letter=dead, finish=typed is None)
+                inserted += n
+                if finished and typed is not None:
+                    _finish_partition(ckpt, typed, dead, count_rollups, metrics)
+                if run:
+                    run.add(metrics.finish().to_dict())
+                if progress:
+                    progress.update(units, n)
+            finally:
+                chunks.task_done()
+    except Exception as e:
+        logger.error(f"❌ Stream writer {threading.current_thread().name} stopped: {e}", exc_info=True)
+        if errors is not None:
+            errors.append(e)
+        if not stopped:
+            _drain(chunks)
+    finally:
+        totals.append(inserted)
+
+def ingest_streaming(csv_file_path: str,
+                     chunk_rows: int = STREAM_CHUNK_ROWS,
+                     queue_depth: int = STREAM_QUEUE_DEPTH,
+                     n_writers: int = STREAM_WRITERS,
+                     upsert: bool = False,
+                     fresh: bool = False,
+                     parquet: bool = False,
+                     run: RunMetrics = None) -> int:
+    """
+    Parse the CSV chunk by chunk on this thread while `n_writers` threads insert.
+    The bounded queue blocks the parser when writers fall behind, so memory stays
+    flat regardless of file size. Chunks finished by an earlier run are skipped
+    and a partially committed chunk resumes after its last commit.
+    With `parquet`, chunks come from the typed Parquet copy (see stage_parquet)
+    instead of re-parsing the CSV. Per-chunk metrics go to `run` and a progress
+    bar tracks bytes of the CSV (rows of the Parquet copy). Returns the number
+    of rows inserted; if a writer fails (e.g. no database connection) parsing
+    stops and its error is raised once the other writers are done.
+    """
+    fhash = file_hash(csv_file_path)
+    offsets = [0]
+    if parquet:
+        parquet_path = stage_parquet(csv_file_path, fhash)
+        source = _iter_parquet_chunks(parquet_path, chunk_rows)
+        to_rows = _batch_to_rows
+        to_typed = lambda batch: batch.to_pandas()
+        layout = f"parquet:{chunk_rows}"
+        progress = Progress(pq.ParquetFile(parquet_path).metadata.num_rows, log_every=PROGRESS_LOG_SECS)
+    else:
+        source = _iter_csv_chunks(csv_file_path, chunk_rows, offsets)
+        to_rows = _partition_to_rows
+        to_typed = lambda pdf: _partition_to_batch(pdf).to_pandas()
+        layout = f"stream:{chunk_rows}"
+        progress = Progress(os.path.getsize(csv_file_path), log_every=PROGRESS_LOG_SECS)
+    if run:
+        run.layout = layout
+    manifest = CheckpointManifest(CHECKPOINT_DB)
+    if fresh:
+        manifest.reset(fhash, layout)
+    state = manifest.load(fhash, layout)
+    run_id = manifest.start_run(fhash, layout, csv_file_path)
+
+    count_rollups = _count_rollups(csv_file_path, fhash, upsert, fresh)
+
+    chunks = queue.Queue(maxsize=queue_depth)
+    totals, errors = [], []
+    sql = UPSERT_SQL if upsert else INSERT_SQL
+    writers = [
+        threading.Thread(target=_stream_writer, args=(chunks, totals, sql, run, progress, count_rollups, errors),
+                         name=f"monk-writer-{i}", daemon=True)
+        for i in range(n_writers)
+    ]
+    for w in writers:
+        w.start()
+
+    skipped = 0
+    source = iter(source)
+    try:
+        for i in itertools.count():
+            if errors:
+                break  # a writer died: stop parsing, raise below
+            t0 = time.monotonic()
+            chunk = next(source, None)
+            parse_secs = time.monotonic() - t0
+            if chunk is None:
+                break
+            units = len(chunk) if parquet else offsets[-1] - offsets[-2]
+            if state.get(i, {}).get("done") or len(chunk) == 0:
+                skipped += len(chunk) > 0
+                progress.update(units)
+                continue
+            metrics = PartitionMetrics(part=i, source_bytes=0 if parquet else units)
+            metrics.add("parse", parse_secs)
+            t0 = time.monotonic()
+            ckpt = PartitionCheckpoint(CHECKPOINT_DB, fhash, layout, i, "rows",
+                                       i * chunk_rows, i * chunk_rows + len(chunk))
+            rows = to_rows(chunk)[ckpt.resume_from:]
+            typed = to_typed(chunk) if MAINTAIN_AGGREGATES else None
+            metrics.add("convert", time.monotonic() - t0)
+            dead = _dead_letter(_dead_letter_path(csv_file_path, fhash, layout, i), ckpt)
+            chunks.put((rows, ckpt, typed, dead, metrics, units))  # blocks when queue is full
+    finally:
+        for _ in writers:
+            chunks.put(_STOP)
+        for w in writers:
+            w.join()
+        progress.close()
+    if errors:
+        raise errors[0]
+
+    if run:
+        run.skipped = skipped
+    if skipped:
+        logger.info(f"⏭️ Skipped {skipped} chunks already loaded by an earlier run")
+    manifest.finish_run(run_id, sum(totals))
+    return sum(totals)
 
 # ---------------- Main -------------------
-def main(csv_file_path: str):
-    logger.info("🚀 Starting orchestrator")
+def _attach_parse_secs(run: RunMetrics, task_stream: list, read_keys: dict):
+    """
+    CSV parsing happens in Dask's read tasks, before _ingest_partition sees the
+    data; take their compute time from the scheduler's task stream.
+    """
+    parse = {}
+    for task in task_stream:
+        part = read_keys.get(str(task.get("key")))
+        if part is None:
+            continue
+        parse[part] = parse.get(part, 0.0) + sum(
+            ss["stop"] - ss["start"] for ss in task.get("startstops", ()) if ss.get("action") == "compute"
+        )
+    for record in run.parts:
+        record["parse_secs"] = round(parse.get(record["part"], 0.0), 6)
+
+def _finish_load(csv_file_path: str, total_inserted: int):
+    """
+    New rows make cached insight packs stale: bump the data version and drop
+    them. Stores this load did not maintain no longer match the table.
+    """
+    if total_inserted > 0:
+        v = invalidate_packs(file=os.path.abspath(csv_file_path), rows=total_inserted)
+        logger.info(f"🧹 Data version {v['version']}: insight pack cache invalidated")
+        if not MAINTAIN_ROLLUPS:
+            rollups.mark_dirty(f"{csv_file_path} loaded with MAINTAIN_ROLLUPS off")
+        if not MAINTAIN_SAMPLES:
+            sampling.mark_dirty(f"{csv_file_path} loaded with MAINTAIN_SAMPLES off")
+
+def _report_rejected(run: RunMetrics):
+    rejected = sum(r["rejected"] for r in run.parts)
+    if rejected:
+        logger.warning(f"☠️ {rejected} rejected rows written to dead-letter CSVs under {DEAD_LETTER_DIR}")
+
+def start_cluster(n_workers: int = N_WORKERS, threads_per_worker: int = THREADS_PER_W):
+    """Process-based LocalCluster and its Client; long-lived callers (pipeline.py) keep one around."""
+    from dask.distributed import Client, LocalCluster
+
     cluster = LocalCluster(
-        n_workers=N_WORKERS,
-        threads_per_worker=THREADS_PER_W,
+        n_workers=n_workers,
+        threads_per_worker=threads_per_worker,
         processes=True,
         dashboard_address=None,
     )
     client = Client(cluster)
-    logger.info(f"✅ Dask cluster up: {N_WORKERS} workers x {THREADS_PER_W} threads")
+    logger.info(f"✅ Dask cluster up: {n_workers} workers x {threads_per_worker} threads")
+    return cluster, client
+
+def ingest_dask(csv_file_path: str, client: "Client", upsert: bool = False, fresh: bool = False):
+    """Load the CSV as BLOCKSIZE partitions on `client`'s workers; returns (rows inserted, RunMetrics)."""
+    import dask
+    import dask.dataframe as dd
+    from dask.distributed import as_completed, get_task_stream
+    from dask.utils import parse_bytes
 
     ddf = dd.read_csv(
         csv_file_path,
@@ -161,32 +861,124 @@ def main(csv_file_path: str):
     )
     logger.info(f"📂 Loaded CSV: {csv_file_path} with {len(ddf.columns)} columns")
 
-    for col in ["product_id", "style_id", "title", "brand", "price", "mrp",
-                "discount_percent", "rating", "rating_total", "img_primary", "img_count"]:
+    for col, _ in COLUMNS:
         if col not in ddf.columns:
             ddf[col] = None
             logger.warning(f"⚠️ Column {col} missing in input. Filling with None.")
 
-    results = ddf.map_partitions(
-        _ingest_partition,
-        meta={"rows_inserted": "int64"}
-    ).compute()
+    # Partition i of dd.read_csv covers bytes [i*blocksize, (i+1)*blocksize).
+    fhash = file_hash(csv_file_path)
+    layout = f"dask:{BLOCKSIZE}"
+    manifest = CheckpointManifest(CHECKPOINT_DB)
+    if fresh:
+        manifest.reset(fhash, layout)
+    state = manifest.load(fhash, layout)
+    run_id = manifest.start_run(fhash, layout, csv_file_path)
+    block = parse_bytes(BLOCKSIZE)
+    size = os.path.getsize(csv_file_path)
+    count_rollups = _count_rollups(csv_file_path, fhash, upsert, fresh)
 
-    total_inserted = int(results["rows_inserted"].sum()) if not results.empty else 0
+    tasks = []
+    read_keys = {}
+    pending_bytes = 0
+    for i, part in enumerate(ddf.to_delayed()):
+        if state.get(i, {}).get("done"):
+            continue
+        ckpt = dict(db_path=CHECKPOINT_DB, fhash=fhash, layout=layout, part=i,
+                    offset_unit="bytes", offset_start=i * block,
+                    offset_end=min((i + 1) * block, size))
+        tasks.append(dask.delayed(_ingest_partition)(
+            part, checkpoint=ckpt, upsert=upsert,
+            dead_letter=_dead_letter_path(csv_file_path, fhash, layout, i),
+            count_rollups=count_rollups,
+        ))
+        read_keys[str(part.key)] = i
+        pending_bytes += ckpt["offset_end"] - ckpt["offset_start"]
+    skipped = ddf.npartitions - len(tasks)
+    if skipped:
+        logger.info(f"⏭️ Skipping {skipped}/{ddf.npartitions} partitions already loaded by an earlier run")
+
+    # Results stream back as partitions finish, so progress and metrics are
+    # aggregated here on the client while the workers keep going.
+    run = RunMetrics(csv_file_path, "dask", layout)
+    run.skipped = skipped
+    progress = Progress(pending_bytes, log_every=PROGRESS_LOG_SECS)
+    with get_task_stream(client=client) as task_stream:
+        for future in as_completed(client.compute(tasks)):
+            record = future.result().to_dict(orient="records")[0]
+            run.add(record)
+            progress.update(record["source_bytes"], record["rows_inserted"])
+            future.release()
+    progress.close()
+    _attach_parse_secs(run, task_stream.data, read_keys)
+
+    total_inserted = int(sum(r["rows_inserted"] for r in run.parts))
     logger.info(f"✅ Inserted {total_inserted} records into {DB_SCHEMA}.{TABLE_NAME}")
+    manifest.finish_run(run_id, total_inserted)
+    worker_pools = client.run(pool_stats)
+    logger.info(f"🔌 Connection pool across {len(worker_pools)} workers: "
+                f"{_sum_pool_stats(list(worker_pools.values()))}")
+    return total_inserted, run
+
+def main(csv_file_path: str, stream: bool = False, upsert: bool = False, fresh: bool = False,
+         parquet: bool = False, client: "Client" = None) -> dict:
+    """
+    Load one CSV and return its run summary (ingest_metrics.RunMetrics) with
+    rows_inserted and summary_path added. A running `client` is reused as is;
+    without one, a LocalCluster is started for this file and torn down after.
+    """
+    # Parquet chunks are already typed, so they always go through the streaming writers.
+    if stream or parquet:
+        logger.info("🚀 Starting orchestrator (streaming)")
+        logger.info(
+            f"📂 Streaming {'Parquet copy of ' if parquet else ''}CSV: {csv_file_path} in "
+            f"{STREAM_CHUNK_ROWS}-row chunks, queue depth {STREAM_QUEUE_DEPTH}, {STREAM_WRITERS} writers"
+        )
+        run = RunMetrics(csv_file_path, "parquet" if parquet else "stream", layout=None)
+        total_inserted = ingest_streaming(csv_file_path, upsert=upsert, fresh=fresh, parquet=parquet, run=run)
+        logger.info(f"✅ Inserted {total_inserted} records into {DB_SCHEMA}.{TABLE_NAME}")
+        logger.info(f"🔌 Connection pool: {_sum_pool_stats([pool_stats()])}")
+    else:
+        logger.info("🚀 Starting orchestrator")
+        cluster = None
+        if client is None:
+            cluster, client = start_cluster()
+        try:
+            total_inserted, run = ingest_dask(csv_file_path, client, upsert=upsert, fresh=fresh)
+        finally:
+            if cluster is not None:
+                client.close()
+                cluster.close()
 
-    client.close()
-    cluster.close()
+    summary = run.summary()
+    summary_path = run.write(RUN_SUMMARY_DIR, summary)
+    _report_rejected(run)
+    _finish_load(csv_file_path, total_inserted)
     logger.info("🏁 Orchestrator finished successfully")
+    return {**summary, "rows_inserted": total_inserted, "summary_path": summary_path}
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        logger.error("Usage: python orchestrator.py <csv_file_path>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Bulk-insert a products CSV into MonkDB")
+    parser.add_argument("csv_file_path", help="Path to the CSV file to load")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the file in fixed-size chunks instead of using Dask (bounded memory)")
+    parser.add_argument("--upsert", action="store_true",
+                        help="INSERT ... ON CONFLICT (product_id) DO UPDATE so replayed rows never duplicate")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore checkpoints from earlier runs of this file and load it from the start")
+    parser.add_argument("--parquet", action="store_true",
+                        help="Convert the CSV once to typed Parquet (reused on re-ingest) and load from it")
+    parser.add_argument("--stage-only", action="store_true",
+                        help="Only write the typed Parquet copy; do not load the database")
+    args = parser.parse_args()
 
-    csv_file = sys.argv[1]
+    csv_file = args.csv_file_path
     if not os.path.exists(csv_file):
         logger.error(f"❌ File not found: {csv_file}")
         sys.exit(1)
 
-    main(csv_file)
+    if args.stage_only:
+        stage_parquet(csv_file)
+        sys.exit(0)
+
+    main(csv_file, stream=args.stream, upsert=args.upsert, fresh=args.fresh, parquet=args.parquet)
@@ -0,0 +1,34 @@
+# data_version.py
+"""
+Local data-version marker for trent.products.
+
+csv_insertion_batch bumps the version after every load; caches and report
+outputs store the version they were computed against and treat anything
+older as stale.
+"""
+import json
+import os
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+VERSION_FILE = os.path.join(CURRENT_DIR, "analytics_out", "data_version.json")
+
+
+def current() -> dict:
+    """The latest load marker, or version 0 if nothing has been loaded through this checkout."""
+    try:
+        with open(VERSION_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"version": 0}
+
+
+def bump(**info) -> dict:
+    """Record a finished load; `info` (file, rows, ...) is stored alongside the new version."""
+    data = {"version": int(current().get("version", 0)) + 1, "loaded_at": time.time(), **info}
+    os.makedirs(os.path.dirname(VERSION_FILE), exist_ok=True)
+    tmp = VERSION_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, VERSION_FILE)
+    return data
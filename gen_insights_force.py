@@ -1,23 +1,30 @@
 # gen_insights_force.py
 import argparse
 import json
+import logging
 import math
 import sys
 from pathlib import Path
 from typing import Dict, Any
 
 import pandas as pd
-from mcp_monkdb.mcp_server import run_select_query
+import query_client
+
+import rollups
+
+from pack_cache import get_pack_cache, pack_key
+from query_exec import MAX_CONCURRENT_QUERIES, format_timings, run_all
 
 TABLE = "trent.products"
 
+logger = logging.getLogger(__name__)
+
 
-def q(sql: str) -> pd.DataFrame:
-    print(f"[DEBUG] SQL =>\n{sql}\n", flush=True)
-    res = run_select_query(sql)
-    if isinstance(res, dict) and res.get("status") == "error":
-        raise RuntimeError(res["message"])
-    return pd.DataFrame(res or [])
+def q(sql: str, name: str) -> pd.DataFrame:
+    # full SQL is logged at DEBUG level by query_client
+    df = query_client.query(sql, name)
+    logger.debug(f"query {name}: {len(df)} rows")
+    return df
 
 
 def _q(v: str) -> str:
@@ -130,7 +137,7 @@ def core_kpis(where_no_rating: str) -> dict:
           COALESCE(COUNT(*), 0)                           AS products
         FROM {TABLE}
         WHERE {where_no_rating}
-    """)
+    """, "core_kpis")
     if df.empty:
         return {
             "avg_price": 0,
@@ -139,7 +146,7 @@ def core_kpis(where_no_rating: str) -> dict:
             "no_discount_items": 0,
             "products": 0
         }
-    return df.iloc[0].to_dict()
+    return df.to_dict(orient="records")[0]
 
 
 def brand_concentration(where_no_rating: str) -> list:
@@ -159,7 +166,7 @@ def brand_concentration(where_no_rating: str) -> list:
         ) total
         ORDER BY t.items DESC
         LIMIT 10
-    """)
+    """, "brand_concentration")
     return df.to_dict(orient="records")
 
 
@@ -178,7 +185,7 @@ def discount_bands(where_no_rating: str) -> list:
         ) b
         GROUP BY band
         ORDER BY items DESC
-    """)
+    """, "discount_bands")
     return df.to_dict(orient="records")
 
 
@@ -190,10 +197,157 @@ def top_discounted_rated(where_with_rating: str, limit_n: int) -> list:
         WHERE {where_with_rating} AND rating_total > 0
         ORDER BY discount_percent DESC, price ASC
         LIMIT {limit_n}
-    """)
+    """, "top_discounted_rated")
     return df.to_dict(orient="records")
 
 
+# ------- combined plan: one grouped scan + top-N -------
+BAND_CASE = """CASE
+            WHEN discount_percent = 0 THEN '0%'
+            WHEN discount_percent < 20 THEN '0-20%'
+            WHEN discount_percent < 40 THEN '20-40%'
+            WHEN discount_percent < 60 THEN '40-60%'
+            ELSE '60%+'
+          END"""
+
+
+def brand_band_rollup(where_no_rating: str) -> pd.DataFrame:
+    """
+    One scan of the filtered table grouped by (brand, discount band), reduced
+    on the server to what core_kpis, brand_concentration and discount_bands
+    need: catalog totals on every row, per-brand and per-band item counts,
+    and only the rows of the top-10 brands plus one row per band (at most
+    ~55 rows, however many brands there are).
+    """
+    return q(f"""
+        SELECT brand, brand_items, brand_rank, band, band_items, band_rn,
+               products, n_price, sum_price, n_mrp, sum_mrp, n_disc, sum_disc, no_discount_items
+        FROM (
+          SELECT w.*, DENSE_RANK() OVER (ORDER BY w.brand_items DESC, w.brand) AS brand_rank
+          FROM (
+            SELECT g.brand, g.band,
+              SUM(g.items) OVER (PARTITION BY g.brand)               AS brand_items,
+              SUM(g.items) OVER (PARTITION BY g.band)                AS band_items,
+              ROW_NUMBER() OVER (PARTITION BY g.band ORDER BY g.brand) AS band_rn,
+              SUM(g.items) OVER ()                                   AS products,
+              SUM(g.n_price) OVER ()                                 AS n_price,
+              SUM(g.sum_price) OVER ()                               AS sum_price,
+              SUM(g.n_mrp) OVER ()                                   AS n_mrp,
+              SUM(g.sum_mrp) OVER ()                                 AS sum_mrp,
+              SUM(g.n_disc) OVER ()                                  AS n_disc,
+              SUM(g.sum_disc) OVER ()                                AS sum_disc,
+              SUM(g.no_discount_items) OVER ()                       AS no_discount_items
+            FROM (
+              SELECT brand,
+                {BAND_CASE} AS band,
+                COUNT(*)                                      AS items,
+                COUNT(price)                                  AS n_price,
+                SUM(price)                                    AS sum_price,
+                COUNT(mrp)                                    AS n_mrp,
+                SUM(mrp)                                      AS sum_mrp,
+                COUNT(discount_percent)                       AS n_disc,
+                SUM(discount_percent)                         AS sum_disc,
+                SUM(CASE WHEN price = mrp THEN 1 ELSE 0 END)  AS no_discount_items
+              FROM {TABLE}
+              WHERE {where_no_rating}
+              GROUP BY brand, band
+            ) g
+          ) w
+        ) r
+        WHERE brand_rank <= 10 OR band_rn = 1
+    """, "brand_band_rollup")
+
+
+def _avg(total, n) -> float:
+    return round(sf(total) / float(n), 2) if n else 0
+
+
+def split_rollup(r: pd.DataFrame):
+    """brand_band_rollup rows -> (kpis, brand_concentration, discount_bands), same shapes as the per-query path."""
+    if r.empty:
+        return ({"avg_price": 0, "avg_mrp": 0, "avg_discount_pct": 0,
+                 "no_discount_items": 0, "products": 0}, [], [])
+
+    num = ["brand_items", "brand_rank", "band_items", "band_rn", "products", "n_price", "sum_price",
+           "n_mrp", "sum_mrp", "n_disc", "sum_disc", "no_discount_items"]
+    r = r.copy()
+    r[num] = r[num].apply(pd.to_numeric, errors="coerce").fillna(0)
+    t = r.iloc[0]
+    products = int(t["products"])
+    k = {
+        "avg_price": _avg(t["sum_price"], t["n_price"]),
+        "avg_mrp": _avg(t["sum_mrp"], t["n_mrp"]),
+        "avg_discount_pct": _avg(t["sum_disc"], t["n_disc"]),
+        "no_discount_items": int(t["no_discount_items"]),
+        "products": products,
+    }
+
+    top = r[r["brand_rank"] <= 10].drop_duplicates("brand_rank").sort_values("brand_rank")
+    bc = [
+        {"brand": (None if pd.isna(b) else b), "items": int(n),
+         "share_pct": round(100.0 * int(n) / products, 2) if products else 0}
+        for b, n in zip(top["brand"], top["brand_items"])
+    ]
+
+    bands = (r[r["band_rn"] == 1].sort_values("band")
+             .sort_values("band_items", ascending=False, kind="stable"))
+    db = [{"band": b, "items": int(n)} for b, n in zip(bands["band"], bands["band_items"])]
+    return k, bc, db
+
+
+# ------- rollup plan: ingest-time aggregates (unfiltered packs only) -------
+def stored_rollup():
+    """(kpis, brand_concentration, discount_bands) from rollups.py, same shapes as split_rollup."""
+    kp = rollups.core_kpis()
+    if kp.empty:
+        return split_rollup(pd.DataFrame())
+    x = kp.iloc[0]
+    k = {
+        "avg_price": sf(x["avg_price"]),
+        "avg_mrp": sf(x["avg_mrp"]),
+        "avg_discount_pct": sf(x["avg_discount_pct"]),
+        "no_discount_items": si(x["no_discount_items"]),
+        "products": si(x["products"]),
+    }
+    brands = rollups.grouped("brand", "brand").head(10)
+    bc = [{"brand": b, "items": int(n), "share_pct": float(p)}
+          for b, n, p in zip(brands["brand"], brands["items"], brands["share_pct"])]
+    bands = rollups.grouped("discount_band", "band")
+    db = [{"band": b, "items": int(n)} for b, n in zip(bands["band"], bands["items"])]
+    return k, bc, db
+
+
+def run_plan(plan: str, where_no_rating: str, where_with_rating: str, top_limit: int,
+             max_workers: int = MAX_CONCURRENT_QUERIES, timings: dict = None):
+    """
+    'separate': the four original queries (five filtered scans).
+    'combined': one grouped scan reduced server-side to ~55 rows, plus the top-N query.
+    'rollup': aggregates from the ingest-time rollups, only the top-N query hits
+              the table (valid only when where_no_rating is "1=1").
+    The queries are independent and run concurrently (max_workers=1 for serial);
+    per-query and wall-clock timings are written into `timings` if given.
+    """
+    top = ("top_discounted_rated", lambda: top_discounted_rated(where_with_rating, top_limit))
+    if plan == "rollup":
+        (td,), t = run_all([top], max_workers)
+        k, bc, db = stored_rollup()
+    elif plan == "combined":
+        calls = [("brand_band_rollup", lambda: brand_band_rollup(where_no_rating)), top]
+        (rollup, td), t = run_all(calls, max_workers)
+        k, bc, db = split_rollup(rollup)
+    else:
+        calls = [
+            ("core_kpis", lambda: core_kpis(where_no_rating)),
+            ("brand_concentration", lambda: brand_concentration(where_no_rating)),
+            ("discount_bands", lambda: discount_bands(where_no_rating)),
+            top,
+        ]
+        (k, bc, db, td), t = run_all(calls, max_workers)
+    if timings is not None:
+        timings.update(t)
+    return k, bc, db, td
+
+
 def bullets(k, brands, bands) -> list:
     out = []
     ap, am, ad = sf(k.get("avg_price")), sf(
@@ -223,36 +377,44 @@ def bullets(k, brands, bands) -> list:
     return out
 
 
-def main():
-    print(f"[DEBUG] running file: {__file__}", flush=True)
-    print(f"[DEBUG] python exe : {sys.executable}", flush=True)
-
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--out", default="analytics_out/insights_pack.json")
-    ap.add_argument("--filters-json", default="{}")
-    args = ap.parse_args()
-
-    filters = json.loads(args.filters_json or "{}")
+def generate_pack(filters: Dict[str, Any] = None, plan: str = "separate",
+                  max_concurrency: int = MAX_CONCURRENT_QUERIES, use_cache: bool = True) -> dict:
+    """Build (or fetch from the pack cache) the insight pack for `filters`."""
+    filters = filters or {}
+    cache = get_pack_cache() if use_cache else None
+    key = pack_key(filters)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            query_client.record_cache_hit("insight_pack")
+            logger.debug(f"pack cache hit {key[:12]} : {cache.stats()}")
+            return cached
 
     # WHEREs: no-rating for aggregates; with-rating for rated list
     where_no_rating = build_where(filters, include_rating=False)
     where_with_rating = build_where(filters, include_rating=True)
 
-    print(f"[DEBUG] where_no_rating   = {where_no_rating}", flush=True)
-    print(f"[DEBUG] where_with_rating = {where_with_rating}", flush=True)
+    logger.debug(f"where_no_rating   = {where_no_rating}")
+    logger.debug(f"where_with_rating = {where_with_rating}")
 
     # Optional: how many rows to show in the rated table
     top_limit = int(filters.get("top_limit", 10))
 
-    k = core_kpis(where_no_rating)
-    bc = brand_concentration(where_no_rating)
-    db = discount_bands(where_no_rating)
-    td = top_discounted_rated(where_with_rating, top_limit)
+    # Aggregates ignore rating filters, so any filter set that leaves them
+    # unfiltered can be answered from the ingest-time rollups, whichever plan.
+    if where_no_rating == "1=1" and rollups.use_rollups():
+        plan = "rollup"
+
+    timings = {}
+    k, bc, db, td = run_plan(plan, where_no_rating, where_with_rating, top_limit,
+                             max_workers=max_concurrency, timings=timings)
+    logger.debug(f"Query timings ({plan}, concurrency {max_concurrency}):\n"
+                 f"{format_timings(timings)}")
 
-    print(f"[DEBUG] KPIs dict                 : {k}", flush=True)
-    print(f"[DEBUG] Brand concentration rows  : {len(bc)}", flush=True)
-    print(f"[DEBUG] Discount bands rows       : {len(db)}", flush=True)
-    print(f"[DEBUG] Top discounted rated rows : {len(td)}", flush=True)
+    logger.debug(f"KPIs dict                 : {k}")
+    logger.debug(f"Brand concentration rows  : {len(bc)}")
+    logger.debug(f"Discount bands rows       : {len(db)}")
+    logger.debug(f"Top discounted rated rows : {len(td)}")
 
     pack = {
         "kpis": k,
@@ -263,6 +425,31 @@ def main():
         },
         "bullets": bullets(k, bc, db)
     }
+    if cache is not None:
+        cache.put(key, pack)
+    return pack
+
+
+def main(argv=None):
+    logger.debug(f"running file: {__file__}")
+    logger.debug(f"python exe : {sys.executable}")
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default="analytics_out/insights_pack.json")
+    ap.add_argument("--filters-json", default="{}")
+    # separate stays the default until bench_insight_pack.py shows combined
+    # winning against MonkDB (it did not on the local DuckDB backend).
+    ap.add_argument("--plan", choices=["combined", "separate"], default="separate",
+                    help="separate = one query per table; combined = one grouped scan + top-N")
+    ap.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENT_QUERIES,
+                    help="pack queries in flight at once (1 = run them one after another)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="skip the pack cache and always query MonkDB")
+    args = ap.parse_args(argv)
+
+    filters = json.loads(args.filters_json or "{}")
+    pack = generate_pack(filters, plan=args.plan, max_concurrency=args.max_concurrency,
+                         use_cache=not args.no_cache)
 
     # out_path = Path(args.out)
     # out_path.parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,173 @@
+# ingest_checkpoint.py
+"""
+SQLite checkpoint manifest for csv_insertion_batch.
+
+Each (file, layout, partition) row records where the partition sits in the
+source file, how many rows/batches have been committed and whether it is
+finished, so a rerun on the same file skips completed partitions and
+resumes the others from their last commit.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+_SAMPLE_BYTES = 1024 * 1024
+_SAMPLES = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS partitions (
+    file_hash         TEXT    NOT NULL,
+    layout            TEXT    NOT NULL,
+    part              INTEGER NOT NULL,
+    offset_unit       TEXT    NOT NULL,
+    offset_start      INTEGER,
+    offset_end        INTEGER,
+    rows_committed    INTEGER NOT NULL DEFAULT 0,
+    batches_committed INTEGER NOT NULL DEFAULT 0,
+    done              INTEGER NOT NULL DEFAULT 0,
+    updated_at        REAL    NOT NULL,
+    PRIMARY KEY (file_hash, layout, part)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    file_hash   TEXT NOT NULL,
+    layout      TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    rows        INTEGER
+);
+"""
+
+
+def file_hash(path: str) -> str:
+    """
+    SHA-256 over the file size plus evenly spaced 1MB samples (always including
+    the head and tail). Cheap on multi-GB dumps and changes whenever the file is
+    replaced, appended to or truncated.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        if size <= _SAMPLE_BYTES * _SAMPLES:
+            for block in iter(lambda: f.read(_SAMPLE_BYTES), b""):
+                h.update(block)
+        else:
+            span = size - _SAMPLE_BYTES
+            for i in range(_SAMPLES):
+                f.seek(span * i // (_SAMPLES - 1))
+                h.update(f.read(_SAMPLE_BYTES))
+    return h.hexdigest()
+
+
+class CheckpointManifest:
+    """Thin wrapper over the SQLite manifest; safe to open from several processes."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._conn() as db:
+            db.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    # ---------- partitions ----------
+    def load(self, fhash: str, layout: str) -> Dict[int, dict]:
+        with self._conn() as db:
+            db.row_factory = sqlite3.Row
+            rows = db.execute(
+                "SELECT * FROM partitions WHERE file_hash = ? AND layout = ?",
+                (fhash, layout),
+            ).fetchall()
+        return {r["part"]: dict(r) for r in rows}
+
+    def get(self, fhash: str, layout: str, part: int) -> Optional[dict]:
+        with self._conn() as db:
+            db.row_factory = sqlite3.Row
+            r = db.execute(
+                "SELECT * FROM partitions WHERE file_hash = ? AND layout = ? AND part = ?",
+                (fhash, layout, part),
+            ).fetchone()
+        return dict(r) if r else None
+
+    def record(self, fhash: str, layout: str, part: int, *, offset_unit: str,
+               offset_start: int, offset_end: int, rows_committed: int,
+               batches_committed: int, done: bool = False):
+        with self._conn() as db:
+            db.execute(
+                """
+                INSERT INTO partitions (file_hash, layout, part, offset_unit, offset_start, offset_end,
+                                        rows_committed, batches_committed, done, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (file_hash, layout, part) DO UPDATE SET
+                    offset_unit = excluded.offset_unit,
+                    offset_start = excluded.offset_start,
+                    offset_end = excluded.offset_end,
+                    rows_committed = excluded.rows_committed,
+                    batches_committed = excluded.batches_committed,
+                    done = excluded.done,
+                    updated_at = excluded.updated_at
+                """,
+                (fhash, layout, part, offset_unit, offset_start, offset_end,
+                 rows_committed, batches_committed, int(done), time.time()),
+            )
+
+    def reset(self, fhash: str, layout: str):
+        with self._conn() as db:
+            db.execute("DELETE FROM partitions WHERE file_hash = ? AND layout = ?", (fhash, layout))
+
+    # ---------- runs ----------
+    def start_run(self, fhash: str, layout: str, path: str) -> int:
+        with self._conn() as db:
+            cur = db.execute(
+                "INSERT INTO runs (file_hash, layout, path, size, started_at) VALUES (?, ?, ?, ?, ?)",
+                (fhash, layout, os.path.abspath(path), os.path.getsize(path), time.time()),
+            )
+            return cur.lastrowid
+
+    def finish_run(self, run_id: int, rows: int):
+        with self._conn() as db:
+            db.execute(
+                "UPDATE runs SET finished_at = ?, rows = ? WHERE rowid = ?",
+                (time.time(), rows, run_id),
+            )
+
+
+class PartitionCheckpoint:
+    """
+    Progress of one partition in the manifest. `resume_from` is the number of
+    rows already committed by an earlier run; `commit()` and `finish()` take
+    counts for this run only and store the running totals.
+    """
+
+    def __init__(self, db_path: str, fhash: str, layout: str, part: int,
+                 offset_unit: str, offset_start: int, offset_end: int):
+        self.manifest = CheckpointManifest(db_path)
+        self.key = (fhash, layout, part)
+        self.offsets = dict(offset_unit=offset_unit, offset_start=offset_start, offset_end=offset_end)
+        prev = self.manifest.get(fhash, layout, part) or {}
+        self.resume_from = int(prev.get("rows_committed", 0))
+        self.prev_batches = int(prev.get("batches_committed", 0))
+        self.already_done = bool(prev.get("done", 0))
+        self._last = (0, 0)
+
+    def commit(self, rows: int, batches: int, done: bool = False):
+        self._last = (rows, batches)
+        self.manifest.record(
+            *self.key, **self.offsets,
+            rows_committed=self.resume_from + rows,
+            batches_committed=self.prev_batches + batches,
+            done=done,
+        )
+
+    def finish(self, rows: int, batches: int):
+        self.commit(rows, batches, done=True)
+
+    def mark_done(self):
+        """finish() with the counts of the last commit()."""
+        self.commit(*self._last, done=True)
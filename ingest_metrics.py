@@ -0,0 +1,227 @@
+# ingest_metrics.py
+"""
+Throughput metrics and progress reporting for csv_insertion_batch.
+
+Each partition (Dask) or chunk (--stream) fills a PartitionMetrics with the
+time spent in each phase:
+
+  parse     CSV -> DataFrame (the Dask read task, or the chunked reader)
+  convert   DataFrame -> executemany tuples
+  aggregate rollup/sample partials and their merge into the local stores
+  insert    executemany round trips
+  commit    COMMIT round trips
+
+RunMetrics aggregates them on the client, Progress draws a live bar with an
+ETA, and RunMetrics.write() leaves a JSON run summary under RUN_SUMMARY_DIR.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("parse", "convert", "aggregate", "insert", "commit")
+
+
+class PartitionMetrics:
+    def __init__(self, part: int, source_bytes: int = 0):
+        self.part = part
+        self.source_bytes = source_bytes  # share of the input file (progress unit for CSV)
+        self.rows = 0  # committed
+        self.payload_bytes = 0  # estimated executemany payload sent
+        self.batches = 0
+        self.batch_rows = []  # (min, max, last) rows per executemany once a batch ran
+        self.retries = 0
+        self.rejected = 0  # dead-lettered
+        self.errors = 0
+        self.secs = dict.fromkeys(PHASES, 0.0)
+        self.started = time.time()
+        self.finished = None
+
+    def add(self, phase: str, secs: float):
+        self.secs[phase] += secs
+
+    def batch(self, nbytes: int, secs: float, rows: int = 0):
+        self.payload_bytes += nbytes
+        self.batches += 1
+        self.secs["insert"] += secs
+        if rows:
+            lo, hi, _ = self.batch_rows or (rows, rows, rows)
+            self.batch_rows = (min(lo, rows), max(hi, rows), rows)
+
+    def finish(self):
+        self.finished = time.time()
+        return self
+
+    def to_dict(self) -> dict:
+        wall = (self.finished or time.time()) - self.started
+        db = self.secs["insert"] + self.secs["commit"]
+        return {
+            "part": self.part,
+            "rows": self.rows,
+            "source_bytes": self.source_bytes,
+            "payload_bytes": self.payload_bytes,
+            "batches": self.batches,
+            "batch_rows_min": self.batch_rows[0] if self.batch_rows else None,
+            "batch_rows_max": self.batch_rows[1] if self.batch_rows else None,
+            "batch_rows_last": self.batch_rows[2] if self.batch_rows else None,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            **{f"{p}_secs": round(s, 6) for p, s in self.secs.items()},
+            "wall_secs": round(wall, 6),
+            "rows_per_sec": round(self.rows / db, 1) if db else None,
+            "bytes_per_sec": round(self.payload_bytes / db, 1) if db else None,
+        }
+
+
+class RunMetrics:
+    """Thread-safe sum of PartitionMetrics.to_dict() records for one load."""
+
+    def __init__(self, path: str, mode: str, layout: str):
+        self.path = path
+        self.mode = mode
+        self.layout = layout
+        self.started = time.time()
+        self.parts = []
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def add(self, record: dict):
+        with self._lock:
+            self.parts.append(record)
+
+    def summary(self) -> dict:
+        with self._lock:
+            parts = sorted(self.parts, key=lambda r: r["part"])
+        wall = time.time() - self.started
+        totals = {k: sum(r[k] for r in parts)
+                  for k in ("rows", "source_bytes", "payload_bytes", "batches", "retries", "rejected", "errors")}
+        phase_secs = {p: round(sum(r[f"{p}_secs"] for r in parts), 3) for p in PHASES}
+        busy = sum(phase_secs.values())
+        sized = [r for r in parts if r.get("batch_rows_last")]
+        return {
+            "file": self.path,
+            "mode": self.mode,
+            "layout": self.layout,
+            "started_at": self.started,
+            "wall_secs": round(wall, 3),
+            "partitions": len(parts),
+            "partitions_skipped": self.skipped,
+            **totals,
+            # adaptive executemany sizes chosen (see AdaptiveBatcher); final = last partition's
+            "batch_rows": {
+                "min": min(r["batch_rows_min"] for r in sized),
+                "max": max(r["batch_rows_max"] for r in sized),
+                "final": sized[-1]["batch_rows_last"],
+            } if sized else None,
+            "rows_per_sec": round(totals["rows"] / wall, 1) if wall else None,
+            "source_bytes_per_sec": round(totals["source_bytes"] / wall, 1) if wall else None,
+            # Summed across workers, so these can exceed wall_secs.
+            "phase_secs": phase_secs,
+            "phase_share": {p: round(s / busy, 3) for p, s in phase_secs.items()} if busy else {},
+            "bottleneck": _bottleneck(phase_secs),
+            "per_partition": parts,
+        }
+
+    def write(self, out_dir: str, summary: dict = None) -> str:
+        summary = summary or self.summary()
+        os.makedirs(out_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(self.path))[0]
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        out_path = os.path.join(out_dir, f"{stem}-{stamp}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        logger.info(
+            f"📊 {summary['rows']} rows in {summary['wall_secs']:.1f}s "
+            f"({summary['rows_per_sec'] or 0:,.0f} rows/s); phase share "
+            + ", ".join(f"{p} {s:.0%}" for p, s in summary["phase_share"].items())
+            + f"; bottleneck: {summary['bottleneck']}; "
+            + (f"batch size {summary['batch_rows']['min']}-{summary['batch_rows']['max']} rows; "
+               if summary.get("batch_rows") else "")
+            + f"{summary['retries']} retries, {summary['rejected']} rows rejected"
+        )
+        logger.info(f"📝 Run summary: {out_path}")
+        return out_path
+
+
+def _bottleneck(phase_secs: dict) -> str:
+    """'database' when insert+commit dominate, otherwise the busiest client-side phase."""
+    if not any(phase_secs.values()):
+        return "n/a"
+    sides = {
+        "parse": phase_secs["parse"],
+        "convert": phase_secs["convert"],
+        "aggregate": phase_secs["aggregate"],
+        "database": phase_secs["insert"] + phase_secs["commit"],
+    }
+    return max(sides, key=sides.get)
+
+
+def _fmt_secs(secs: float) -> str:
+    secs = int(secs)
+    h, rem = divmod(secs, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+class Progress:
+    """
+    Live progress bar on stderr. `total` and update(n) share one unit: bytes of
+    the CSV, or rows when loading the Parquet copy. Without a terminal it logs a line every `log_every` secs.
+    """
+
+    def __init__(self, total: int, log_every: float = 10.0, stream=None, width: int = 30):
+        self.total = max(int(total), 0)
+        self.done = 0
+        self.rows = 0
+        self.log_every = log_every
+        self.stream = stream or sys.stderr
+        self.tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.width = width
+        self.started = time.monotonic()
+        self._last = 0.0
+        self._shown = None
+        self._cols = 0
+        self._lock = threading.Lock()
+
+    def update(self, n: int, rows: int = 0):
+        with self._lock:
+            self.done += n
+            self.rows += rows
+            now = time.monotonic()
+            if now - self._last >= (0.2 if self.tty else self.log_every):
+                self._last = now
+                self._render()
+
+    def _line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        frac = min(self.done / self.total, 1.0) if self.total else 1.0
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        eta = elapsed * (1 - frac) / frac if frac > 0 else None
+        return (f"{frac:6.1%} {self.rows:,} rows, {rate:,.0f} rows/s, "
+                f"elapsed {_fmt_secs(elapsed)}, ETA {_fmt_secs(eta) if eta is not None else '--:--'}")
+
+    def _render(self):
+        self._shown = self.done
+        line = self._line()
+        if self.tty:
+            frac = min(self.done / self.total, 1.0) if self.total else 1.0
+            filled = int(frac * self.width)
+            text = f"[{'#' * filled}{'.' * (self.width - filled)}] {line}"
+            self.stream.write("\r" + text.ljust(self._cols))
+            self._cols = len(text)
+            self.stream.flush()
+        else:
+            logger.info(f"⏳ {line}")
+
+    def close(self):
+        with self._lock:
+            if self._shown != self.done:
+                self._render()
+            if self.tty:
+                self.stream.write("\n")
+                self.stream.flush()
@@ -0,0 +1,165 @@
+# ingest_retry.py
+"""
+Retry and dead-letter handling for csv_insertion_batch.
+
+An executemany batch fails in one of three ways:
+
+  transient  connection drops, 503s, overloaded nodes: retried with
+             exponential backoff and full jitter (RetryPolicy)
+  data       the database rejects some rows: insert_isolating() bisects the
+             batch until the bad rows are isolated, sends them to a
+             DeadLetterFile and inserts everything else
+  fatal      unknown table/column, permissions, SQL errors: re-raised, since
+             every row would fail the same way
+"""
+import csv
+import logging
+import os
+import random
+import time
+from typing import Callable, List, Tuple
+
+from monkdb.client.exceptions import (
+    MonkDataError,
+    MonkIntegrityError,
+    MonkOperationalError,
+    MonkProgrammingError,
+)
+
+logger = logging.getLogger(__name__)
+
+# MonkOperationalError covers MonkConnectionError (refused/reset connections,
+# no server left, HTTP 503).
+TRANSIENT_ERRORS = (MonkOperationalError, ConnectionError, TimeoutError)
+TRANSIENT_MARKERS = (
+    "CircuitBreakingException",
+    "RejectedExecutionException",
+    "NodeDisconnectedException",
+    "NodeNotConnectedException",
+    "UnavailableShardsException",
+    "timed out",
+)
+FATAL_MARKERS = (
+    "RelationUnknown",
+    "SchemaUnknown",
+    "ColumnUnknown",
+    "UnauthorizedException",
+    "MissingPrivilegeException",
+    "SQLParseException",
+)
+DATA_ERRORS = (MonkProgrammingError, MonkIntegrityError, MonkDataError, ValueError, TypeError)
+
+
+def classify(exc: Exception) -> str:
+    """'transient', 'data' or 'fatal'."""
+    msg = str(exc)
+    if isinstance(exc, TRANSIENT_ERRORS) or any(m in msg for m in TRANSIENT_MARKERS):
+        return "transient"
+    if any(m in msg for m in FATAL_MARKERS):
+        return "fatal"
+    if isinstance(exc, DATA_ERRORS):
+        return "data"
+    return "fatal"
+
+
+def _short(exc) -> str:
+    lines = str(exc).strip().splitlines()
+    return (lines[0] if lines else type(exc).__name__)[:500]
+
+
+class RetryPolicy:
+    """Up to `attempts` tries of a callable; waits uniform(0, min(max_secs, base_secs * 2**n)) between them."""
+
+    def __init__(self, attempts: int = 5, base_secs: float = 0.5, max_secs: float = 30.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.attempts = max(1, int(attempts))
+        self.base_secs = base_secs
+        self.max_secs = max_secs
+        self.sleep = sleep
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_secs, self.base_secs * 2 ** attempt))
+
+    def call(self, fn: Callable[[int], object], on_retry: Callable[[], None] = None):
+        """fn(attempt) -> result; transient errors are retried, others raise at once."""
+        for attempt in range(self.attempts):
+            try:
+                return fn(attempt)
+            except Exception as e:
+                if attempt + 1 >= self.attempts or classify(e) != "transient":
+                    raise
+                wait = self.delay(attempt)
+                logger.warning(
+                    f"🔁 Transient error (attempt {attempt + 1}/{self.attempts}), "
+                    f"retrying in {wait:.2f}s: {_short(e)}"
+                )
+                if on_retry:
+                    on_retry()
+                self.sleep(wait)
+
+
+class TooManyRejects(RuntimeError):
+    pass
+
+
+class DeadLetterFile:
+    """
+    Rejected rows of one partition as CSV: the row's position in the
+    partition, the error, then the INSERT columns. Positions from an earlier
+    (resumed) run are kept, so `positions` always covers the whole partition.
+    More than `limit` rows raises TooManyRejects: at that point the problem is
+    the statement or the table, not the data.
+    """
+
+    def __init__(self, path: str, columns: List[str], reset: bool = False, limit: int = 10000):
+        self.path = path
+        self.columns = list(columns)
+        self.limit = limit
+        self.count = 0  # this run
+        if reset and os.path.exists(path):
+            os.remove(path)
+        self.positions = self._load()
+
+    def _load(self) -> set:
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return {int(r["row"]) for r in csv.DictReader(f) if r.get("row", "").isdigit()}
+
+    def reject(self, position: int, row: tuple, error: str):
+        if self.limit and self.count >= self.limit:
+            raise TooManyRejects(f"more than {self.limit} rejected rows in one partition; last error: {error}")
+        new = not os.path.exists(self.path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            if new:
+                w.writerow(["row", "error", *self.columns])
+            w.writerow([position, error, *row])
+        self.positions.add(position)
+        self.count += 1
+
+
+def insert_isolating(execute: Callable[[list, int], List[Tuple[int, str]]], rows: list,
+                     policy: RetryPolicy, reject: Callable[[int, tuple, str], None],
+                     first_row: int = 0, on_retry: Callable[[], None] = None) -> int:
+    """
+    Insert `rows` with execute(rows, attempt), which returns the (index, error)
+    pairs the database reported as failed within an otherwise successful call.
+    On a data error the batch is split in half and each half retried, down to
+    single rows, which go to reject(position, row, error). Returns rows inserted.
+    """
+    try:
+        failed = policy.call(lambda attempt: execute(rows, attempt), on_retry)
+    except Exception as e:
+        if classify(e) != "data":
+            raise
+        if len(rows) == 1:
+            reject(first_row, rows[0], _short(e))
+            return 0
+        mid = len(rows) // 2
+        return (insert_isolating(execute, rows[:mid], policy, reject, first_row, on_retry)
+                + insert_isolating(execute, rows[mid:], policy, reject, first_row + mid, on_retry))
+    for i, error in failed:
+        reject(first_row + i, rows[i], error)
+    return len(rows) - len(failed)
@@ -0,0 +1,252 @@
+# ingest_service.py
+"""
+Long-running ingest service: keeps a Dask cluster warm between files and
+accepts file paths over a local HTTP endpoint.
+
+    python ingest_service.py serve                      # 127.0.0.1:[service] PORT
+    python ingest_service.py submit data.csv --wait     # enqueue and wait for the result
+    python ingest_service.py status
+
+Endpoints (JSON):
+    POST /ingest      {"path": ..., "upsert": false, "fresh": false} -> 202 {"id": ...}
+    GET  /jobs/<id>   job state and, once finished, the ingest run summary
+    GET  /status      queue depth, running jobs, Dask workers
+
+Sizing:
+  - files under SMALL_FILE_BYTES are streamed in this process (no Dask)
+  - before a Dask load the cluster is scaled to one worker per
+    BYTES_PER_WORKER of queued + current input, within [MIN_WORKERS, MAX_WORKERS]
+  - after IDLE_SECS without jobs it shrinks back to MIN_WORKERS
+"""
+import argparse
+import configparser
+import itertools
+import json
+import logging
+import math
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dask.utils import parse_bytes
+
+import csv_insertion_batch
+from pipeline import Pipeline
+
+logger = logging.getLogger(__name__)
+
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_FILE_PATH = os.path.join(CURRENT_DIR, "config", "config.ini")
+config = configparser.ConfigParser()
+config.read(CONFIG_FILE_PATH, encoding="utf-8")
+
+PORT = config.getint("service", "PORT", fallback=8765)
+QUEUE_SIZE = config.getint("service", "QUEUE_SIZE", fallback=100)
+JOB_WORKERS = config.getint("service", "JOB_WORKERS", fallback=1)
+MIN_WORKERS = config.getint("service", "MIN_WORKERS", fallback=1)
+MAX_WORKERS = config.getint("service", "MAX_WORKERS", fallback=csv_insertion_batch.N_WORKERS)
+BYTES_PER_WORKER = parse_bytes(config.get("service", "BYTES_PER_WORKER", fallback="256MB"))
+SMALL_FILE_BYTES = parse_bytes(config.get("service", "SMALL_FILE_BYTES", fallback="64MB"))
+IDLE_SECS = config.getfloat("service", "IDLE_SECS", fallback=300.0)
+
+
+def workers_for(nbytes: int, min_workers: int = MIN_WORKERS, max_workers: int = MAX_WORKERS) -> int:
+    return max(min_workers, min(max_workers, math.ceil(nbytes / BYTES_PER_WORKER)))
+
+
+class IngestService:
+    def __init__(self, job_workers: int = JOB_WORKERS, queue_size: int = QUEUE_SIZE,
+                 idle_secs: float = IDLE_SECS):
+        self.pipeline = Pipeline(n_workers=MIN_WORKERS)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = {}
+        self.idle_secs = idle_secs
+        self.n_job_workers = max(1, int(job_workers))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._queued_bytes = 0
+        self._running = 0
+        self._workers = 0  # Dask workers requested; 0 until the cluster starts
+
+    # ---------- jobs ----------
+    def submit(self, path: str, upsert: bool = False, fresh: bool = False) -> dict:
+        """Enqueue a load; raises FileNotFoundError, or queue.Full when the queue is full."""
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        with self._lock:
+            job = {"id": str(next(self._ids)), "path": path, "size": size, "upsert": upsert,
+                   "fresh": fresh, "state": "queued", "submitted_at": time.time()}
+            self.queue.put_nowait(job)
+            self.jobs[job["id"]] = job
+            self._queued_bytes += size
+        logger.info(f"📥 Job {job['id']}: {path} ({size / 1e6:.1f} MB), {self.queue.qsize()} queued")
+        return job
+
+    def _scale_for(self, size: int):
+        with self._lock:
+            target = workers_for(self._queued_bytes + size)
+            if target == self._workers:
+                return
+            # Never shrink under a running job; growing is always safe.
+            if target < self._workers and self._running > 1:
+                return
+            self._workers = target
+        logger.info(f"📐 Dask cluster: {target} workers for {self._queued_bytes + size:,} bytes of input")
+        self.pipeline.scale(target)
+
+    def _shrink_if_idle(self):
+        with self._lock:
+            if self._running or not self.queue.empty() or self._workers <= MIN_WORKERS:
+                return
+            self._workers = MIN_WORKERS
+        logger.info(f"💤 Idle for {self.idle_secs:.0f}s: scaling Dask cluster down to {MIN_WORKERS} workers")
+        self.pipeline.scale(MIN_WORKERS)
+
+    def _run(self, job: dict):
+        small = job["size"] < SMALL_FILE_BYTES
+        with self._lock:
+            self._queued_bytes -= job["size"]
+            self._running += 1
+        job.update(state="running", started_at=time.time(), mode="stream" if small else "dask")
+        try:
+            if not small:
+                self._scale_for(job["size"])
+            result = self.pipeline.ingest(job["path"], stream=small, upsert=job["upsert"], fresh=job["fresh"])
+            result.pop("per_partition", None)
+            job.update(state="done", result=result)
+        except Exception as e:
+            logger.error(f"❌ Job {job['id']} failed: {e}", exc_info=True)
+            job.update(state="failed", error=f"{type(e).__name__}: {e}")
+        finally:
+            job["finished_at"] = time.time()
+            with self._lock:
+                self._running -= 1
+        logger.info(f"🏁 Job {job['id']} {job['state']} in {job['finished_at'] - job['started_at']:.1f}s "
+                    f"({job['mode']})")
+
+    def _worker(self):
+        while True:
+            try:
+                job = self.queue.get(timeout=self.idle_secs)
+            except queue.Empty:
+                self._shrink_if_idle()
+                continue
+            try:
+                self._run(job)
+            finally:
+                self.queue.task_done()
+
+    def status(self) -> dict:
+        with self._lock:
+            states = {}
+            for job in self.jobs.values():
+                states[job["state"]] = states.get(job["state"], 0) + 1
+            return {"queued": self.queue.qsize(), "queued_bytes": self._queued_bytes,
+                    "running": self._running, "dask_workers": self._workers, "jobs": states}
+
+    def start(self):
+        for i in range(self.n_job_workers):
+            threading.Thread(target=self._worker, name=f"ingest-job-{i}", daemon=True).start()
+        return self
+
+    def close(self):
+        self.pipeline.close()
+
+
+# ---------------- HTTP ----------------
+def _handler(service: IngestService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body: dict):
+            data = json.dumps(body, default=str).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path != "/ingest":
+                return self._send(404, {"error": "not found"})
+            try:
+                req = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                job = service.submit(req["path"], upsert=bool(req.get("upsert")), fresh=bool(req.get("fresh")))
+            except (KeyError, ValueError) as e:
+                return self._send(400, {"error": f"bad request: {e}"})
+            except FileNotFoundError as e:
+                return self._send(404, {"error": str(e)})
+            except queue.Full:
+                return self._send(503, {"error": "queue full"})
+            self._send(202, job)
+
+        def do_GET(self):
+            if self.path == "/status":
+                return self._send(200, service.status())
+            if self.path.startswith("/jobs/"):
+                job = service.jobs.get(self.path[len("/jobs/"):])
+                return self._send(200, job) if job else self._send(404, {"error": "unknown job"})
+            self._send(404, {"error": "not found"})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = PORT):
+    service = IngestService().start()
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(service))
+    logger.info(f"🛰️ Ingest service on http://127.0.0.1:{port} "
+                f"(small files < {SMALL_FILE_BYTES / 1e6:.0f} MB streamed, "
+                f"Dask {MIN_WORKERS}-{MAX_WORKERS} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def _call(port: int, method: str, path: str, body: dict = None) -> dict:
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{port}{path}", method=method,
+        data=json.dumps(body).encode("utf-8") if body is not None else None,
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read() or b"{}") | {"status": e.code}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Warm-cluster ingest service")
+    ap.add_argument("--port", type=int, default=PORT)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("serve", help="Run the service")
+    sp = sub.add_parser("submit", help="Queue a CSV on a running service")
+    sp.add_argument("path")
+    sp.add_argument("--upsert", action="store_true")
+    sp.add_argument("--fresh", action="store_true")
+    sp.add_argument("--wait", action="store_true", help="Poll until the job finishes")
+    sub.add_parser("status", help="Show queue and cluster state")
+    args = ap.parse_args()
+
+    if args.cmd == "serve":
+        serve(args.port)
+    elif args.cmd == "status":
+        print(json.dumps(_call(args.port, "GET", "/status"), indent=2))
+    else:
+        job = _call(args.port, "POST", "/ingest",
+                    {"path": os.path.abspath(args.path), "upsert": args.upsert, "fresh": args.fresh})
+        while args.wait and job.get("state") in ("queued", "running"):
+            time.sleep(1)
+            job = _call(args.port, "GET", f"/jobs/{job['id']}")
+        print(json.dumps(job, indent=2))
+        sys.exit(0 if job.get("state") in ("queued", "running", "done") else 1)
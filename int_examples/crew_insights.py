@@ -1,5 +1,7 @@
 import argparse
 import json
+import os
+import sys
 from typing import Dict, Any, Type
 
 import pandas as pd
@@ -8,15 +10,18 @@ from crewai import Agent, Task, Crew
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 
-from mcp_monkdb.mcp_server import run_select_query
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import query_client  # noqa: E402
 
 
 def _monkdb_query_impl(sql: str) -> str:
-    """Run SELECT via MCP and return JSON string."""
-    res = run_select_query(sql)
-    if isinstance(res, dict) and res.get("status") == "error":
-        return json.dumps({"error": res["message"]})
-    return json.dumps(res or [])
+    """Run SELECT via the shared query client (timed as "crew_monkdb_query") and return JSON string."""
+    try:
+        df = query_client.query(sql, "crew_monkdb_query")
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+    rows = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+    return json.dumps(rows, default=str)
 
 
 class MonkDBQueryInput(BaseModel):
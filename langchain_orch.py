@@ -1,66 +1,200 @@
 import argparse
-from langchain_ollama import ChatOllama
-from langchain.agents import initialize_agent, AgentType
+import configparser
+import json
+import os
+import statistics
+import threading
+import time
 from agents.agent_upload import upload_and_visualize
 from agents.agent_insights import generate_insights
 from agents.agent_deploy import deploy_dashboard
 
-# 1. Setup the local Mistral model via Ollama
-llm = ChatOllama(model="mistral")
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_FILE_PATH = os.path.join(CURRENT_DIR, "config", "config.ini")
+config = configparser.ConfigParser()
+config.read(CONFIG_FILE_PATH, encoding="utf-8")
+
+# agent = three ReAct agents pick and call one tool each (LLM round trips per step)
+# direct = the same three steps as a fixed DAG; the LLM only narrates on --narrate
+DEFAULT_MODE = config.get("orchestrator", "MODE", fallback="agent")
+LATENCY_LOG = os.path.join(
+    CURRENT_DIR, config.get("orchestrator", "LATENCY_LOG", fallback="analytics_out/orchestration_latency.json")
+)
+LATENCY_HISTORY = 20  # runs kept per mode
+_latency_lock = threading.Lock()
+
+# 1. Setup the local Mistral model via Ollama, and the agents, on first use.
+# langchain_ollama and langchain.agents are imported there too: direct mode
+# without --narrate never needs them.
+_llm = None
+_agents = {}
+
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        from langchain_ollama import ChatOllama
+        _llm = ChatOllama(model="mistral")
+    return _llm
+
 
 # 2. Define 3 separate agents with tool and parsing fixes
+# Agent 1: Uploader, Agent 2: Insight generator, Agent 3: Deployer
+def get_agent(name: str):
+    if name not in _agents:
+        from langchain.agents import initialize_agent, AgentType
+        tool = {"uploader": upload_and_visualize, "insighter": generate_insights,
+                "deployer": deploy_dashboard}[name]
+        _agents[name] = initialize_agent(
+            tools=[tool],
+            llm=get_llm(),
+            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            verbose=True,
+            handle_parsing_errors=True  # ✅ prevent crash from LLM formatting mistakes
+        )
+    return _agents[name]
 
-# Agent 1: Uploader
-upload_tool = [upload_and_visualize]
-uploader = initialize_agent(
-    tools=upload_tool,
-    llm=llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    verbose=True,
-    handle_parsing_errors=True  # ✅ prevent crash from LLM formatting mistakes
-)
 
-# Agent 2: Insight generator
-insight_tool = [generate_insights]
-insighter = initialize_agent(
-    tools=insight_tool,
-    llm=llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    verbose=True,
-    handle_parsing_errors=True
-)
+# ---------------- Step latency ----------------
+def _load_latency() -> dict:
+    try:
+        with open(LATENCY_LOG, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_latency(mode: str, timings: dict) -> dict:
+    """Append this run's per-step seconds to LATENCY_LOG (last LATENCY_HISTORY runs per mode)."""
+    with _latency_lock:
+        log = _load_latency()
+        runs = log.setdefault(mode, [])
+        runs.append({"at": time.time(), **{k: round(v, 3) for k, v in timings.items()}})
+        del runs[:-LATENCY_HISTORY]
+        os.makedirs(os.path.dirname(LATENCY_LOG), exist_ok=True)
+        with open(LATENCY_LOG, "w", encoding="utf-8") as f:
+            json.dump(log, f, indent=2)
+    return log
+
+
+def latency_report(log: dict, timings: dict) -> str:
+    """This direct run against the median of recorded agent-mode runs, step by step."""
+    agent_runs = log.get("agent", [])
+    lines = [f"{'step':<10}{'direct':>10}{'agent (median)':>16}{'saved':>10}"]
+    for step, secs in timings.items():
+        past = [r[step] for r in agent_runs if step in r]
+        if past:
+            base = statistics.median(past)
+            lines.append(f"{step:<10}{secs:>9.2f}s{base:>15.2f}s{base - secs:>9.2f}s")
+        else:
+            lines.append(f"{step:<10}{secs:>9.2f}s{'n/a':>16}{'':>10}")
+    if not agent_runs:
+        lines.append("(no agent-mode runs recorded yet to compare against)")
+    return "\n".join(lines)
 
-# Agent 3: Deployer
-deployer_tool = [deploy_dashboard]
-deployer = initialize_agent(
-    tools=deployer_tool,
-    llm=llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    verbose=True,
-    handle_parsing_errors=True
-)
 
 # 3. Define a simple workflow between the agents
 def multi_agent_workflow(csv_file_path: str):
+    timings = {}
+
     print("\n🔍 Upload Phase:")
-    uploader_RES = uploader.invoke(f"Use the upload_and_visualize tool to upload this CSV file: {csv_file_path}")
+    t0 = time.perf_counter()
+    uploader_RES = get_agent("uploader").invoke(f"Use the upload_and_visualize tool to upload this CSV file: {csv_file_path}")
+    timings["upload"] = time.perf_counter() - t0
     print(f"Uploader Result: {uploader_RES['output']}")
 
     print("\n🧠 Insight Phase:")
-    insighter_RES = insighter.invoke(f"Use the generate_insights tool to extract insights from: {csv_file_path}")
+    t0 = time.perf_counter()
+    insighter_RES = get_agent("insighter").invoke(f"Use the generate_insights tool to extract insights from: {csv_file_path}")
+    timings["insights"] = time.perf_counter() - t0
     print(f"Insights Result: {insighter_RES['output']}")
 
     print("\n🛠️ Deploy Phase:")
-    deployer_RES = deployer.invoke(f"Use deploy_dashboard to deploy results from: {csv_file_path}")
+    t0 = time.perf_counter()
+    deployer_RES = get_agent("deployer").invoke(f"Use deploy_dashboard to deploy results from: {csv_file_path}")
+    timings["deploy"] = time.perf_counter() - t0
     print(f"Deployer Result: {deployer_RES['output']}")
 
+    record_latency("agent", timings)
     return deployer_RES['output']
 
+
+# ---------------- Direct mode ----------------
+# step -> (steps it needs, tool); run in this order
+DAG = {
+    "upload": ((), upload_and_visualize),
+    "insights": (("upload",), generate_insights),
+    "deploy": (("upload", "insights"), deploy_dashboard),
+}
+
+
+def narrate(csv_file_path: str, results: dict) -> str:
+    """Free-form summary of the run by the LLM (the only LLM call in direct mode)."""
+    prompt = (
+        f"Summarise this data pipeline run for the file {csv_file_path} in a few sentences "
+        f"for a business reader. Step outputs (JSON):\n{json.dumps(results, default=str)[:6000]}"
+    )
+    return get_llm().invoke(prompt).content
+
+
+# deploy_dashboard runs git add/commit/push in the working tree: one at a time.
+_deploy_lock = threading.Lock()
+
+
+def direct_workflow(csv_file_path: str, narration: bool = False, deploy: bool = True) -> dict:
+    """Run upload -> insights -> deploy as plain calls; a step runs only if the steps it needs succeeded."""
+    results, timings, failed = {}, {}, set()
+    for step, (needs, tool) in DAG.items():
+        if step == "deploy" and not deploy:
+            continue
+        if failed.intersection(needs) or any(n not in results for n in needs):
+            print(f"⏭️ {step}: skipped (needs {', '.join(needs)})")
+            failed.add(step)
+            continue
+        print(f"\n▶️ {step}")
+        t0 = time.perf_counter()
+        try:
+            if step == "deploy":
+                with _deploy_lock:
+                    out = tool.func(csv_file_path)
+            else:
+                out = tool.func(csv_file_path)
+            ok = not (isinstance(out, str) and out.startswith(("Error", "❌")))
+        except Exception as e:
+            out, ok = f"Error in {step}: {e}", False
+        timings[step] = time.perf_counter() - t0
+        print(f"{'✅' if ok else '❌'} {step} ({timings[step]:.2f}s): {str(out)[:500]}")
+        if ok:
+            results[step] = out
+        else:
+            failed.add(step)
+
+    log = record_latency("direct", timings)
+    print("\n⏱️ Step latency\n" + latency_report(log, timings))
+
+    summary = {"file": csv_file_path, "ok": not failed, "results": results,
+               "timings": {k: round(v, 3) for k, v in timings.items()}}
+    if narration and results:
+        print("\n📝 Narration:")
+        summary["narration"] = narrate(csv_file_path, results)
+        print(summary["narration"])
+    return summary
+
+
 # 4. Main CLI entrypoint
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run multi-agent orchestration pipeline on a CSV file")
     parser.add_argument("file_path", help="Path to the CSV file to process")
+    parser.add_argument("--mode", choices=["agent", "direct"], default=DEFAULT_MODE,
+                        help="agent = LLM agents choose the tool calls; direct = fixed DAG, no LLM")
+    parser.add_argument("--narrate", action="store_true",
+                        help="direct mode: ask the LLM for a free-form summary at the end")
+    parser.add_argument("--no-deploy", action="store_true", help="direct mode: skip the deploy step")
     args = parser.parse_args()
 
-    final_result = multi_agent_workflow(args.file_path)
+    if args.mode == "direct":
+        final_result = direct_workflow(args.file_path, narration=args.narrate, deploy=not args.no_deploy)
+        final_result = json.dumps(final_result, indent=2, default=str)
+    else:
+        final_result = multi_agent_workflow(args.file_path)
     print("\n✅ Final Result:\n", final_result)
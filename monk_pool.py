@@ -0,0 +1,164 @@
+# monk_pool.py
+"""
+Process-wide MonkDB connection pool.
+
+One pool per DSN lives for the whole process (a Dask worker, the streaming
+writer threads, or a long-running service), so partitions borrow warm
+connections instead of opening a new HTTP client each time.
+"""
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_SQL = "SELECT 1"
+
+
+class ConnectionPool:
+    """
+    Bounded pool of DB-API connections created by `connect()`.
+
+    - at most `size` connections are checked out at once (acquire blocks)
+    - an idle connection older than `check_after` seconds is pinged with
+      HEALTH_CHECK_SQL before reuse; a failed ping reconnects transparently
+    - hits / misses / reconnects are counted for `stats()`
+    """
+
+    def __init__(self, connect: Callable, size: int = 4, check_after: float = 30.0):
+        self._connect = connect
+        self.size = max(1, int(size))
+        self.check_after = float(check_after)
+        self._idle = []  # [(conn, released_at)]
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+        self.discarded = 0
+
+    # ---------- health ----------
+    def _healthy(self, conn) -> bool:
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute(HEALTH_CHECK_SQL)
+                cur.fetchall()
+            finally:
+                cur.close()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Pooled connection failed health check: {e}")
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    # ---------- checkout ----------
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            with self._lock:
+                item = self._idle.pop() if self._idle else None
+            if item is not None:
+                conn, released_at = item
+                if time.monotonic() - released_at < self.check_after or self._healthy(conn):
+                    with self._lock:
+                        self.hits += 1
+                    return conn
+                self._close(conn)
+                with self._lock:
+                    self.reconnects += 1
+            conn = self._connect()
+            with self._lock:
+                self.misses += 1
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard: bool = False):
+        try:
+            if discard:
+                self._close(conn)
+                with self._lock:
+                    self.discarded += 1
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it is dropped instead of returned if the block raises."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    # ---------- lifecycle ----------
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reconnects": self.reconnects,
+                "discarded": self.discarded,
+            }
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(dsn: str, connect: Callable, size: int = 4, check_after: float = 30.0) -> ConnectionPool:
+    """Return the process-wide pool for `dsn`, creating it on first use."""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(dsn)
+        if pool is None:
+            pool = _POOLS[dsn] = ConnectionPool(connect, size=size, check_after=check_after)
+        return pool
+
+
+def pool_stats() -> Dict[str, dict]:
+    """Stats for every pool in this process, keyed by DSN (credentials stripped)."""
+    with _POOLS_LOCK:
+        return {_redact(dsn): p.stats() for dsn, p in _POOLS.items()}
+
+
+def close_all():
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for p in pools:
+        p.close()
+
+
+def _redact(dsn: str) -> str:
+    scheme, sep, rest = dsn.partition("://")
+    if sep and "@" in rest:
+        return f"{scheme}://{rest.split('@', 1)[1]}"
+    return dsn
+
+
+atexit.register(close_all)
@@ -0,0 +1,190 @@
+# pack_cache.py
+"""
+Two-tier cache for insight packs.
+
+Keys are a SHA-256 of the normalised filters dict plus the local data
+version (see data_version.py), so equivalent filter combinations share an
+entry and every finished load makes older entries unreachable. The memory
+tier is an LRU with TTL; the optional disk tier keeps JSON packs under
+analytics_out/packs/.cache with the same TTL and a file-count cap.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import data_version
+
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+PACK_CACHE_DIR = os.path.join(CURRENT_DIR, "analytics_out", "packs", ".cache")
+PACK_CACHE_MAX_ENTRIES = 256
+PACK_CACHE_MAX_DISK_ENTRIES = 2000
+PACK_CACHE_TTL_SECS = 15 * 60
+
+# filters whose list values are sets (order does not change the WHERE clause)
+_SET_KEYS = {"brands", "exclude_brands"}
+
+
+def normalize_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop empty values, sort set-like lists and fold 20.0 -> 20 so equal filters hash equally."""
+    def num(v):
+        if isinstance(v, float) and v.is_integer():
+            return int(v)
+        return v
+
+    out = {}
+    for k, v in (filters or {}).items():
+        if v is None or v is False or (isinstance(v, (str, list, tuple)) and len(v) == 0):
+            continue
+        if k in _SET_KEYS:
+            v = sorted({str(b) for b in v})
+        elif isinstance(v, (list, tuple)):
+            v = [num(x) for x in v]
+        elif k == "title_ilike":
+            v = str(v).strip().lower()  # ILIKE is case-insensitive
+        else:
+            v = num(v)
+        out[k] = v
+    return out
+
+
+def pack_key(filters: Dict[str, Any], version: Optional[int] = None) -> str:
+    if version is None:
+        version = data_version.current().get("version", 0)
+    blob = json.dumps({"filters": normalize_filters(filters), "version": version},
+                      sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class PackCache:
+    def __init__(self, max_entries: int = PACK_CACHE_MAX_ENTRIES,
+                 ttl_secs: float = PACK_CACHE_TTL_SECS,
+                 disk_dir: Optional[str] = PACK_CACHE_DIR,
+                 max_disk_entries: int = PACK_CACHE_MAX_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl_secs = ttl_secs
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored_at, pack)
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    # ---------- tiers ----------
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_get(self, key: str):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_secs:
+                os.remove(path)
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)["pack"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _disk_put(self, key: str, pack: dict):
+        if not self.disk_dir:
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        tmp = self._disk_path(key) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": time.time(), "pack": pack}, f, ensure_ascii=False, default=str)
+        os.replace(tmp, self._disk_path(key))
+        self._disk_evict()
+
+    def _disk_evict(self):
+        try:
+            entries = [e for e in os.scandir(self.disk_dir) if e.name.endswith(".json")]
+        except OSError:
+            return
+        now = time.time()
+        live = []
+        for e in entries:
+            mtime = e.stat().st_mtime
+            if now - mtime > self.ttl_secs:
+                _silent_remove(e.path)
+            else:
+                live.append((mtime, e.path))
+        live.sort()
+        for _, path in live[:max(0, len(live) - self.max_disk_entries)]:
+            _silent_remove(path)
+
+    # ---------- API ----------
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None:
+                stored_at, pack = item
+                if time.time() - stored_at <= self.ttl_secs:
+                    self._mem.move_to_end(key)
+                    self.hits["memory"] += 1
+                    return pack
+                del self._mem[key]
+
+        pack = self._disk_get(key)
+        with self._lock:
+            if pack is not None:
+                self.hits["disk"] += 1
+                self._mem_put(key, pack)
+            else:
+                self.misses += 1
+        return pack
+
+    def _mem_put(self, key: str, pack: dict):
+        self._mem[key] = (time.time(), pack)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def put(self, key: str, pack: dict):
+        with self._lock:
+            self._mem_put(key, pack)
+        self._disk_put(key, pack)
+
+    def clear(self):
+        """Drop both tiers (used after a load; new keys would miss anyway)."""
+        with self._lock:
+            self._mem.clear()
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            for e in os.scandir(self.disk_dir):
+                if e.name.endswith(".json"):
+                    _silent_remove(e.path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"memory_entries": len(self._mem), "hits": dict(self.hits), "misses": self.misses}
+
+
+def _silent_remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_cache: Optional[PackCache] = None
+
+
+def get_pack_cache() -> PackCache:
+    """Process-wide cache (one per Streamlit server / CLI process)."""
+    global _cache
+    if _cache is None:
+        _cache = PackCache()
+    return _cache
+
+
+def invalidate(**load_info) -> dict:
+    """Bump the data version and clear cached packs; called when a load finishes."""
+    v = data_version.bump(**load_info)
+    PackCache().clear()
+    if _cache is not None:
+        _cache.clear()
+    return v
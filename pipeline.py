@@ -0,0 +1,152 @@
+# pipeline.py
+"""
+In-process pipeline: load a CSV (csv_insertion_batch.main) and build the
+insight pack (gen_insights_force.generate_pack) as function calls in one
+interpreter, instead of a chain of subprocesses that each re-import pandas,
+dask and the agent stack and start their own Dask cluster.
+
+A Pipeline keeps one Dask client for its lifetime (started on the first
+Dask load), and the DB pool in monk_pool is process-wide, so every file after
+the first reuses warm workers and connections.
+
+Every step returns a structured result:
+
+    {"step": "ingest", "ok": True, "secs": 4.2, "result": {...}}
+    {"step": "insights", "ok": False, "secs": 0.3, "error": "..."}
+
+and run() wraps them as {"file", "ok", "secs", "steps": [...]}.
+
+    python pipeline.py csv_folder/products.csv --stream
+"""
+import argparse
+import atexit
+import json
+import logging
+import threading
+import time
+import traceback
+
+import csv_insertion_batch
+import gen_insights_force
+
+logger = logging.getLogger(__name__)
+
+
+def _step(name: str, fn, *args, **kwargs) -> dict:
+    t0 = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+        out = {"step": name, "ok": True, "result": result}
+    except Exception as e:
+        logger.error(f"❌ Pipeline step {name} failed: {e}\n{traceback.format_exc()}")
+        out = {"step": name, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    out["secs"] = round(time.perf_counter() - t0, 3)
+    return out
+
+
+class Pipeline:
+    def __init__(self, n_workers: int = csv_insertion_batch.N_WORKERS,
+                 threads_per_worker: int = csv_insertion_batch.THREADS_PER_W):
+        self.n_workers = n_workers
+        self.threads_per_worker = threads_per_worker
+        self._cluster = None
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        """The shared Dask client, started on first use."""
+        with self._lock:
+            if self._client is None:
+                self._cluster, self._client = csv_insertion_batch.start_cluster(
+                    self.n_workers, self.threads_per_worker)
+            return self._client
+
+    def scale(self, n_workers: int):
+        """Resize the shared cluster, starting it at that size if it is not up yet."""
+        # All under the lock, so close() cannot tear the cluster down mid-resize.
+        with self._lock:
+            self.n_workers = n_workers
+            if self._client is None:
+                self._cluster, self._client = csv_insertion_batch.start_cluster(
+                    self.n_workers, self.threads_per_worker)
+            elif len(self._cluster.workers) != n_workers:
+                self._cluster.scale(n_workers)
+                self._client.wait_for_workers(n_workers, timeout=120)
+
+    def ingest(self, csv_file_path: str, stream: bool = False, upsert: bool = False,
+               fresh: bool = False, parquet: bool = False) -> dict:
+        """Load one CSV; returns the ingest run summary (see csv_insertion_batch.main)."""
+        client = None if (stream or parquet) else self.client()
+        return csv_insertion_batch.main(csv_file_path, stream=stream, upsert=upsert, fresh=fresh,
+                                        parquet=parquet, client=client)
+
+    def insights(self, filters: dict = None, **kwargs) -> dict:
+        return gen_insights_force.generate_pack(filters, **kwargs)
+
+    def deploy(self, csv_file_path: str) -> str:
+        # Imported here: the deploy tool pulls in the agent stack.
+        from agents.agent_deploy import deploy_dashboard
+        return deploy_dashboard.func(csv_file_path)
+
+    def run(self, csv_file_path: str, filters: dict = None, deploy: bool = False, **ingest_kwargs) -> dict:
+        """ingest -> insights (-> deploy); later steps are skipped when one fails."""
+        t0 = time.perf_counter()
+        steps = [_step("ingest", self.ingest, csv_file_path, **ingest_kwargs)]
+        if steps[-1]["ok"]:
+            steps.append(_step("insights", self.insights, filters))
+        if deploy and steps[-1]["ok"]:
+            steps.append(_step("deploy", self.deploy, csv_file_path))
+        return {
+            "file": csv_file_path,
+            "ok": all(s["ok"] for s in steps),
+            "secs": round(time.perf_counter() - t0, 3),
+            "steps": steps,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._cluster.close()
+                self._cluster = self._client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> Pipeline:
+    """Process-wide pipeline (watcher workers, agent tools); its cluster is closed at exit."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = Pipeline()
+            atexit.register(_pipeline.close)
+        return _pipeline
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Load a CSV and build its insight pack in one process")
+    ap.add_argument("csv_file_path", nargs="+", help="CSV file(s); later files reuse the warm cluster")
+    ap.add_argument("--stream", action="store_true", help="Streaming load instead of Dask")
+    ap.add_argument("--parquet", action="store_true", help="Load from the typed Parquet copy")
+    ap.add_argument("--upsert", action="store_true", help="INSERT ... ON CONFLICT DO UPDATE")
+    ap.add_argument("--fresh", action="store_true", help="Ignore checkpoints from earlier runs")
+    ap.add_argument("--filters-json", default="{}", help="Insight pack filters")
+    ap.add_argument("--deploy", action="store_true", help="Also run the deploy step")
+    args = ap.parse_args()
+
+    with Pipeline() as p:
+        for path in args.csv_file_path:
+            res = p.run(path, filters=json.loads(args.filters_json), deploy=args.deploy,
+                        stream=args.stream, parquet=args.parquet, upsert=args.upsert, fresh=args.fresh)
+            for s in res["steps"]:
+                if s["step"] == "ingest" and s["ok"]:
+                    s["result"].pop("per_partition", None)
+            print(json.dumps(res, indent=2, default=str))
@@ -0,0 +1,318 @@
+# query_backend.py
+"""
+Pluggable SELECT backend for the analytics scripts and the dashboard.
+
+`run_select_query(sql)` has the same contract as
+mcp_monkdb.mcp_server.run_select_query (list of row dicts, or
+{"status": "error", "message": ...}) and dispatches to:
+
+  - "mcp"    : MonkDB over MCP (default)
+  - "monkdb" : MonkDB directly over the pooled DB-API client (SELECT only)
+  - "duckdb" : an in-process DuckDB loaded from a Parquet snapshot of
+               trent.products, so the same SQL runs locally with no network
+
+Pick the backend with QUERY_BACKEND in the [analytics] section of
+config/config.ini, or override it with the MONK_QUERY_BACKEND env var.
+
+`select_df(sql)` returns a DataFrame. On the duckdb and monkdb backends it
+goes through Arrow: DuckDB hands over record batches, and MonkDB's row
+arrays are transposed straight into columns, so no per-row dicts are
+built. MCP only speaks JSON rows and keeps the dict path, as does
+RESULT_FORMAT = dicts. Per-query fetch/decode timings are kept in
+decode_stats().
+
+Build / refresh the snapshot:
+    python query_backend.py snapshot --from-monkdb
+    python query_backend.py snapshot --from-parquet-cache
+"""
+import argparse
+import configparser
+import glob
+import os
+import re
+import threading
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_FILE_PATH = os.path.join(CURRENT_DIR, "config", "config.ini")
+config = configparser.ConfigParser()
+config.read(CONFIG_FILE_PATH, encoding="utf-8")
+
+TABLE = "trent.products"
+QUERY_BACKEND = os.environ.get("MONK_QUERY_BACKEND") or config.get("analytics", "QUERY_BACKEND", fallback="mcp")
+LOCAL_SNAPSHOT = os.path.join(
+    CURRENT_DIR, config.get("analytics", "LOCAL_SNAPSHOT", fallback="analytics_out/products.parquet")
+)
+RESULT_FORMAT = os.environ.get("MONK_RESULT_FORMAT") or config.get("analytics", "RESULT_FORMAT", fallback="columnar")
+SNAPSHOT_PAGE_ROWS = 50000
+_READ_ONLY = re.compile(r"^\s*(SELECT|WITH|EXPLAIN)\b", re.IGNORECASE)
+
+
+# ---------------- MCP ----------------
+def _mcp_query(sql: str):
+    from mcp_monkdb.mcp_server import run_select_query as mcp_run_select_query
+    return mcp_run_select_query(sql)
+
+
+# ---------------- MonkDB (direct) ----------------
+def _monkdb_pool():
+    from monkdb import client as monk_client
+    from monk_pool import get_pool
+
+    db = config["database"]
+    dsn = f"http://{db['DB_USER']}:{db['DB_PASSWORD']}@{db['DB_HOST']}:{db['DB_PORT']}"
+    return get_pool(dsn, lambda: monk_client.connect(dsn, username=db["DB_USER"]),
+                    size=config.getint("ingest", "POOL_SIZE", fallback=4),
+                    check_after=config.getfloat("ingest", "POOL_HEALTH_CHECK_SECS", fallback=30))
+
+
+def _monkdb_fetch(sql: str):
+    """(column names, row arrays) for a SELECT (or EXPLAIN) over a pooled connection."""
+    if not _READ_ONLY.match(sql):
+        raise ValueError("Only SELECT statements are allowed")
+    with _monkdb_pool().connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            rows = cur.fetchall()
+            names = [d[0] for d in cur.description]
+        finally:
+            cur.close()
+    return names, rows
+
+
+def _rows_to_arrow(names, rows):
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    return pa.Table.from_arrays([pa.array(c) for c in columns], names=names)
+
+
+# ---------------- DuckDB ----------------
+class LocalEngine:
+    """DuckDB database holding trent.products from the Parquet snapshot, loaded once per process."""
+
+    def __init__(self, snapshot_path: str = None):
+        import duckdb
+
+        snapshot_path = snapshot_path or LOCAL_SNAPSHOT
+        if not os.path.exists(snapshot_path):
+            raise FileNotFoundError(
+                f"No local snapshot at {snapshot_path}; run `python query_backend.py snapshot`"
+            )
+        self.snapshot_path = snapshot_path
+        self._con = duckdb.connect(database=":memory:")
+        schema, table = TABLE.split(".")
+        self._con.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        self._con.execute(
+            f"CREATE TABLE {schema}.{table} AS SELECT * FROM read_parquet(?)", [snapshot_path]
+        )
+        self._local = threading.local()
+
+    def _cursor(self):
+        # DuckDB connections are not shared across threads; one cursor per thread.
+        cur = getattr(self._local, "cur", None)
+        if cur is None:
+            cur = self._local.cur = self._con.cursor()
+        return cur
+
+    def query(self, sql: str):
+        try:
+            cur = self._cursor()
+            cur.execute(sql)
+            cols = [d[0] for d in cur.description]
+            return [dict(zip(cols, row)) for row in cur.fetchall()]
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def arrow(self, sql: str):
+        """The result as a pyarrow Table (raises on error)."""
+        return self._cursor().execute(sql).fetch_arrow_table()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def local_engine() -> LocalEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = LocalEngine()
+        return _engine
+
+
+# ---------------- Dispatch ----------------
+def run_select_query(sql: str, backend: str = None):
+    backend = (backend or QUERY_BACKEND).lower()
+    if backend == "duckdb":
+        return local_engine().query(sql)
+    if backend == "mcp":
+        return _mcp_query(sql)
+    if backend == "monkdb":
+        try:
+            names, rows = _monkdb_fetch(sql)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        return [dict(zip(names, row)) for row in rows]
+    return {"status": "error", "message": f"Unknown query backend: {backend}"}
+
+
+# ---------------- Columnar results ----------------
+def _plain_types(tbl):
+    """DECIMAL (e.g. DuckDB's SUM over integers) -> float64, so pandas gets numeric columns, not Decimal objects."""
+    import pyarrow as pa
+
+    for i, field in enumerate(tbl.schema):
+        if pa.types.is_decimal(field.type):
+            tbl = tbl.set_column(i, field.name, tbl.column(i).cast(pa.float64()))
+    return tbl
+
+_stats_lock = threading.Lock()
+_decode_stats = {}
+
+
+def _record(name: str, rows: int, fetch_secs: float, decode_secs: float, path: str):
+    with _stats_lock:
+        s = _decode_stats.setdefault(name, {"calls": 0, "rows": 0, "fetch_secs": 0.0,
+                                            "decode_secs": 0.0, "path": path})
+        s["calls"] += 1
+        s["rows"] += rows
+        s["fetch_secs"] += fetch_secs
+        s["decode_secs"] += decode_secs
+        s["path"] = path
+
+
+def decode_stats() -> dict:
+    """{query name: calls, rows, fetch_secs, decode_secs, path} accumulated by select_df()."""
+    with _stats_lock:
+        return {k: dict(v) for k, v in _decode_stats.items()}
+
+
+def run_select_columns(sql: str, backend: str = None):
+    """The result as a pyarrow Table; raises RuntimeError on query errors."""
+    backend = (backend or QUERY_BACKEND).lower()
+    try:
+        if backend == "duckdb":
+            return local_engine().arrow(sql)
+        if backend == "monkdb":
+            return _rows_to_arrow(*_monkdb_fetch(sql))
+    except Exception as e:
+        raise RuntimeError(str(e)) from e
+    import pyarrow as pa
+
+    res = run_select_query(sql, backend)
+    if isinstance(res, dict) and res.get("status") == "error":
+        raise RuntimeError(res["message"])
+    return pa.Table.from_pylist(res or [])
+
+
+def select_df(sql: str, name: str = None, backend: str = None):
+    """
+    Run a SELECT and return a DataFrame, raising RuntimeError on errors.
+    `name` labels the query in decode_stats() (defaults to the start of the SQL).
+    """
+    import pandas as pd
+
+    backend = (backend or QUERY_BACKEND).lower()
+    name = name or " ".join(sql.split())[:60]
+    t0 = time.perf_counter()
+    if RESULT_FORMAT == "dicts" or backend not in ("duckdb", "monkdb"):
+        res = run_select_query(sql, backend)
+        if isinstance(res, dict) and res.get("status") == "error":
+            raise RuntimeError(res["message"])
+        t1 = time.perf_counter()
+        df = pd.DataFrame(res or [])
+        _record(name, len(df), t1 - t0, time.perf_counter() - t1, "dicts")
+        return df
+
+    try:
+        if backend == "duckdb":
+            tbl = local_engine().arrow(sql)
+            t1 = time.perf_counter()
+        else:
+            names, rows = _monkdb_fetch(sql)
+            t1 = time.perf_counter()
+            tbl = _rows_to_arrow(names, rows)
+    except Exception as e:
+        raise RuntimeError(str(e)) from e
+    # numeric columns without nulls are handed to pandas without copying
+    df = _plain_types(tbl).to_pandas(split_blocks=True, self_destruct=True)
+    _record(name, len(df), t1 - t0, time.perf_counter() - t1, "arrow")
+    return df
+
+
+# ---------------- Snapshot ----------------
+def snapshot_from_monkdb(out_path: str = LOCAL_SNAPSHOT, page_rows: int = SNAPSHOT_PAGE_ROWS) -> int:
+    """Page trent.products out of MonkDB by product_id (keyset) into a Parquet file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    writer = None
+    last, total = None, 0
+    try:
+        while True:
+            where = f"WHERE product_id > {int(last)}" if last is not None else ""
+            res = _mcp_query(f"SELECT * FROM {TABLE} {where} ORDER BY product_id LIMIT {page_rows}")
+            if isinstance(res, dict) and res.get("status") == "error":
+                raise RuntimeError(res["message"])
+            if not res:
+                break
+            tbl = pa.Table.from_pylist(res)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, tbl.schema, compression="zstd")
+            writer.write_table(tbl.cast(writer.schema))
+            total += len(res)
+            last = res[-1]["product_id"]
+            print(f"… {total} rows", flush=True)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise RuntimeError(f"{TABLE} is empty; nothing to snapshot")
+    os.replace(tmp_path, out_path)
+    return total
+
+
+def snapshot_from_parquet_cache(out_path: str = LOCAL_SNAPSHOT) -> int:
+    """
+    Combine the typed Parquet copies written by `csv_insertion_batch.py --parquet`
+    into one snapshot (last copy wins per product_id).
+    """
+    import duckdb
+
+    cache_dir = os.path.join(CURRENT_DIR, config.get("ingest", "PARQUET_DIR", fallback="parquet_cache"))
+    files = sorted(glob.glob(os.path.join(cache_dir, "*.parquet")), key=os.path.getmtime)
+    if not files:
+        raise FileNotFoundError(f"No staged Parquet files in {cache_dir}")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    files_sql = "[" + ", ".join("'" + f.replace("'", "''") + "'" for f in files) + "]"
+    tmp_path = (out_path + ".tmp").replace("'", "''")
+    con = duckdb.connect()
+    con.execute(f"""
+        COPY (
+          SELECT * EXCLUDE (filename)
+          FROM read_parquet({files_sql}, filename = true)
+          QUALIFY row_number() OVER (
+            PARTITION BY product_id ORDER BY list_position({files_sql}, filename) DESC
+          ) = 1
+        ) TO '{tmp_path}' (FORMAT PARQUET, COMPRESSION ZSTD)
+    """)
+    os.replace(out_path + ".tmp", out_path)
+    return con.execute("SELECT COUNT(*) FROM read_parquet(?)", [out_path]).fetchone()[0]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Local analytics snapshot for the duckdb backend")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    snap = sub.add_parser("snapshot", help="write the Parquet snapshot of trent.products")
+    src = snap.add_mutually_exclusive_group()
+    src.add_argument("--from-monkdb", action="store_true", help="page the table out of MonkDB (default)")
+    src.add_argument("--from-parquet-cache", action="store_true", help="merge the ingest Parquet copies")
+    snap.add_argument("--out", default=LOCAL_SNAPSHOT)
+    args = ap.parse_args()
+
+    n = snapshot_from_parquet_cache(args.out) if args.from_parquet_cache else snapshot_from_monkdb(args.out)
+    print(f"wrote {n} rows to {args.out}")
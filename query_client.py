@@ -0,0 +1,246 @@
+# query_client.py
+"""
+Instrumented query client shared by the dashboard, the insight packs, the
+analytics report and the CrewAI tool.
+
+`query(sql, name)` runs a SELECT through query_backend.select_df and records,
+per named query:
+
+  - a latency histogram (Prometheus-style cumulative buckets)
+  - rows returned and result payload bytes
+  - errors and cache hits (callers report hits via record_cache_hit())
+
+Queries slower than SLOW_QUERY_SECS log a warning with the backend's EXPLAIN
+output (at most once per query name every EXPLAIN_COOLDOWN_SECS).
+
+Export:
+  - prometheus_text() / metrics_json()
+  - a local endpoint (GET /metrics, /metrics.json) when [analytics]
+    METRICS_PORT is set, started with start_server()
+  - the JSON file METRICS_JSON, written by write_json() and at process exit
+"""
+import atexit
+import bisect
+import configparser
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+import query_backend
+
+logger = logging.getLogger(__name__)
+
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_FILE_PATH = os.path.join(CURRENT_DIR, "config", "config.ini")
+config = configparser.ConfigParser()
+config.read(CONFIG_FILE_PATH, encoding="utf-8")
+
+SLOW_QUERY_SECS = config.getfloat("analytics", "SLOW_QUERY_SECS", fallback=2.0)
+EXPLAIN_COOLDOWN_SECS = 600
+METRICS_PORT = config.getint("analytics", "METRICS_PORT", fallback=0)
+_json_path = config.get("analytics", "METRICS_JSON", fallback="analytics_out/query_metrics.json")
+METRICS_JSON = os.path.join(CURRENT_DIR, _json_path) if _json_path else None
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class QueryStats:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum_secs = 0.0
+        self.max_secs = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+        self.cache_hits = 0
+
+    def observe(self, secs: float, rows: int, nbytes: int):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, secs)] += 1
+        self.count += 1
+        self.sum_secs += secs
+        self.max_secs = max(self.max_secs, secs)
+        self.rows += rows
+        self.bytes += nbytes
+
+    def to_dict(self) -> dict:
+        cumulative, running = {}, 0
+        for le, n in zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.buckets):
+            running += n
+            cumulative[le] = running
+        return {
+            "count": self.count,
+            "sum_secs": round(self.sum_secs, 6),
+            "avg_secs": round(self.sum_secs / self.count, 6) if self.count else None,
+            "max_secs": round(self.max_secs, 6),
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "buckets": cumulative,
+        }
+
+
+_lock = threading.Lock()
+_stats = {}
+_explained_at = {}
+
+
+def _get(name: str) -> QueryStats:
+    s = _stats.get(name)
+    if s is None:
+        s = _stats[name] = QueryStats()
+    return s
+
+
+def _payload_bytes(df: pd.DataFrame) -> int:
+    try:
+        return int(df.memory_usage(index=False, deep=True).sum())
+    except Exception:
+        return 0
+
+
+def _explain_slow(name: str, sql: str, secs: float):
+    now = time.time()
+    with _lock:
+        if now - _explained_at.get(name, 0) < EXPLAIN_COOLDOWN_SECS:
+            return
+        _explained_at[name] = now
+    try:
+        plan = query_backend.select_df(f"EXPLAIN {sql}", name=f"explain:{name}")
+        plan_text = "\n".join(str(v) for v in plan.iloc[:, -1]) if not plan.empty else "(no plan)"
+    except Exception as e:
+        plan_text = f"(EXPLAIN failed: {e})"
+    logger.warning(f"🐢 Slow query {name}: {secs:.2f}s (threshold {SLOW_QUERY_SECS:.2f}s)\n{plan_text}")
+
+
+def query(sql: str, name: str = None) -> pd.DataFrame:
+    """Run a SELECT (raises RuntimeError on errors) and record it under `name`."""
+    name = name or "unnamed"
+    logger.debug(f"SQL [{name}] =>\n{sql}")
+    t0 = time.perf_counter()
+    try:
+        df = query_backend.select_df(sql, name=name)
+    except Exception:
+        with _lock:
+            _get(name).errors += 1
+        raise
+    secs = time.perf_counter() - t0
+    nbytes = _payload_bytes(df)
+    with _lock:
+        _get(name).observe(secs, len(df), nbytes)
+    if SLOW_QUERY_SECS and secs >= SLOW_QUERY_SECS:
+        _explain_slow(name, sql, secs)
+    return df
+
+
+def record_cache_hit(name: str, n: int = 1):
+    """A cached result was served instead of running `name`."""
+    with _lock:
+        _get(name).cache_hits += n
+
+
+def stats(name: str) -> dict:
+    with _lock:
+        return _get(name).to_dict()
+
+
+# ---------------- Export ----------------
+def metrics_json() -> dict:
+    with _lock:
+        queries = {name: s.to_dict() for name, s in sorted(_stats.items())}
+    decode = query_backend.decode_stats()
+    for name, d in queries.items():
+        if name in decode:
+            d["decode_secs"] = round(decode[name]["decode_secs"], 6)
+            d["result_path"] = decode[name]["path"]
+    return {"generated_at": time.time(), "backend": query_backend.QUERY_BACKEND, "queries": queries}
+
+
+def _label(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text() -> str:
+    data = metrics_json()["queries"]
+    out = [
+        "# HELP monk_query_seconds Query latency in seconds.",
+        "# TYPE monk_query_seconds histogram",
+    ]
+    for name, d in data.items():
+        q = _label(name)
+        for le, n in d["buckets"].items():
+            out.append(f'monk_query_seconds_bucket{{query="{q}",le="{le}"}} {n}')
+        out.append(f'monk_query_seconds_sum{{query="{q}"}} {d["sum_secs"]}')
+        out.append(f'monk_query_seconds_count{{query="{q}"}} {d["count"]}')
+    for metric, key, help_text in (
+        ("monk_query_rows_total", "rows", "Rows returned."),
+        ("monk_query_bytes_total", "bytes", "Result payload bytes (in-memory DataFrame size)."),
+        ("monk_query_errors_total", "errors", "Failed queries."),
+        ("monk_query_cache_hits_total", "cache_hits", "Results served from a cache instead of the database."),
+    ):
+        out.append(f"# HELP {metric} {help_text}")
+        out.append(f"# TYPE {metric} counter")
+        out.extend(f'{metric}{{query="{_label(name)}"}} {d[key]}' for name, d in data.items())
+    return "\n".join(out) + "\n"
+
+
+def write_json(path: str = None):
+    path = path or METRICS_JSON
+    if not path:
+        return
+    with _lock:
+        if not _stats:
+            return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(metrics_json(), f, indent=2)
+    os.replace(tmp, path)
+
+
+atexit.register(write_json)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, ctype = json.dumps(metrics_json(), indent=2), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, ctype = prometheus_text(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+
+
+def start_server(port: int = None):
+    """Serve /metrics on 127.0.0.1:`port` (default METRICS_PORT) from a daemon thread; idempotent."""
+    global _server
+    port = METRICS_PORT if port is None else port
+    with _lock:
+        if _server is not None or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+        except OSError as e:  # e.g. another Streamlit session already holds the port
+            logger.warning(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+            return None
+    threading.Thread(target=_server.serve_forever, name="query-metrics", daemon=True).start()
+    logger.info(f"📈 Query metrics on http://127.0.0.1:{port}/metrics")
+    return _server
@@ -0,0 +1,55 @@
+# query_exec.py
+"""
+Run independent SELECTs concurrently on a bounded thread pool.
+
+Each query is a (name, zero-arg callable) pair; results come back in the
+order they were submitted together with per-query and wall-clock timings.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Tuple
+
+MAX_CONCURRENT_QUERIES = 4
+
+
+def run_all(calls: List[Tuple[str, Callable[[], Any]]],
+            max_workers: int = MAX_CONCURRENT_QUERIES) -> Tuple[list, dict]:
+    """
+    Execute every callable with at most `max_workers` in flight (1 = sequential).
+    Returns (results, timings) where results[i] belongs to calls[i] and timings is
+    {"queries": {name: secs}, "wall_secs": float, "sum_secs": float}.
+    If any call raised, the first failure in submission order is re-raised
+    after all calls have finished.
+    """
+    def timed(fn):
+        t0 = time.perf_counter()
+        try:
+            return fn(), None, time.perf_counter() - t0
+        except Exception as e:
+            return None, e, time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if max_workers <= 1 or len(calls) <= 1:
+        outcomes = [timed(fn) for _, fn in calls]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(calls)),
+                                thread_name_prefix="monk-query") as pool:
+            outcomes = list(pool.map(lambda c: timed(c[1]), calls))
+    wall = time.perf_counter() - t0
+
+    per_query = {name: secs for (name, _), (_, _, secs) in zip(calls, outcomes)}
+    timings = {"queries": per_query, "wall_secs": wall, "sum_secs": sum(per_query.values())}
+
+    for _, err, _ in outcomes:
+        if err is not None:
+            raise err
+    return [res for res, _, _ in outcomes], timings
+
+
+def format_timings(timings: dict) -> str:
+    lines = [f"  {name:<28} {secs*1000:8.1f} ms" for name, secs in timings["queries"].items()]
+    lines.append(
+        f"  {'wall clock':<28} {timings['wall_secs']*1000:8.1f} ms"
+        f"  (sum of queries {timings['sum_secs']*1000:.1f} ms)"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,422 @@
+# rollups.py
+"""
+Incrementally maintained aggregates for trent.products.
+
+csv_insertion_batch folds every fully committed partition into a local
+SQLite store: additive counts/sums per (dimension, group) for the whole
+catalog, each brand, discount band, price bucket, rating band and image
+bucket. The dashboard and KPI code then read O(groups) rows instead of
+re-scanning the table; averages and shares are derived from the sums.
+
+Readers only switch to the store once it covers the whole table: it must be
+seeded from the database first (or marked complete while the table is still
+empty), and it is marked dirty whenever a load cannot be folded in exactly
+(--upsert overwrites, a --fresh replay of a file already counted, a failed
+merge, a load with MAINTAIN_ROLLUPS off). Until then, and after it goes
+dirty, readers query the table as before. Each partition is merged at most
+once (merged ledger), so resumed loads are not counted twice.
+
+    python rollups.py rebuild           # seed / repair from the database
+    python rollups.py mark-complete     # table is empty: start counting from here
+    python rollups.py status
+"""
+import argparse
+import configparser
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_FILE_PATH = os.path.join(CURRENT_DIR, "config", "config.ini")
+config = configparser.ConfigParser()
+config.read(CONFIG_FILE_PATH, encoding="utf-8")
+
+ROLLUP_DB = os.path.join(
+    CURRENT_DIR, config.get("analytics", "ROLLUP_DB", fallback="analytics_out/rollups.sqlite")
+)
+USE_ROLLUPS = config.getboolean("analytics", "USE_ROLLUPS", fallback=True)
+TABLE = "trent.products"
+NULL_GROUP = "<null>"  # SQLite PK cannot hold NULL groups (e.g. missing brand)
+
+# ---------------- Dimensions ----------------
+# SQL group expressions; the pandas versions below must bucket identically
+# (NULL falls through to the ELSE branch, as in the dashboard queries).
+DIMENSIONS_SQL = {
+    "all": "''",
+    "brand": "brand",
+    "discount_band": """CASE
+        WHEN discount_percent = 0 THEN '0%'
+        WHEN discount_percent < 20 THEN '0-20%'
+        WHEN discount_percent < 40 THEN '20-40%'
+        WHEN discount_percent < 60 THEN '40-60%'
+        ELSE '60%+'
+      END""",
+    "price_bucket": """CASE
+        WHEN price < 500 THEN '<500'
+        WHEN price < 1000 THEN '500-999'
+        WHEN price < 2000 THEN '1000-1999'
+        WHEN price < 5000 THEN '2000-4999'
+        ELSE '5000+'
+      END""",
+    "rating_band": """CASE
+        WHEN rating = 0 THEN '0 (unrated)'
+        WHEN rating < 2 THEN '1.0-1.9'
+        WHEN rating < 3 THEN '2.0-2.9'
+        WHEN rating < 4 THEN '3.0-3.9'
+        WHEN rating < 4.5 THEN '4.0-4.49'
+        ELSE '4.5-5.0'
+      END""",
+    "img_bucket": """CASE
+        WHEN img_count IS NULL OR img_count = 0 THEN '0'
+        WHEN img_count <= 2 THEN '1-2'
+        WHEN img_count <= 4 THEN '3-4'
+        ELSE '5+'
+      END""",
+}
+
+METRICS_SQL = {
+    "items": "COUNT(*)",
+    "n_price": "COUNT(price)",
+    "sum_price": "SUM(price)",
+    "n_mrp": "COUNT(mrp)",
+    "sum_mrp": "SUM(mrp)",
+    "n_disc": "COUNT(discount_percent)",
+    "sum_disc": "SUM(discount_percent)",
+    "no_discount_items": "SUM(CASE WHEN price = mrp THEN 1 ELSE 0 END)",
+    "n_rating_nonzero": "COUNT(NULLIF(rating, 0))",
+    "sum_rating_nonzero": "SUM(NULLIF(rating, 0))",
+    "sum_rating_total": "SUM(rating_total)",
+    "rated_items": "SUM(CASE WHEN rating_total > 0 THEN 1 ELSE 0 END)",
+    "unrated_items": "SUM(CASE WHEN rating_total = 0 THEN 1 ELSE 0 END)",
+    "markdown_value": "SUM(GREATEST(mrp - price, 0))",
+    "null_brands": "SUM(CASE WHEN brand IS NULL OR brand = '' THEN 1 ELSE 0 END)",
+    "null_titles": "SUM(CASE WHEN title IS NULL OR title = '' THEN 1 ELSE 0 END)",
+    "bad_price": "SUM(CASE WHEN price IS NULL OR price <= 0 THEN 1 ELSE 0 END)",
+}
+METRICS = list(METRICS_SQL)
+
+
+def _bucket(values: pd.Series, edges, labels, else_label, zero_label=None) -> pd.Series:
+    v = values.to_numpy(dtype="float64", na_value=np.nan)
+    conds, choices = [], []
+    if zero_label is not None:
+        conds.append(v == 0)
+        choices.append(zero_label)
+    for edge, label in zip(edges, labels):
+        conds.append(v < edge)
+        choices.append(label)
+    return pd.Series(np.select(conds, choices, default=else_label), index=values.index)
+
+
+def _dimension_keys(df: pd.DataFrame) -> Dict[str, pd.Series]:
+    img = df["img_count"].to_numpy(dtype="float64", na_value=np.nan)
+    img_bucket = np.select(
+        [np.isnan(img) | (img == 0), img <= 2, img <= 4], ["0", "1-2", "3-4"], default="5+"
+    )
+    return {
+        "all": pd.Series("", index=df.index),
+        "brand": df["brand"].astype(object).where(df["brand"].notna(), NULL_GROUP),
+        "discount_band": _bucket(df["discount_percent"], [20, 40, 60],
+                                 ["0-20%", "20-40%", "40-60%"], "60%+", zero_label="0%"),
+        "price_bucket": _bucket(df["price"], [500, 1000, 2000, 5000],
+                                ["<500", "500-999", "1000-1999", "2000-4999"], "5000+"),
+        "rating_band": _bucket(df["rating"], [2, 3, 4, 4.5],
+                               ["1.0-1.9", "2.0-2.9", "3.0-3.9", "4.0-4.49"], "4.5-5.0",
+                               zero_label="0 (unrated)"),
+        "img_bucket": pd.Series(img_bucket, index=df.index),
+    }
+
+
+def partition_rollup(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate one typed partition (PRODUCTS_SCHEMA columns, nulls as NaN/None)
+    into rows of (dim, grp, *METRICS) ready for merge().
+    """
+    price, mrp = df["price"].astype("float64"), df["mrp"].astype("float64")
+    disc, rating = df["discount_percent"].astype("float64"), df["rating"].astype("float64")
+    rating_total = df["rating_total"].astype("float64")
+    rating_nz = rating.where(rating != 0)
+    brand, title = df["brand"], df["title"]
+
+    m = pd.DataFrame({
+        "items": 1,
+        "n_price": price.notna().astype(int),
+        "sum_price": price.fillna(0),
+        "n_mrp": mrp.notna().astype(int),
+        "sum_mrp": mrp.fillna(0),
+        "n_disc": disc.notna().astype(int),
+        "sum_disc": disc.fillna(0),
+        "no_discount_items": (price == mrp).astype(int),
+        "n_rating_nonzero": rating_nz.notna().astype(int),
+        "sum_rating_nonzero": rating_nz.fillna(0),
+        "sum_rating_total": rating_total.fillna(0),
+        "rated_items": (rating_total > 0).astype(int),
+        "unrated_items": (rating_total == 0).astype(int),
+        "markdown_value": (mrp - price).clip(lower=0).fillna(0),
+        "null_brands": (brand.isna() | (brand == "")).astype(int),
+        "null_titles": (title.isna() | (title == "")).astype(int),
+        "bad_price": (price.isna() | (price <= 0)).astype(int),
+    }, index=df.index)
+
+    parts = []
+    for dim, keys in _dimension_keys(df).items():
+        g = m.groupby(keys.to_numpy(), sort=False).sum()
+        g.insert(0, "grp", g.index.astype(str))
+        g.insert(0, "dim", dim)
+        parts.append(g.reset_index(drop=True))
+    return pd.concat(parts, ignore_index=True)
+
+
+# ---------------- Store ----------------
+_COLS_DDL = ",\n    ".join(f"{m} REAL NOT NULL DEFAULT 0" for m in METRICS)
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS rollups (
+    dim TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    {_COLS_DDL},
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (dim, grp)
+);
+CREATE TABLE IF NOT EXISTS merged (
+    fhash TEXT NOT NULL,
+    layout TEXT NOT NULL,
+    part INTEGER NOT NULL,
+    merged_at REAL NOT NULL,
+    PRIMARY KEY (fhash, layout, part)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _conn(db_path: str = None) -> sqlite3.Connection:
+    db_path = db_path or ROLLUP_DB
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    db = sqlite3.connect(db_path, timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_SCHEMA)
+    return db
+
+
+def merge(partial: pd.DataFrame, db_path: str = None, replace: bool = False, key: tuple = None) -> bool:
+    """
+    Add a partition_rollup() frame into the store in one transaction
+    (replace=True overwrites). With key=(fhash, layout, part) the partition is
+    recorded in the merged ledger in the same transaction, and one that is
+    already there is skipped; returns False when it was.
+    """
+    cols = ", ".join(METRICS)
+    marks = ", ".join("?" for _ in METRICS)
+    if replace:
+        updates = ", ".join(f"{m} = excluded.{m}" for m in METRICS)
+    else:
+        updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in METRICS)
+    now = time.time()
+    rows = [] if partial is None or partial.empty else [
+        (r[0], r[1], *[float(x) for x in r[2:]], now)
+        for r in partial[["dim", "grp", *METRICS]].itertuples(index=False, name=None)
+    ]
+    db = _conn(db_path)
+    try:
+        with db:
+            if key is not None:
+                cur = db.execute("INSERT OR IGNORE INTO merged (fhash, layout, part, merged_at) VALUES (?, ?, ?, ?)",
+                                 (*key, now))
+                if cur.rowcount == 0:
+                    return False
+            db.executemany(
+                f"""INSERT INTO rollups (dim, grp, {cols}, updated_at) VALUES (?, ?, {marks}, ?)
+                    ON CONFLICT (dim, grp) DO UPDATE SET {updates}, updated_at = excluded.updated_at""",
+                rows,
+            )
+    finally:
+        db.close()
+    return True
+
+
+def merged_files(db_path: str = None) -> set:
+    """File hashes with at least one partition in the store."""
+    path = db_path or ROLLUP_DB
+    if not os.path.exists(path):
+        return set()
+    db = _conn(path)
+    try:
+        return {r[0] for r in db.execute("SELECT DISTINCT fhash FROM merged")}
+    finally:
+        db.close()
+
+
+# ---------------- Coverage ----------------
+def _meta(db_path: str = None) -> dict:
+    path = db_path or ROLLUP_DB
+    if not os.path.exists(path):
+        return {}
+    db = _conn(path)
+    try:
+        return dict(db.execute("SELECT key, value FROM meta").fetchall())
+    finally:
+        db.close()
+
+
+def _set_meta(db_path: str = None, **values):
+    db = _conn(db_path)
+    try:
+        with db:
+            db.executemany("INSERT INTO meta (key, value) VALUES (?, ?) "
+                           "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                           [(k, v) for k, v in values.items()])
+    finally:
+        db.close()
+
+
+def mark_complete(db_path: str = None):
+    """The store covers the whole table (after a rebuild, or for a table that is still empty)."""
+    _set_meta(db_path, seeded_at=str(time.time()), dirty=None)
+
+
+def mark_dirty(reason: str, db_path: str = None):
+    """The store no longer matches the table; readers go back to SQL until `rollups.py rebuild`."""
+    if not _meta(db_path).get("seeded_at"):
+        return  # never used by readers anyway
+    _set_meta(db_path, dirty=reason)
+
+
+def status(db_path: str = None) -> dict:
+    meta = _meta(db_path)
+    return {"seeded": bool(meta.get("seeded_at")), "dirty": meta.get("dirty"),
+            "files": len(merged_files(db_path))}
+
+
+def load(dim: str, db_path: str = None) -> pd.DataFrame:
+    db = _conn(db_path)
+    try:
+        df = pd.read_sql_query("SELECT * FROM rollups WHERE dim = ?", db, params=(dim,))
+    finally:
+        db.close()
+    df["grp"] = df["grp"].astype(object)
+    df.loc[df["grp"] == NULL_GROUP, "grp"] = None
+    return df
+
+
+def available(db_path: str = None) -> bool:
+    """Seeded, not dirty, and holding rows."""
+    meta = _meta(db_path)
+    if not meta.get("seeded_at") or meta.get("dirty"):
+        return False
+    return not load("all", db_path).empty
+
+
+def use_rollups(db_path: str = None) -> bool:
+    """Readers should prefer the store: enabled in config.ini and covering the whole table."""
+    return USE_ROLLUPS and available(db_path)
+
+
+# ---------------- Readers (same columns as the SQL they replace) ----------------
+def _avg(s, n):
+    return np.where(n > 0, s / n.where(n > 0, 1), np.nan)
+
+
+def core_kpis(db_path: str = None) -> pd.DataFrame:
+    r = load("all", db_path)
+    if r.empty:
+        return pd.DataFrame()
+    x = r.iloc[0]
+    return pd.DataFrame([{
+        "products": int(x["items"]),
+        "avg_price": round(x["sum_price"] / x["n_price"], 2) if x["n_price"] else None,
+        "avg_mrp": round(x["sum_mrp"] / x["n_mrp"], 2) if x["n_mrp"] else None,
+        "avg_discount_pct": round(x["sum_disc"] / x["n_disc"], 2) if x["n_disc"] else None,
+        "no_discount_items": int(x["no_discount_items"]),
+        "rated_items": int(x["rated_items"]),
+        "unrated_items": int(x["unrated_items"]),
+        "avg_rating_nonzero": (round(x["sum_rating_nonzero"] / x["n_rating_nonzero"], 2)
+                               if x["n_rating_nonzero"] else None),
+        "total_markdown_value": round(x["markdown_value"], 2),
+        "null_brands": int(x["null_brands"]),
+        "null_titles": int(x["null_titles"]),
+        "bad_price": int(x["bad_price"]),
+    }])
+
+
+def grouped(dim: str, label: str, db_path: str = None) -> pd.DataFrame:
+    """Per-group items, averages and share of catalog for one dimension, largest first."""
+    r = load(dim, db_path)
+    if r.empty:
+        return pd.DataFrame()
+    total = r["items"].sum()
+    out = pd.DataFrame({
+        label: r["grp"],
+        "items": r["items"].astype(int),
+        "avg_price": np.round(_avg(r["sum_price"], r["n_price"]), 2),
+        "avg_mrp": np.round(_avg(r["sum_mrp"], r["n_mrp"]), 2),
+        "avg_discount_pct": np.round(_avg(r["sum_disc"], r["n_disc"]), 2),
+        "avg_rating_nonzero": np.round(_avg(r["sum_rating_nonzero"], r["n_rating_nonzero"]), 2),
+        "total_ratings": r["sum_rating_total"].astype(int),
+        "share_pct": np.round(100.0 * r["items"] / total, 2) if total else 0.0,
+    })
+    return out.sort_values("items", ascending=False, kind="stable").reset_index(drop=True)
+
+
+# ---------------- Rebuild ----------------
+def rebuild_from_db(run_select_query=None, db_path: str = None) -> int:
+    """
+    Recompute every dimension with one GROUP BY per dimension, replace the
+    store and mark it complete. The merged ledger is kept: those rows are in
+    the table, so a later resume of one of those partitions must not add them.
+    """
+    if run_select_query is None:
+        from query_backend import run_select_query
+    metrics = ",\n  ".join(f"COALESCE({expr}, 0) AS {name}" for name, expr in METRICS_SQL.items())
+    frames = []
+    for dim, expr in DIMENSIONS_SQL.items():
+        res = run_select_query(f"""
+            SELECT {expr} AS grp,
+              {metrics}
+            FROM {TABLE}
+            GROUP BY 1
+        """)
+        if isinstance(res, dict) and res.get("status") == "error":
+            raise RuntimeError(res["message"])
+        df = pd.DataFrame(res or [])
+        if df.empty:
+            continue
+        df["grp"] = df["grp"].where(df["grp"].notna(), NULL_GROUP).astype(str)
+        df.insert(0, "dim", dim)
+        frames.append(df)
+
+    db = _conn(db_path)
+    try:
+        with db:
+            db.execute("DELETE FROM rollups")
+    finally:
+        db.close()
+    if frames:
+        merge(pd.concat(frames, ignore_index=True), db_path, replace=True)
+    mark_complete(db_path)
+    return sum(len(f) for f in frames)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Ingest-time rollup store for trent.products")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("rebuild", help="recompute the store from the configured query backend")
+    sub.add_parser("mark-complete", help="use the store as is (only for a table that is still empty)")
+    sub.add_parser("status", help="seeded / dirty state of the store")
+    sub.add_parser("show", help="print the catalog-level KPIs from the store")
+    args = ap.parse_args()
+
+    if args.cmd == "rebuild":
+        print(f"rebuilt {rebuild_from_db()} rollup groups in {ROLLUP_DB}")
+    elif args.cmd == "mark-complete":
+        mark_complete()
+        print(f"{ROLLUP_DB} marked complete")
+    elif args.cmd == "status":
+        print(status())
+    else:
+        print(core_kpis().T.to_string(header=False))
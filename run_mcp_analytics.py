@@ -1,24 +1,39 @@
 import os
+import argparse
+import hashlib
 import json
 import time
 import pandas as pd
 from pathlib import Path
-from mcp_monkdb.mcp_server import run_select_query
+import query_client
+from query_backend import decode_stats
+
+import data_version
+import sampling
+from query_exec import MAX_CONCURRENT_QUERIES, format_timings, run_all
 
 OUTDIR = Path("./analytics_out")
 OUTDIR.mkdir(parents=True, exist_ok=True)
+# Per-report fingerprint of the data each CSV was computed from (--incremental)
+MANIFEST_PATH = OUTDIR / "report_manifest.json"
+SUMMARY_PATH = OUTDIR / "report_summary.json"
 
 
-def q(name: str, sql: str, limit_csv_rows: int | None = None) -> pd.DataFrame:
-    """Run a SELECT via MCP and return a DataFrame. Also write a CSV."""
-    print(f"\n=== {name} ===")
-    t0 = time.time()
-    res = run_select_query(sql)
-    if isinstance(res, dict) and res.get("status") == "error":
-        print(f"❌ {name}: {res['message']}")
-        return pd.DataFrame()
+def fetch(sql: str, name: str = None):
+    """Run a SELECT via the query backend. Returns (DataFrame, error message or None)."""
+    try:
+        return query_client.query(sql, name), None
+    except RuntimeError as e:
+        return pd.DataFrame(), str(e)
+
 
-    df = pd.DataFrame(res or [])
+def report(name: str, df: pd.DataFrame, err: str | None, secs: float,
+           limit_csv_rows: int | None = None) -> pd.DataFrame:
+    """Print a query result and write it to analytics_out/<name>.csv."""
+    print(f"\n=== {name} ===")
+    if err is not None:
+        print(f"❌ {name}: {err}")
+        return df
     if df.empty:
         print(" (no rows)")
         return df
@@ -28,31 +43,43 @@ def q(name: str, sql: str, limit_csv_rows: int | None = None) -> pd.DataFrame:
     df_out = df if limit_csv_rows is None else df.head(limit_csv_rows)
     df_out.to_csv(csv_path, index=False)
     print(
-        f"→ saved {csv_path} ({len(df_out)} rows; full rows: {len(df)}) in {time.time()-t0:.2f}s")
+        f"→ saved {csv_path} ({len(df_out)} rows; full rows: {len(df)}) in {secs:.2f}s")
     return df
 
 
-def main():
+def sample_price_vs_mrp():
+    """1000 hash-ranked products (sampling.py) instead of ORDER BY RANDOM() over the table."""
+    try:
+        df = sampling.sample(1000, non_null=("price", "mrp"),
+                             columns=["product_id", "brand", "price", "mrp", "discount_percent"])
+        return df, None
+    except Exception as e:
+        return pd.DataFrame(), str(e)
+
+
+# name -> SELECT (or a callable returning fetch()'s (df, err));
+# each result is written to analytics_out/<name>.csv
+REPORTS = [
     # 0) sanity
-    q("row_counts", """
+    ("row_counts", """
         SELECT
           COUNT(*) AS products,
           COUNT(DISTINCT brand) AS brands
         FROM trent.products
-    """)
+    """),
 
     # 1) core KPIs
-    q("core_kpis", """
+    ("core_kpis", """
         SELECT
           ROUND(AVG(price),2) AS avg_price,
           ROUND(AVG(mrp),2)   AS avg_mrp,
           ROUND(AVG(discount_percent),2) AS avg_discount_pct,
           SUM(CASE WHEN price = mrp THEN 1 ELSE 0 END) AS no_discount_items
         FROM trent.products
-    """)
+    """),
 
     # 2) discount bands
-    q("discount_bands", """
+    ("discount_bands", """
     SELECT band, COUNT(*) AS items
     FROM (
       SELECT CASE
@@ -66,10 +93,10 @@ def main():
     ) b
     GROUP BY band
     ORDER BY items DESC
-""")
+"""),
 
     # 3) brand-wise avg discount (min 5 items)
-    q("brand_avg_discount_top20", """
+    ("brand_avg_discount_top20", """
         SELECT brand,
                COUNT(*) AS items,
                ROUND(AVG(discount_percent),2) AS avg_discount_pct
@@ -78,10 +105,10 @@ def main():
         HAVING COUNT(*) >= 5
         ORDER BY avg_discount_pct DESC
         LIMIT 20
-    """)
+    """),
 
     # 4) brand concentration (share of catalog)
-    q("brand_concentration_top20", """
+    ("brand_concentration_top20", """
     SELECT t.brand,
            t.c AS items,
            ROUND(100.0 * t.c / total.s, 2) AS share_pct
@@ -96,19 +123,19 @@ def main():
     ) total
     ORDER BY t.c DESC
     LIMIT 20
-""")
+"""),
 
     # 5) ratings coverage & quality
-    q("ratings_coverage", """
+    ("ratings_coverage", """
         SELECT
           SUM(CASE WHEN rating_total > 0 THEN 1 ELSE 0 END) AS rated_items,
           SUM(CASE WHEN rating_total = 0 THEN 1 ELSE 0 END) AS unrated_items,
           ROUND(AVG(NULLIF(rating, 0)), 2) AS avg_rating_nonzero
         FROM trent.products
-    """)
+    """),
 
     # 6) rating distribution (bands)
-    q("rating_distribution", """
+    ("rating_distribution", """
         SELECT CASE
           WHEN rating = 0 THEN '0 (unrated)'
           WHEN rating < 2 THEN '1.0-1.9'
@@ -121,28 +148,28 @@ def main():
         FROM trent.products
         GROUP BY rating_band
         ORDER BY items DESC
-    """)
+    """),
 
     # 7) top products by rating & social proof
-    q("top_rated_by_volume", """
+    ("top_rated_by_volume", """
         SELECT product_id, title, brand, rating, rating_total, price, mrp, discount_percent
         FROM trent.products
         WHERE rating_total >= 100 AND rating >= 4
         ORDER BY rating DESC, rating_total DESC
         LIMIT 50
-    """)
+    """),
 
     # 8) highest discounts among rated items
-    q("highest_discounts_rated", """
+    ("highest_discounts_rated", """
         SELECT product_id, title, brand, price, mrp, discount_percent, rating, rating_total
         FROM trent.products
         WHERE rating_total > 0
         ORDER BY discount_percent DESC, price ASC
         LIMIT 50
-    """)
+    """),
 
     # 9) rating vs discount band
-    q("rating_by_discount_band", """
+    ("rating_by_discount_band", """
     SELECT band,
            ROUND(AVG(NULLIF(rating,0)), 2) AS avg_rating_nonzero,
            SUM(rating_total) AS total_ratings,
@@ -161,10 +188,10 @@ def main():
     ) bands
     GROUP BY band
     ORDER BY band
-""")
+"""),
 
     # 10) price buckets with avg discount
-    q("price_bucket_distribution", """
+    ("price_bucket_distribution", """
         SELECT CASE
           WHEN price < 500 THEN '<500'
           WHEN price < 1000 THEN '500-999'
@@ -177,10 +204,10 @@ def main():
         FROM trent.products
         GROUP BY price_bucket
         ORDER BY items DESC
-    """)
+    """),
 
     # 11) image count vs rating
-    q("image_count_vs_rating", """
+    ("image_count_vs_rating", """
         SELECT CASE
           WHEN img_count IS NULL OR img_count = 0 THEN '0'
           WHEN img_count <= 2 THEN '1-2'
@@ -192,44 +219,128 @@ def main():
         FROM trent.products
         GROUP BY img_bucket
         ORDER BY items DESC
-    """)
+    """),
 
     # 12) total markdown value (mrp - price)
-    q("total_markdown_value", """
+    ("total_markdown_value", """
         SELECT ROUND(SUM(GREATEST(mrp - price, 0)), 2) AS total_markdown_value
         FROM trent.products
-    """)
+    """),
 
     # 13) duplicates by title (possible catalog hygiene)
-    q("duplicate_titles_top50", """
+    ("duplicate_titles_top50", """
         SELECT title, COUNT(*) AS dupes
         FROM trent.products
         GROUP BY title
         HAVING COUNT(*) > 1
         ORDER BY dupes DESC
         LIMIT 50
-    """)
+    """),
 
     # 14) data quality checks
-    q("data_quality_nulls", """
+    ("data_quality_nulls", """
         SELECT
           SUM(CASE WHEN brand IS NULL OR brand = '' THEN 1 ELSE 0 END) AS null_brands,
           SUM(CASE WHEN title IS NULL OR title = '' THEN 1 ELSE 0 END) AS null_titles,
           SUM(CASE WHEN price IS NULL OR price <= 0 THEN 1 ELSE 0 END) AS bad_price
         FROM trent.products
-    """)
+    """),
 
     # 15) sample for scatter (price vs mrp)
-    q("sample_price_vs_mrp", """
-        SELECT product_id, brand, price, mrp, discount_percent
-        FROM trent.products
-        WHERE price IS NOT NULL AND mrp IS NOT NULL
-        ORDER BY RANDOM()
-        LIMIT 1000
-    """)
+    ("sample_price_vs_mrp", sample_price_vs_mrp),
+]
+
+
+# ---------------- Change detection ----------------
+def fingerprint() -> dict:
+    """Cheap identity of the table's contents: row count, max product_id and the last local load."""
+    df, err = fetch("SELECT COUNT(*) AS row_count, MAX(product_id) AS max_product_id FROM trent.products",
+                    "fingerprint")
+    if err is not None:
+        raise RuntimeError(err)
+    row = df.iloc[0] if not df.empty else {}
+    v = data_version.current()
+    return {
+        "row_count": int(row.get("row_count") or 0),
+        "max_product_id": None if pd.isna(row.get("max_product_id")) else int(row.get("max_product_id")),
+        "data_version": int(v.get("version", 0)),
+    }
+
+
+def query_id(sql) -> str:
+    """Changes when a report's SQL (or sampler function) changes, so edited reports are recomputed."""
+    text = sql if isinstance(sql, str) else f"{sql.__module__}.{sql.__qualname__}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def load_manifest() -> dict:
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: dict):
+    tmp = MANIFEST_PATH.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def is_fresh(name: str, sql, entry: dict | None, fp: dict) -> bool:
+    if not entry or entry.get("fingerprint") != fp or entry.get("query") != query_id(sql):
+        return False
+    return not entry.get("rows") or (OUTDIR / f"{name}.csv").exists()
+
+
+def main(max_workers: int = MAX_CONCURRENT_QUERIES, incremental: bool = False):
+    t0 = time.perf_counter()
+    fp = fingerprint()
+    manifest = load_manifest()
+    todo = [(name, sql) for name, sql in REPORTS
+            if not (incremental and is_fresh(name, sql, manifest.get(name), fp))]
+    cached = [name for name, _ in REPORTS if name not in dict(todo)]
+    for name in cached:
+        query_client.record_cache_hit(name)
+
+    # The reports are independent: fetch them concurrently, then print/save in order.
+    calls = [(name, sql if callable(sql) else (lambda sql=sql, name=name: fetch(sql, name))) for name, sql in todo]
+    results, timings = run_all(calls, max_workers) if calls else ([], {"queries": {}, "wall_secs": 0.0, "sum_secs": 0.0})
+
+    failed = []
+    for (name, sql), (df, err) in zip(todo, results):
+        report(name, df, err, timings["queries"][name])
+        if err is not None:
+            failed.append(name)
+            continue
+        manifest[name] = {"fingerprint": fp, "query": query_id(sql), "rows": len(df), "written_at": time.time()}
+    save_manifest(manifest)
+
+    summary = {
+        "finished_at": time.time(),
+        "incremental": incremental,
+        "fingerprint": fp,
+        "recomputed": [name for name, _ in todo if name not in failed],
+        "cache_hits": cached,
+        "failed": failed,
+        "query_secs": timings["queries"],
+        "queries_wall_secs": timings["wall_secs"],
+        "decode": decode_stats(),
+        "total_secs": time.perf_counter() - t0,
+    }
+    SUMMARY_PATH.write_text(json.dumps(summary, indent=2), encoding="utf-8")
 
+    print(f"\n=== timings (concurrency {max_workers}) ===")
+    print(format_timings(timings))
+    print(f"\nrecomputed {len(summary['recomputed'])}, up to date {len(cached)}, failed {len(failed)}"
+          f" (fingerprint {fp}); summary in {SUMMARY_PATH}")
     print("\nAll analytics complete. CSVs are in ./analytics_out/")
 
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENT_QUERIES,
+                    help="report queries in flight at once (1 = run them one after another)")
+    ap.add_argument("--incremental", action="store_true",
+                    help="only recompute reports whose data fingerprint or SQL changed (for cron)")
+    args = ap.parse_args()
+    main(args.max_concurrency, args.incremental)
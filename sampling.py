@@ -0,0 +1,462 @@
+# sampling.py
+"""
+Row samples of trent.products without ORDER BY RANDOM().
+
+Every method ranks rows by the same deterministic hash of product_id:
+
+    h = ((product_id + seed) * 2654435761) % 4294967296
+
+so a sample of n rows is "the n rows with the smallest h", and repeated runs
+(or a different method) return the same products. Methods:
+
+  - "reservoir"   : bottom-k reservoirs kept at ingest time by
+                    csv_insertion_batch (one for the catalog, one per brand),
+                    read from a local SQLite file; unfiltered samples only,
+                    and only once the reservoirs cover the whole table (see
+                    below)
+  - "tablesample" : the engine's own sampler (DuckDB backend only)
+  - "hash"        : SQL filter h < threshold, with the threshold sized from
+                    the row count, then ORDER BY h LIMIT n over the survivors
+  - "auto"        : reservoir if it can answer, else tablesample, else hash
+
+stratify=True spreads the sample across brands (round-robin by per-brand hash
+rank) so small brands still appear; rows without a brand are left out. In SQL
+("hash") that is a ROW_NUMBER() OVER (PARTITION BY brand ...) window, which
+hashes and sorts every matching row: a full scan and sort of the filtered
+table, not a cheap path. product_id must stay below ~3.4e9 for the hash to fit
+in a BIGINT.
+
+Ingest only sees loads made after the reservoirs were started, so they are
+used once seeded from the table (`rebuild`), or marked complete while the
+table is still empty, and not after a load that skipped them (dirty).
+
+    python sampling.py rebuild          # refill the reservoirs from the query backend
+    python sampling.py mark-complete    # table is empty: start sampling from here
+    python sampling.py show -n 20
+"""
+import argparse
+import configparser
+import json
+import math
+import os
+import sqlite3
+import time
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_FILE_PATH = os.path.join(CURRENT_DIR, "config", "config.ini")
+config = configparser.ConfigParser()
+config.read(CONFIG_FILE_PATH, encoding="utf-8")
+
+SAMPLE_DB = os.path.join(
+    CURRENT_DIR, config.get("analytics", "SAMPLE_DB", fallback="analytics_out/samples.sqlite")
+)
+RESERVOIR_ROWS = config.getint("analytics", "RESERVOIR_ROWS", fallback=20000)
+RESERVOIR_ROWS_PER_BRAND = config.getint("analytics", "RESERVOIR_ROWS_PER_BRAND", fallback=200)
+
+TABLE = "trent.products"
+HASH_MULT = 2654435761  # Knuth's multiplicative constant
+HASH_MOD = 2 ** 32
+OVERSAMPLE = 2.0        # hash threshold headroom so one pass usually yields n rows
+SAMPLE_COLUMNS = ["product_id", "title", "brand", "price", "mrp",
+                  "discount_percent", "rating", "rating_total"]
+METHODS = ("auto", "reservoir", "tablesample", "hash")
+TABLESAMPLE_BACKENDS = {"duckdb"}
+
+
+def hash_sql(seed: int = 0) -> str:
+    return f"(((product_id + {int(seed)}) * {HASH_MULT}) % {HASH_MOD})"
+
+
+def hash_values(product_id: pd.Series, seed: int = 0) -> np.ndarray:
+    """Same value as hash_sql() for each product_id (int64, like a BIGINT)."""
+    pid = product_id.to_numpy(dtype="int64")
+    return ((pid + int(seed)) * HASH_MULT) % HASH_MOD
+
+
+def _where(where: str, non_null: Sequence[str]) -> str:
+    clauses = [where or "1=1"] + [f"{c} IS NOT NULL" for c in non_null]
+    return " AND ".join(clauses)
+
+
+def _run(sql: str, run_select_query=None) -> pd.DataFrame:
+    if run_select_query is None:
+        import query_client
+        return query_client.query(sql, "sample")
+    res = run_select_query(sql)
+    if isinstance(res, dict) and res.get("status") == "error":
+        raise RuntimeError(res["message"])
+    return pd.DataFrame(res or [])
+
+
+def _stratified(df: pd.DataFrame, n: int) -> pd.DataFrame:
+    """Round-robin over brands: every brand's best-ranked row first, then the second, ..."""
+    df = df.sort_values(["h", "product_id"], kind="stable")
+    rank = df.groupby(df["brand"].fillna("\0"), sort=False).cumcount()
+    return df.assign(_rn=rank).sort_values(["_rn", "h"], kind="stable").head(n).drop(columns="_rn")
+
+
+# ---------------- SQL methods ----------------
+def hash_sample(n: int, where: str = "1=1", columns: Sequence[str] = SAMPLE_COLUMNS,
+                stratify: bool = False, seed: int = 0, run_select_query=None) -> pd.DataFrame:
+    """
+    Rows with the smallest hash among those matching `where`. Only rows under
+    the threshold reach the sort; the threshold grows if a pass comes up short.
+    stratify=True ranks every matching row per brand instead (no threshold).
+    """
+    cols = ", ".join(["product_id"] + [c for c in columns if c != "product_id"]
+                     + (["brand"] if stratify and "brand" not in columns else []))
+    total = int(_run(f"SELECT COUNT(*) AS n FROM {TABLE} WHERE {where}", run_select_query)["n"].iloc[0])
+    if total == 0:
+        return pd.DataFrame(columns=list(columns))
+
+    if stratify:
+        brands = int(_run(f"SELECT COUNT(DISTINCT brand) AS b FROM {TABLE} WHERE {where}",
+                          run_select_query)["b"].iloc[0]) or 1
+        per_brand = max(1, math.ceil(n / brands))
+        df = _run(f"""
+            SELECT {cols}, h FROM (
+              SELECT {cols}, {hash_sql(seed)} AS h,
+                     ROW_NUMBER() OVER (PARTITION BY brand ORDER BY {hash_sql(seed)}, product_id) AS rn
+              FROM {TABLE}
+              WHERE {where} AND brand IS NOT NULL
+            ) s
+            WHERE rn <= {per_brand}
+        """, run_select_query)
+        return _stratified(df, n)[list(columns)].reset_index(drop=True)
+
+    threshold = min(HASH_MOD, math.ceil(HASH_MOD * OVERSAMPLE * n / total) + 1)
+    while True:
+        df = _run(f"""
+            SELECT {cols}, {hash_sql(seed)} AS h
+            FROM {TABLE}
+            WHERE {where} AND {hash_sql(seed)} < {threshold}
+            ORDER BY h, product_id
+            LIMIT {int(n)}
+        """, run_select_query)
+        if len(df) >= n or threshold >= HASH_MOD:
+            return df.drop(columns="h").reset_index(drop=True)
+        threshold = min(HASH_MOD, threshold * 4)
+
+
+def tablesample_sample(n: int, where: str = "1=1", columns: Sequence[str] = SAMPLE_COLUMNS,
+                       seed: int = 0, run_select_query=None) -> pd.DataFrame:
+    """DuckDB's reservoir sampler over the filtered rows (repeatable for a given seed)."""
+    cols = ", ".join(columns)
+    return _run(f"""
+        SELECT {cols} FROM (
+          SELECT {cols} FROM {TABLE} WHERE {where}
+        ) s
+        USING SAMPLE reservoir({int(n)} ROWS) REPEATABLE ({int(seed)})
+    """, run_select_query)
+
+
+# ---------------- Ingest-time reservoirs ----------------
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reservoir (
+    scope TEXT NOT NULL,            -- 'all' or 'brand'
+    product_id INTEGER NOT NULL,
+    h INTEGER NOT NULL,
+    brand TEXT,
+    row_json TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (scope, product_id)
+);
+CREATE INDEX IF NOT EXISTS reservoir_rank ON reservoir (scope, brand, h);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _conn(db_path: str = None) -> sqlite3.Connection:
+    db_path = db_path or SAMPLE_DB
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    db = sqlite3.connect(db_path, timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_SCHEMA)
+    return db
+
+
+def partition_sample(df: pd.DataFrame, k: int = RESERVOIR_ROWS,
+                     k_per_brand: int = RESERVOIR_ROWS_PER_BRAND) -> pd.DataFrame:
+    """
+    Bottom-k candidates of one typed partition: the k smallest hashes overall
+    and the k_per_brand smallest per brand, as rows of (scope, h, *SAMPLE_COLUMNS).
+    Merging candidates from every partition and trimming gives the same
+    reservoir as sampling the whole table.
+    """
+    df = df[df["product_id"].notna()]
+    if df.empty:
+        return pd.DataFrame()
+    s = df[SAMPLE_COLUMNS].assign(h=hash_values(df["product_id"]))
+    s = s.sort_values(["h", "product_id"], kind="stable").drop_duplicates("product_id", keep="last")
+    overall = s.head(k).assign(scope="all")
+    per_brand = s[s["brand"].notna()].groupby("brand", sort=False).head(k_per_brand).assign(scope="brand")
+    return pd.concat([overall, per_brand], ignore_index=True)
+
+
+def _beats_cutoff(db: sqlite3.Connection, candidates: pd.DataFrame, k: int, k_per_brand: int) -> np.ndarray:
+    """
+    Candidates that can still enter a reservoir: under its current k-th hash,
+    or already in it (an upsert may have changed the row or its brand). Cutoffs
+    only go down, so whatever is dropped here would have been trimmed anyway.
+    """
+    scope, h, brand = candidates["scope"].to_numpy(), candidates["h"].to_numpy(), candidates["brand"]
+    cut_all = db.execute("SELECT MAX(h), COUNT(*) FROM reservoir WHERE scope = 'all'").fetchone()
+    cut_brand = dict(db.execute(
+        "SELECT brand, MAX(h) FROM reservoir WHERE scope = 'brand' GROUP BY brand HAVING COUNT(*) >= ?",
+        (k_per_brand,)).fetchall())
+    limit = np.where(scope == "all", cut_all[0] if cut_all[1] >= k else HASH_MOD,
+                     brand.map(cut_brand).fillna(HASH_MOD).to_numpy())
+    keep = h <= limit
+    db.execute("DELETE FROM candidate")
+    db.executemany("INSERT OR IGNORE INTO candidate (product_id) VALUES (?)",
+                   [(int(p),) for p in candidates["product_id"][~keep]])
+    present = {r[0] for r in db.execute(
+        "SELECT r.product_id FROM reservoir r JOIN candidate c ON c.product_id = r.product_id "
+        "WHERE r.scope = 'brand'")}
+    return keep | ((scope == "brand") & candidates["product_id"].isin(present).to_numpy())
+
+
+def merge(candidates: pd.DataFrame, db_path: str = None, k: int = RESERVOIR_ROWS,
+          k_per_brand: int = RESERVOIR_ROWS_PER_BRAND):
+    """
+    Upsert the partition_sample() rows that can still enter a reservoir and
+    trim the reservoirs they touched back to their bottom-k, in one transaction.
+    """
+    if candidates is None or candidates.empty:
+        return
+    db = _conn(db_path)
+    try:
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS touched (brand TEXT PRIMARY KEY, cut INTEGER)")
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS candidate (product_id INTEGER PRIMARY KEY)")
+        with db:
+            candidates = candidates[_beats_cutoff(db, candidates, k, k_per_brand)]
+            if candidates.empty:
+                return
+            now = time.time()
+            payload = candidates[SAMPLE_COLUMNS].astype(object).where(candidates[SAMPLE_COLUMNS].notna(), None)
+            db.executemany(
+                """INSERT INTO reservoir (scope, product_id, h, brand, row_json, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (scope, product_id) DO UPDATE SET
+                     h = excluded.h, brand = excluded.brand,
+                     row_json = excluded.row_json, updated_at = excluded.updated_at""",
+                [(scope, int(pid), int(h), brand, json_row, now)
+                 for scope, pid, h, brand, json_row in zip(
+                     candidates["scope"], candidates["product_id"], candidates["h"], candidates["brand"],
+                     payload.to_json(orient="records", lines=True).splitlines())],
+            )
+            if (candidates["scope"] == "all").any():
+                db.execute("""
+                    DELETE FROM reservoir WHERE scope = 'all' AND product_id IN (
+                      SELECT product_id FROM reservoir WHERE scope = 'all'
+                      ORDER BY h, product_id LIMIT -1 OFFSET ?
+                    )""", (k,))
+            # All touched brands at once: each brand's k-th hash (an index seek on
+            # (scope, brand, h)), then one DELETE of the rows past it. h is
+            # unique per product_id, so there are no ties at the cutoff.
+            db.execute("DELETE FROM touched")
+            db.executemany("INSERT OR IGNORE INTO touched (brand) VALUES (?)",
+                           [(b,) for b in candidates.loc[candidates["scope"] == "brand", "brand"].unique()])
+            db.execute("""
+                UPDATE touched SET cut = (
+                  SELECT x.h FROM reservoir x WHERE x.scope = 'brand' AND x.brand = touched.brand
+                  ORDER BY x.h LIMIT 1 OFFSET ?
+                )""", (k_per_brand - 1,))
+            db.execute("""
+                DELETE FROM reservoir WHERE rowid IN (
+                  SELECT r.rowid FROM touched t
+                  JOIN reservoir r ON r.scope = 'brand' AND r.brand = t.brand AND r.h > t.cut
+                )""")
+    finally:
+        db.close()
+
+
+def _meta(db_path: str = None) -> dict:
+    path = db_path or SAMPLE_DB
+    if not os.path.exists(path):
+        return {}
+    db = _conn(path)
+    try:
+        return dict(db.execute("SELECT key, value FROM meta").fetchall())
+    finally:
+        db.close()
+
+
+def _set_meta(db_path: str = None, **values):
+    db = _conn(db_path)
+    try:
+        with db:
+            db.executemany("INSERT INTO meta (key, value) VALUES (?, ?) "
+                           "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                           [(k, v) for k, v in values.items()])
+    finally:
+        db.close()
+
+
+def mark_complete(db_path: str = None):
+    """The reservoirs cover the whole table (after a rebuild, or for a table that is still empty)."""
+    _set_meta(db_path, seeded_at=str(time.time()), dirty=None)
+
+
+def mark_dirty(reason: str, db_path: str = None):
+    """Rows were loaded without updating the reservoirs; "auto" stops using them until a rebuild."""
+    if _meta(db_path).get("seeded_at"):
+        _set_meta(db_path, dirty=reason)
+
+
+def available(db_path: str = None) -> bool:
+    """Seeded, not dirty, and holding rows."""
+    path = db_path or SAMPLE_DB
+    meta = _meta(path)
+    if not meta.get("seeded_at") or meta.get("dirty"):
+        return False
+    db = _conn(path)
+    try:
+        return db.execute("SELECT 1 FROM reservoir LIMIT 1").fetchone() is not None
+    finally:
+        db.close()
+
+
+def reservoir_sample(n: int, columns: Sequence[str] = SAMPLE_COLUMNS, stratify: bool = False,
+                     non_null: Iterable[str] = (), db_path: str = None) -> pd.DataFrame:
+    """
+    Read n rows from the ingest-time reservoirs (catalog-wide or per brand).
+    The non_null filter, the round-robin over brands and the limit all run in
+    SQLite, so only the n rows returned are decoded. Stratified reads rank
+    just each brand's first `depth` rows (an index seek per brand for the
+    cutoff); depth starts at n / brands and doubles if a pass comes up short.
+    """
+    unknown = [c for c in non_null if c not in SAMPLE_COLUMNS]
+    if unknown:
+        raise ValueError(f"reservoir rows have no column(s) {unknown}")
+
+    def present(alias: str) -> str:
+        return "".join(f" AND json_extract({alias}.row_json, '$.{c}') IS NOT NULL" for c in non_null)
+
+    db = _conn(db_path)
+    try:
+        if not stratify:
+            found = db.execute(f"""
+                SELECT r.row_json FROM reservoir r WHERE r.scope = 'all'{present("r")}
+                ORDER BY r.h, r.product_id
+                LIMIT ?""", (int(n),)).fetchall()
+        else:
+            brands, deepest = db.execute(
+                "SELECT COUNT(*), MAX(k) FROM (SELECT COUNT(*) AS k FROM reservoir "
+                "WHERE scope = 'brand' GROUP BY brand)").fetchone()
+            depth = max(1, math.ceil(n / (brands or 1)))
+            while True:
+                # Same order as _stratified(): every brand's best-ranked row, then the second, ...
+                found = db.execute(f"""
+                    WITH cut AS (
+                      SELECT b.brand, COALESCE((
+                        SELECT x.h FROM reservoir x
+                        WHERE x.scope = 'brand' AND x.brand = b.brand{present("x")}
+                        ORDER BY x.h LIMIT 1 OFFSET ?
+                      ), {HASH_MOD}) AS h
+                      FROM (SELECT DISTINCT brand FROM reservoir WHERE scope = 'brand') b
+                    ), ranked AS (
+                      SELECT r.row_json, r.h, r.product_id,
+                             ROW_NUMBER() OVER (PARTITION BY r.brand ORDER BY r.h, r.product_id) AS rn
+                      FROM cut c
+                      JOIN reservoir r ON r.scope = 'brand' AND r.brand = c.brand AND r.h <= c.h{present("r")}
+                    )
+                    SELECT row_json FROM ranked
+                    ORDER BY rn, h, product_id
+                    LIMIT ?""", (depth - 1, int(n))).fetchall()
+                if len(found) >= n or depth >= (deepest or 0):
+                    break
+                depth *= 2
+    finally:
+        db.close()
+    if not found:
+        return pd.DataFrame(columns=list(columns))
+    return pd.DataFrame([json.loads(r[0]) for r in found])[list(columns)]
+
+
+def rebuild_from_db(run_select_query=None, db_path: str = None) -> int:
+    """Refill both reservoirs from the table with hash-ranked SQL (after out-of-band changes)."""
+    overall = hash_sample(RESERVOIR_ROWS, run_select_query=run_select_query)
+    brands = _run(f"""
+        SELECT {", ".join(SAMPLE_COLUMNS)} FROM (
+          SELECT {", ".join(SAMPLE_COLUMNS)},
+                 ROW_NUMBER() OVER (PARTITION BY brand ORDER BY {hash_sql()}, product_id) AS rn
+          FROM {TABLE}
+          WHERE brand IS NOT NULL
+        ) s
+        WHERE rn <= {RESERVOIR_ROWS_PER_BRAND}
+    """, run_select_query)
+    db = _conn(db_path)
+    try:
+        with db:
+            db.execute("DELETE FROM reservoir")
+    finally:
+        db.close()
+    candidates = pd.concat([
+        overall.assign(scope="all"), brands.assign(scope="brand"),
+    ], ignore_index=True)
+    candidates["h"] = hash_values(candidates["product_id"])
+    merge(candidates, db_path)
+    mark_complete(db_path)
+    return len(candidates)
+
+
+# ---------------- Entry point ----------------
+def sample(n: int, where: str = "1=1", method: str = "auto", stratify: bool = False,
+           columns: Sequence[str] = SAMPLE_COLUMNS, non_null: Iterable[str] = (),
+           seed: int = 0, backend: Optional[str] = None, run_select_query=None) -> pd.DataFrame:
+    """
+    Up to n rows matching `where` (plus non-null `non_null` columns).
+    See the module docstring for the methods; "auto" picks the cheapest one
+    that can honour the arguments (filtered stratified samples always end up
+    on the full-sort "hash" path).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown sampling method {method!r}; expected one of {METHODS}")
+    non_null = list(non_null)
+    unfiltered = (where or "1=1").strip() == "1=1" and seed == 0
+    if method == "auto":
+        if backend is None:
+            from query_backend import QUERY_BACKEND as backend
+        if unfiltered and set(columns) <= set(SAMPLE_COLUMNS) and available():
+            method = "reservoir"
+        elif backend.lower() in TABLESAMPLE_BACKENDS and not stratify:
+            method = "tablesample"
+        else:
+            method = "hash"
+
+    if method == "reservoir":
+        if not unfiltered:
+            raise ValueError("reservoir samples cannot apply a WHERE clause or seed")
+        return reservoir_sample(n, columns, stratify, non_null)
+    full_where = _where(where, non_null)
+    if method == "tablesample":
+        return tablesample_sample(n, full_where, columns, seed, run_select_query)
+    return hash_sample(n, full_where, columns, stratify, seed, run_select_query)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sampling for trent.products")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("rebuild", help="refill the ingest-time reservoirs from the query backend")
+    sub.add_parser("mark-complete", help="use the reservoirs as they are (only for a table that is still empty)")
+    show = sub.add_parser("show", help="print a sample")
+    show.add_argument("-n", type=int, default=20)
+    show.add_argument("--method", choices=METHODS, default="auto")
+    show.add_argument("--stratify", action="store_true")
+    args = ap.parse_args()
+
+    if args.cmd == "rebuild":
+        print(f"stored {rebuild_from_db()} reservoir rows in {SAMPLE_DB}")
+    elif args.cmd == "mark-complete":
+        mark_complete()
+        print(f"{SAMPLE_DB} marked complete")
+    else:
+        print(sample(args.n, method=args.method, stratify=args.stratify).to_string(index=False))
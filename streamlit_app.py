@@ -1,13 +1,14 @@
-import json
 from functools import lru_cache
 from pathlib import Path
-import sys
 import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
 
-# MCP import (SELECT-only)
-from mcp_monkdb.mcp_server import run_select_query
+# SELECT-only backend: MCP -> MonkDB, or the local DuckDB snapshot (config.ini [analytics])
+import query_client
+import rollups
+import sampling
+from gen_insights_force import build_where
 
 SCHEMA_TABLE = "trent.products"  # adjust if needed
 
@@ -52,11 +53,23 @@ def create_brand_price_discount_chart(df):
     return fig
 
 @st.cache_data(ttl=300)
-def q(sql: str) -> pd.DataFrame:
-    res = run_select_query(sql)
-    if isinstance(res, dict) and res.get("status") == "error":
-        raise RuntimeError(res["message"])
-    return pd.DataFrame(res or [])
+def _cached_query(sql: str, name: str, _ran: list) -> pd.DataFrame:
+    _ran.append(True)  # not hashed (leading underscore); stays empty on a cache hit
+    return query_client.query(sql, name)
+
+def q(sql: str, name: str = None) -> pd.DataFrame:
+    ran = []
+    df = _cached_query(sql, name, ran)
+    if not ran:
+        query_client.record_cache_hit(name or "unnamed")
+    return df
+
+query_client.start_server()  # no-op unless [analytics] METRICS_PORT is set
+
+@st.cache_data(ttl=300)
+def rollup(dim: str, label: str) -> pd.DataFrame:
+    """Per-group aggregates maintained at ingest time (rollups.py); O(groups), no table scan."""
+    return rollups.grouped(dim, label)
 
 
 
@@ -71,20 +84,37 @@ st.title("Product Trends Agentic AI: Data → Deployment")
 def sql_quote(val: str) -> str:
     return "'" + val.replace("'", "''") + "'"
 
-brands_df = q(f"SELECT DISTINCT brand FROM {SCHEMA_TABLE} ORDER BY 1")
+if rollups.use_rollups():
+    brands_df = rollup("brand", "brand")[["brand"]].sort_values("brand")
+else:
+    brands_df = q(f"SELECT DISTINCT brand FROM {SCHEMA_TABLE} ORDER BY 1", "brands")
 brands = brands_df["brand"].dropna().tolist() if not brands_df.empty else []
-c1, c2, c3 = st.columns([1, 2, 2])
-min_disc = c1.slider("Min discount %", 0, 90, 0)
-min_rating = c2.slider("Min rating", 0.0, 5.0, 0.0, 0.1)
-
-where_clauses = ["1=1"]
-brand_csv = ",".join(sql_quote(b) for b in [])
-where_clauses.append(f"brand IN ({brand_csv})")
-where_clauses.append(f"discount_percent >= {int(min_disc)}")
-where_clauses.append(f"rating >= {min_rating}")
+with st.sidebar:
+    st.header("Filters")
+    sel_brands = st.multiselect("Brands", options=brands)
+    min_disc = st.slider("Min discount %", 0, 90, 0)
+    min_rating = st.slider("Min rating", 0.0, 5.0, 0.0, 0.1)
+
+# Same predicate builder as the insight packs; unset sliders add no clause.
+dash_filters = {
+    "brands": sel_brands,
+    "min_discount": int(min_disc) if min_disc > 0 else None,
+    "min_rating": float(min_rating) if min_rating > 0 else None,
+}
+WHERE = build_where(dash_filters, include_rating=True)
+
+def fq(sql: str, name: str) -> pd.DataFrame:
+    """Run a dashboard query with {where} bound to the current filters (q() caches per query + filter)."""
+    return q(sql.replace("{where}", WHERE), name)
+
+# Unfiltered aggregates come from the ingest-time rollups when they exist.
+use_rollups = WHERE == "1=1" and rollups.use_rollups()
 
 # ---------- KPIs ----------
-kpis_df = q(f"""
+if use_rollups:
+    kpis_df = rollups.core_kpis()
+else:
+    kpis_df = fq(f"""
     SELECT
       COUNT(*) AS products,
       ROUND(AVG(price),2) AS avg_price,
@@ -92,7 +122,8 @@ kpis_df = q(f"""
       ROUND(AVG(discount_percent),2) AS avg_discount_pct,
       SUM(CASE WHEN price = mrp THEN 1 ELSE 0 END) AS no_discount_items
     FROM {SCHEMA_TABLE}
-""")
+    WHERE {{where}}
+    """, "kpis")
 kpis = kpis_df.iloc[0] if not kpis_df.empty else pd.Series(
     {"products": 0, "avg_price": 0, "avg_mrp": 0,
      "avg_discount_pct": 0, "no_discount_items": 0}
@@ -111,150 +142,259 @@ with k4.container(border=True):
 with k5.container(border=True):
     st.metric("No-discount Items", int(kpis["no_discount_items"]))
 
-# ---------- Top discounted & rated ----------
-top_discounted = q(f"""
-    SELECT product_id, title, brand, price, mrp, discount_percent, rating, rating_total
-    FROM {SCHEMA_TABLE}
-    ORDER BY discount_percent DESC, price ASC
-    LIMIT 50
-""")
-top_rated = q(f"""
-    SELECT product_id, title, brand, rating, rating_total, price, mrp, discount_percent
-    FROM {SCHEMA_TABLE}
-    WHERE rating_total >= 100 AND rating >= 4
-    ORDER BY rating DESC, rating_total DESC
-    LIMIT 50
-""")
-
-col1, col2 = st.columns(2)
-with col1:
-    st.subheader("Top discounted (50)")
-    st.dataframe(top_discounted, use_container_width=True, hide_index=True)
-with col2:
-    st.subheader("Top rated by volume (50)")
-    st.dataframe(top_rated, use_container_width=True, hide_index=True)
+# ---------- Bounded chart payloads ----------
+OTHERS = "(others)"
+SCATTER_MAX_POINTS = 5000
 
-st.caption("Powered by MCP (SELECT-only). No writes, no schema changes from the app.")
+def brand_metrics_page(page: int, per_page: int):
+    """
+    Brands ranked by item count: one page of them plus a single OTHERS row
+    folding every other brand, so the payload is per_page + 1 rows however
+    many brands exist. Returns (rows, number of brands).
+    """
+    lo, hi = page * per_page + 1, (page + 1) * per_page
+    if use_rollups:
+        r = rollups.load("brand")
+        r = r[r["grp"].notna()].sort_values(["items", "grp"], ascending=[False, True], kind="stable")
+        r["rk"] = range(1, len(r) + 1)
+        r["brand"] = r["grp"].where(r["rk"].between(lo, hi), OTHERS)
+        g = r.groupby("brand", sort=False).sum(numeric_only=True)
+        g = g.loc[[b for b in g.index if b != OTHERS] + [b for b in g.index if b == OTHERS]]
+        df = pd.DataFrame({
+            "brand": g.index,
+            "items": g["items"].astype(int),
+            "avg_price": g["sum_price"] / g["n_price"].where(g["n_price"] > 0),
+            "avg_discount_percent": g["sum_disc"] / g["n_disc"].where(g["n_disc"] > 0),
+        })
+        return df.reset_index(drop=True), len(r)
+
+    df = fq(f"""
+    SELECT CASE WHEN rk BETWEEN {lo} AND {hi} THEN brand ELSE '{OTHERS}' END AS brand,
+           SUM(items) AS items,
+           SUM(sum_price) / SUM(items) AS avg_price,
+           SUM(sum_disc) / SUM(items) AS avg_discount_percent,
+           MIN(CASE WHEN rk BETWEEN {lo} AND {hi} THEN rk ELSE {hi + 1} END) AS rk,
+           MAX(n_brands) AS n_brands
+    FROM (
+      SELECT brand, items, sum_price, sum_disc,
+             ROW_NUMBER() OVER (ORDER BY items DESC, brand) AS rk,
+             COUNT(*) OVER () AS n_brands
+      FROM (
+        SELECT brand, COUNT(*) AS items, SUM(price) AS sum_price, SUM(discount_percent) AS sum_disc
+        FROM {SCHEMA_TABLE}
+        WHERE brand IS NOT NULL
+          AND price IS NOT NULL
+          AND discount_percent IS NOT NULL
+          AND {{where}}
+        GROUP BY brand
+      ) b
+    ) r
+    GROUP BY 1
+    ORDER BY rk
+    """, "brand_metrics_page")
+    if df.empty:
+        return df, 0
+    return df.drop(columns=["rk", "n_brands"]), int(df["n_brands"].max())
 
-# ---------- Top Brands ----------
-st.subheader("Top Brands (5)")
-t_brands = q(f"""
-    SELECT brand,
-           COUNT(*) AS product_count,
-           AVG(mrp) AS mrp
-    FROM {SCHEMA_TABLE}
-    GROUP BY brand
-    ORDER BY product_count DESC
-    LIMIT 5;
-""")
-if not t_brands.empty:
-    t_brands = t_brands.sort_values(by='product_count', ascending=False)
-    fig = go.Figure(data=[
-        go.Bar(name='Product Count', x=t_brands['brand'], y=t_brands['product_count'], marker_color='#2ca02c'), # green
-        go.Bar(name='Avg. MRP', x=t_brands['brand'], y=t_brands['mrp'], marker_color='#d62728') # red
-    ])
-    fig.update_layout(barmode='group', xaxis_title='Brand', yaxis_title='Value', legend_title='Metric', height=500)
-    st.plotly_chart(fig, use_container_width=True)
-else:
-    st.info("No data for top brands with the current filters.")
-st.subheader("Brand: Avg Price vs Avg Discount")
-
-brand_metrics_df = q(f"""
-    SELECT 
-        brand, 
-        AVG(price) AS avg_price, 
-        AVG(discount_percent) AS avg_discount_percent
-    FROM {SCHEMA_TABLE}
-    WHERE brand IS NOT NULL 
-      AND price IS NOT NULL 
-      AND discount_percent IS NOT NULL
-    GROUP BY brand
-""")
-
-if not brand_metrics_df.empty:
-    fig = px.bar(
-        brand_metrics_df,
-        x="brand",
-        y=["avg_price", "avg_discount_percent"],
-        barmode="group",
-        title="Average Price vs Discount % by Brand",
-        labels={"value": "Value", "brand": "Brand", "variable": "Metric"},
-        color_discrete_sequence=px.colors.qualitative.Set2  # nice distinct colors
-    )
-    fig.update_layout(
-        xaxis_tickangle=-45,
-        height=500,
-        legend_title="Metric"
-    )
-    st.plotly_chart(fig, use_container_width=True)
-else:
-    st.info("No brand metrics available.")
+@st.cache_data(ttl=300)
+def price_mrp_sample(n: int, where: str, stratify: bool) -> pd.DataFrame:
+    """Deterministic sample (sampling.py): ingest-time reservoir when unfiltered, else hash-ranked SQL."""
+    return sampling.sample(n, where=where, stratify=stratify, non_null=("price", "mrp"),
+                           columns=["product_id", "brand", "price", "mrp", "discount_percent"])
+
+# ---------- Lazy sections ----------
+# Only the selected section runs its queries. Each one is a fragment, so its
+# own widgets rerun just that section instead of the whole page.
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda f: f)
+
+@fragment
+def top_lists_section():
+    top_discounted = fq(f"""
+        SELECT product_id, title, brand, price, mrp, discount_percent, rating, rating_total
+        FROM {SCHEMA_TABLE}
+        WHERE {{where}}
+        ORDER BY discount_percent DESC, price ASC
+        LIMIT 50
+    """, "top_discounted")
+    top_rated = fq(f"""
+        SELECT product_id, title, brand, rating, rating_total, price, mrp, discount_percent
+        FROM {SCHEMA_TABLE}
+        WHERE rating_total >= 100 AND rating >= 4 AND {{where}}
+        ORDER BY rating DESC, rating_total DESC
+        LIMIT 50
+    """, "top_rated")
 
-# ---------- Discount bands ----------
-bands = q(f"""
-    SELECT band, COUNT(*) AS items
-    FROM (
-      SELECT CASE
-        WHEN discount_percent = 0 THEN '0%'
-        WHEN discount_percent < 20 THEN '0-20%'
-        WHEN discount_percent < 40 THEN '20-40%'
-        WHEN discount_percent < 60 THEN '40-60%'
-        ELSE '60%+'
-      END AS band
-      FROM {SCHEMA_TABLE}
-    ) b
-    GROUP BY band
-    ORDER BY items DESC
-""")
-
-st.subheader("Discount bands")
-if not bands.empty:
-    fig = px.bar(
-        bands, x="items", y="band", orientation="h",
-        title="Items per Discount Band",
-        color="band", color_discrete_sequence=px.colors.qualitative.Set2
-    )
-    st.plotly_chart(fig, use_container_width=True)
-else:
-    st.info("No data for discount bands with the current filters.")
-
-# ---------- Price bucket distribution ----------
-price_buckets = q(f"""
-    SELECT CASE
-      WHEN price < 500 THEN '<500'
-      WHEN price < 1000 THEN '500-999'
-      WHEN price < 2000 THEN '1000-1999'
-      WHEN price < 5000 THEN '2000-4999'
-      ELSE '5000+'
-    END AS price_bucket,
-    COUNT(*) AS items,
-    ROUND(AVG(discount_percent),2) AS avg_discount_pct
-    FROM {SCHEMA_TABLE}
-    GROUP BY price_bucket
-    ORDER BY items DESC
-""")
-
-c4, c5 = st.columns(2)
-with c4:
-    st.subheader("Price buckets")
-    if not price_buckets.empty:
-        fig1 = px.bar(
-            price_buckets, x="price_bucket", y="items",
-            color="price_bucket", color_discrete_sequence=px.colors.qualitative.Pastel
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Top discounted (50)")
+        st.dataframe(top_discounted, use_container_width=True, hide_index=True)
+    with col2:
+        st.subheader("Top rated by volume (50)")
+        st.dataframe(top_rated, use_container_width=True, hide_index=True)
+
+@fragment
+def brands_section():
+    st.subheader("Top Brands (5)")
+    if use_rollups:
+        t_brands = (rollup("brand", "brand").head(5)
+                    .rename(columns={"items": "product_count", "avg_mrp": "mrp"})[["brand", "product_count", "mrp"]])
+    else:
+        t_brands = fq(f"""
+        SELECT brand,
+               COUNT(*) AS product_count,
+               AVG(mrp) AS mrp
+        FROM {SCHEMA_TABLE}
+        WHERE {{where}}
+        GROUP BY brand
+        ORDER BY product_count DESC
+        LIMIT 5;
+        """, "top_brands")
+    if not t_brands.empty:
+        t_brands = t_brands.sort_values(by='product_count', ascending=False)
+        fig = go.Figure(data=[
+            go.Bar(name='Product Count', x=t_brands['brand'], y=t_brands['product_count'], marker_color='#2ca02c'), # green
+            go.Bar(name='Avg. MRP', x=t_brands['brand'], y=t_brands['mrp'], marker_color='#d62728') # red
+        ])
+        fig.update_layout(barmode='group', xaxis_title='Brand', yaxis_title='Value', legend_title='Metric', height=500)
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No data for top brands with the current filters.")
+    st.subheader("Brand: Avg Price vs Avg Discount")
+    p1, p2 = st.columns([1, 3])
+    per_page = p1.selectbox("Brands per page", [10, 20, 50], index=1)
+    page = int(st.session_state.get("brand_page", 1))
+    brand_metrics_df, n_brands = brand_metrics_page(page - 1, per_page)
+    pages = max(1, -(-n_brands // per_page))
+    if page > pages:  # fewer brands after a filter / page-size change
+        page = st.session_state["brand_page"] = pages
+        brand_metrics_df, n_brands = brand_metrics_page(page - 1, per_page)
+    p2.number_input(f"Page (of {pages}, {n_brands:,} brands)", 1, pages, key="brand_page")
+
+    if not brand_metrics_df.empty:
+        fig = px.bar(
+            brand_metrics_df,
+            x="brand",
+            y=["avg_price", "avg_discount_percent"],
+            barmode="group",
+            title="Average Price vs Discount % by Brand",
+            labels={"value": "Value", "brand": "Brand", "variable": "Metric"},
+            color_discrete_sequence=px.colors.qualitative.Set2  # nice distinct colors
+        )
+        fig.update_layout(
+            xaxis_tickangle=-45,
+            height=500,
+            legend_title="Metric"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(brand_metrics_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("No brand metrics available.")
+
+@fragment
+def distribution_section():
+    # ---------- Discount bands ----------
+    if use_rollups:
+        bands = rollup("discount_band", "band")[["band", "items"]]
+    else:
+        bands = fq(f"""
+        SELECT band, COUNT(*) AS items
+        FROM (
+          SELECT CASE
+            WHEN discount_percent = 0 THEN '0%'
+            WHEN discount_percent < 20 THEN '0-20%'
+            WHEN discount_percent < 40 THEN '20-40%'
+            WHEN discount_percent < 60 THEN '40-60%'
+            ELSE '60%+'
+          END AS band
+          FROM {SCHEMA_TABLE}
+          WHERE {{where}}
+        ) b
+        GROUP BY band
+        ORDER BY items DESC
+        """, "discount_bands")
+
+    st.subheader("Discount bands")
+    if not bands.empty:
+        fig = px.bar(
+            bands, x="items", y="band", orientation="h",
+            title="Items per Discount Band",
+            color="band", color_discrete_sequence=px.colors.qualitative.Set2
         )
-        st.plotly_chart(fig1, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True)
     else:
-        st.info("No data for price buckets with the current filters.")
-with c5:
-    st.subheader("Avg discount by price bucket")
-    if not price_buckets.empty:
-        fig2 = px.bar(
-            price_buckets, x="price_bucket", y="avg_discount_pct",
-            color="price_bucket", color_discrete_sequence=px.colors.qualitative.Bold
+        st.info("No data for discount bands with the current filters.")
+
+    # ---------- Price bucket distribution ----------
+    if use_rollups:
+        price_buckets = rollup("price_bucket", "price_bucket")[["price_bucket", "items", "avg_discount_pct"]]
+    else:
+        price_buckets = fq(f"""
+        SELECT CASE
+          WHEN price < 500 THEN '<500'
+          WHEN price < 1000 THEN '500-999'
+          WHEN price < 2000 THEN '1000-1999'
+          WHEN price < 5000 THEN '2000-4999'
+          ELSE '5000+'
+        END AS price_bucket,
+        COUNT(*) AS items,
+        ROUND(AVG(discount_percent),2) AS avg_discount_pct
+        FROM {SCHEMA_TABLE}
+        WHERE {{where}}
+        GROUP BY price_bucket
+        ORDER BY items DESC
+        """, "price_buckets")
+
+    c4, c5 = st.columns(2)
+    with c4:
+        st.subheader("Price buckets")
+        if not price_buckets.empty:
+            fig1 = px.bar(
+                price_buckets, x="price_bucket", y="items",
+                color="price_bucket", color_discrete_sequence=px.colors.qualitative.Pastel
+            )
+            st.plotly_chart(fig1, use_container_width=True)
+        else:
+            st.info("No data for price buckets with the current filters.")
+    with c5:
+        st.subheader("Avg discount by price bucket")
+        if not price_buckets.empty:
+            fig2 = px.bar(
+                price_buckets, x="price_bucket", y="avg_discount_pct",
+                color="price_bucket", color_discrete_sequence=px.colors.qualitative.Bold
+            )
+            st.plotly_chart(fig2, use_container_width=True)
+        else:
+            st.info("No data for avg discount by bucket with the current filters.")
+
+    # ---------- Price vs MRP (downsampled) ----------
+    st.subheader("Price vs MRP (sample)")
+    s1, s2 = st.columns([3, 1])
+    max_points = s1.slider("Max points", 200, SCATTER_MAX_POINTS, 1000, step=200)
+    # Off by default: spreading across brands ranks every matching row per
+    # brand (a full sort) unless the ingest-time reservoirs can answer.
+    stratify = s2.checkbox("Spread across brands", value=False)
+    sample = price_mrp_sample(int(max_points), WHERE, stratify)
+    if not sample.empty:
+        fig3 = px.scatter(
+            sample, x="mrp", y="price", color="discount_percent",
+            hover_data=["product_id", "brand"], render_mode="webgl",
+            color_continuous_scale="Viridis"
         )
-        st.plotly_chart(fig2, use_container_width=True)
+        st.plotly_chart(fig3, use_container_width=True)
     else:
-        st.info("No data for avg discount by bucket with the current filters.")
+        st.info("No data for price vs MRP with the current filters.")
+
+SECTIONS = {
+    "Top products": top_lists_section,
+    "Brands": brands_section,
+    "Discounts & prices": distribution_section,
+}
+section = st.radio("Section", ["None", *SECTIONS], horizontal=True, label_visibility="collapsed",
+                   format_func=lambda s: "Hide details" if s == "None" else s)
+if section in SECTIONS:
+    SECTIONS[section]()
+
+st.caption("Powered by MCP (SELECT-only). No writes, no schema changes from the app.")
 
 # =====================================================================
 # Multi-pack insights viewer
@@ -265,53 +405,57 @@ PACKS_DIR.mkdir(parents=True, exist_ok=True)
 st.divider()
 st.subheader("Insights Packs")
 
-from gen_insights_force import main as run_insights
+from gen_insights_force import generate_pack
 st.title("Dynamic Insight Packs")
 
-with st.form("filters_form"):
-    st.subheader("Filter products")
-    all_brands = brands_df["brand"].dropna().unique().tolist() if not brands_df.empty else []
-    col1, col2 = st.columns(2)
-    with col1:
-        brands_inc = st.multiselect("Include Brands", options=all_brands)
-        exclude_brands = st.multiselect("Exclude Brands", options=all_brands)
-        title_ilike = st.text_input("Title contains (ILIKE)", "")
-        top_limit = st.number_input("Top Rated Limit", 1, 100, 10)
-    with col2:
-        min_discount = st.slider("Min Discount %", 0, 100, 0)
-        max_discount = st.slider("Max Discount %", 0, 100, 100)
-        price_range = st.slider("Price Between", 0.0, 5000.0, (0.0, 5000.0))
-        mrp_range = st.slider("MRP Between", 0.0, 5000.0, (0.0, 5000.0))
-        
-    
-    submitted = st.form_submit_button("Run Insights")
-
-if submitted:
-    filters = {
-        "brands": brands_inc,
-        "exclude_brands": exclude_brands,
-        "title_ilike": title_ilike.strip() or None,
-        "min_discount": min_discount,
-        "max_discount": max_discount,
-        "price_between": list(price_range),
-        "mrp_between": list(mrp_range),
-        "top_limit": top_limit
-    }
-    filters = {k: v for k, v in filters.items() if v not in [None, [], ""]}
-    try:
-        sys.argv = ["gen_insights_force.py", "--filters-json", json.dumps(filters)]
-        pack = run_insights()
-    except Exception as e:
-        st.error(f"Failed to generate insights: {e}")
-        st.stop()
-    st.success("Pack generated successfully!")
-    st.markdown("### Summary Bullets")
-    for b in pack.get("bullets", []):
-        st.write(f"• {b}")
-    st.markdown("### Tables")
-    tables = pack.get("tables", {})
-    cols = st.columns(max(1, min(3, len(tables))))
-    for i, (name, rows) in enumerate(tables.items()):
-        with cols[i % len(cols)]:
-            st.markdown(f"**{name.replace('_', ' ').title()}**")
-            st.dataframe(pd.DataFrame(rows), use_container_width=True)
+# A fragment: submitting the form reruns only the pack, not the dashboard queries above.
+@fragment
+def insight_packs_section():
+    with st.form("filters_form"):
+        st.subheader("Filter products")
+        all_brands = brands_df["brand"].dropna().unique().tolist() if not brands_df.empty else []
+        col1, col2 = st.columns(2)
+        with col1:
+            brands_inc = st.multiselect("Include Brands", options=all_brands)
+            exclude_brands = st.multiselect("Exclude Brands", options=all_brands)
+            title_ilike = st.text_input("Title contains (ILIKE)", "")
+            top_limit = st.number_input("Top Rated Limit", 1, 100, 10)
+        with col2:
+            min_discount = st.slider("Min Discount %", 0, 100, 0)
+            max_discount = st.slider("Max Discount %", 0, 100, 100)
+            price_range = st.slider("Price Between", 0.0, 5000.0, (0.0, 5000.0))
+            mrp_range = st.slider("MRP Between", 0.0, 5000.0, (0.0, 5000.0))
+
+
+        submitted = st.form_submit_button("Run Insights")
+
+    if submitted:
+        filters = {
+            "brands": brands_inc,
+            "exclude_brands": exclude_brands,
+            "title_ilike": title_ilike.strip() or None,
+            "min_discount": min_discount,
+            "max_discount": max_discount,
+            "price_between": list(price_range),
+            "mrp_between": list(mrp_range),
+            "top_limit": top_limit
+        }
+        filters = {k: v for k, v in filters.items() if v not in [None, [], ""]}
+        try:
+            pack = generate_pack(filters)
+        except Exception as e:
+            st.error(f"Failed to generate insights: {e}")
+            return
+        st.success("Pack generated successfully!")
+        st.markdown("### Summary Bullets")
+        for b in pack.get("bullets", []):
+            st.write(f"• {b}")
+        st.markdown("### Tables")
+        tables = pack.get("tables", {})
+        cols = st.columns(max(1, min(3, len(tables))))
+        for i, (name, rows) in enumerate(tables.items()):
+            with cols[i % len(cols)]:
+                st.markdown(f"**{name.replace('_', ' ').title()}**")
+                st.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+insight_packs_section()
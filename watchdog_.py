@@ -1,33 +1,217 @@
-import time
+import argparse
+import configparser
+import heapq
+import itertools
+import os
 import subprocess
+import sys
+import threading
+import time
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+CONFIG_FILE_PATH = os.path.join(CURRENT_DIR, "config", "config.ini")
+config = configparser.ConfigParser()
+config.read(CONFIG_FILE_PATH, encoding="utf-8")
+
+# A file is queued once its size and mtime have not changed for SETTLE_SECS
+# (still being copied otherwise). At most QUEUE_SIZE files wait for one of the
+# WORKERS; the rest stay pending until there is room. Smaller files go first.
+WATCH_FOLDER = config.get("watcher", "FOLDER", fallback="./csv_folder")
+WORKERS = config.getint("watcher", "WORKERS", fallback=2)
+QUEUE_SIZE = config.getint("watcher", "QUEUE_SIZE", fallback=100)
+SETTLE_SECS = config.getfloat("watcher", "SETTLE_SECS", fallback=2.0)
+POLL_SECS = config.getfloat("watcher", "POLL_SECS", fallback=0.5)
+# Run jobs in this process on one warm Dask cluster (pipeline.py) instead of
+# a langchain_orch.py subprocess per file. Either way the steps run as
+# langchain_orch's direct DAG (no LLM agents) unless MODE = agent.
+IN_PROCESS = config.getboolean("watcher", "IN_PROCESS", fallback=True)
+MODE = config.get("watcher", "MODE", fallback="direct")
+DEPLOY = config.getboolean("watcher", "DEPLOY", fallback=True)
+
+
+def run_pipeline(file_path: str):
+    """Subprocess job: langchain_orch.py in a child interpreter."""
+    cmd = [sys.executable, os.path.join(CURRENT_DIR, "langchain_orch.py"), file_path, "--mode", MODE]
+    if MODE == "direct" and not DEPLOY:
+        cmd.append("--no-deploy")
+    subprocess.run(cmd, check=True, cwd=CURRENT_DIR)
+
+
+def run_in_process(file_path: str):
+    """In-process job: langchain_orch's direct DAG on the shared pipeline; raises if a step failed."""
+    import langchain_orch
+    res = langchain_orch.direct_workflow(file_path, deploy=DEPLOY)
+    if not res["ok"]:
+        raise RuntimeError(f"steps completed: {', '.join(res['results']) or 'none'}")
+
+
+class IngestScheduler:
+    """
+    Runs `job(path)` for each settled CSV on a pool of worker threads.
+
+    - notify() only records the event, so the observer thread never blocks
+    - per-file dedupe: a path is queued or running at most once, and the same
+      (size, mtime) is never processed twice; a file changed while its job
+      runs is picked up again afterwards
+    - debounce: a path waits until unchanged for `settle_secs`
+    - bounded priority queue, smallest file first
+    - a failed job is logged and never stops the scheduler
+    """
+
+    def __init__(self, job=run_pipeline, workers: int = WORKERS, queue_size: int = QUEUE_SIZE,
+                 settle_secs: float = SETTLE_SECS, poll_secs: float = POLL_SECS):
+        self.job = job
+        self.n_workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.settle_secs = settle_secs
+        self.poll_secs = poll_secs
+        self._pending = {}  # path -> (signature, last change)
+        self._queue = []  # heap of (size, seq, path, signature)
+        self._active = set()  # queued or running
+        self._done = {}  # path -> signature of the last finished job
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self.stats = {"queued": 0, "succeeded": 0, "failed": 0, "skipped": 0}
+
+    # ---------- observer side ----------
+    def notify(self, path: str):
+        with self._cond:
+            self._pending[os.path.realpath(path)] = (None, time.monotonic())
+
+    # ---------- scheduling ----------
+    @staticmethod
+    def _signature(path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _settle(self):
+        """Move settled pending files into the queue while there is room."""
+        now = time.monotonic()
+        with self._cond:
+            for path, (seen, changed_at) in list(self._pending.items()):
+                sig = self._signature(path)
+                if sig is None:  # deleted or renamed before it settled
+                    del self._pending[path]
+                    continue
+                if sig != seen:
+                    self._pending[path] = (sig, now)
+                    continue
+                if now - changed_at < self.settle_secs or path in self._active:
+                    continue
+                if self._done.get(path) == sig:
+                    del self._pending[path]
+                    self.stats["skipped"] += 1
+                    continue
+                if len(self._queue) >= self.queue_size:
+                    break
+                del self._pending[path]
+                heapq.heappush(self._queue, (sig[0], next(self._seq), path, sig))
+                self._active.add(path)
+                self.stats["queued"] += 1
+                print(f"📥 Queued {path} ({sig[0] / 1e6:.1f} MB, {len(self._queue)} waiting)")
+                self._cond.notify()
+
+    def _settler(self):
+        while not self._stop.wait(self.poll_secs):
+            self._settle()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                _, _, path, sig = heapq.heappop(self._queue)
+            t0 = time.monotonic()
+            print(f"⚙️ [{threading.current_thread().name}] Processing {path}")
+            try:
+                self.job(path)
+                ok = True
+                print(f"✅ Finished {path} in {time.monotonic() - t0:.1f}s")
+            except Exception as e:
+                ok = False
+                print(f"❌ Job failed for {path} after {time.monotonic() - t0:.1f}s: {e}")
+            with self._cond:
+                self._active.discard(path)
+                self._done[path] = sig
+                self.stats["succeeded" if ok else "failed"] += 1
+
+    # ---------- lifecycle ----------
+    def start(self):
+        self._threads = [threading.Thread(target=self._settler, name="csv-settler", daemon=True)]
+        self._threads += [threading.Thread(target=self._worker, name=f"ingest-{i}", daemon=True)
+                          for i in range(self.n_workers)]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self, wait: bool = True):
+        """Stop taking new jobs; running jobs finish, queued ones are dropped."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+
 class CSVHandler(FileSystemEventHandler):
-    def __init__(self, folder_to_watch):
+    def __init__(self, folder_to_watch, scheduler: IngestScheduler):
         self.folder_to_watch = folder_to_watch
+        self.scheduler = scheduler
+
+    def _consider(self, path):
+        if path.endswith('.csv'):
+            self.scheduler.notify(path)
 
     def on_created(self, event):
         if not event.is_directory and event.src_path.endswith('.csv'):
-            file_path = event.src_path
-            print(f"📂 CSV file created: {file_path}")
-            # Pass the file path as an argument to orchestrator.py
-            subprocess.run(['python', 'langchain_orch.py', file_path], check=True)
+            print(f"📂 CSV file created: {event.src_path}")
+            self.scheduler.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._consider(event.src_path)
+
+    def on_moved(self, event):
+        # Writers that copy to a temp name and rename into place.
+        if not event.is_directory:
+            self._consider(event.dest_path)
+
 
 if __name__ == "__main__":
-    folder_to_watch = './csv_folder'  # Change to your folder path
+    parser = argparse.ArgumentParser(description="Watch a folder and run the pipeline on new CSV files")
+    parser.add_argument("folder", nargs="?", default=WATCH_FOLDER, help="Folder to watch")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Files processed concurrently")
+    parser.add_argument("--subprocess", action="store_true",
+                        help="Run langchain_orch.py in a child process per file instead of in-process")
+    args = parser.parse_args()
+    folder_to_watch = args.folder
 
-    event_handler = CSVHandler(folder_to_watch)
+    in_process = IN_PROCESS and MODE == "direct" and not args.subprocess
+    job = run_in_process if in_process else run_pipeline
+    scheduler = IngestScheduler(job=job, workers=args.workers).start()
+    event_handler = CSVHandler(folder_to_watch, scheduler)
     observer = Observer()
     observer.schedule(event_handler, folder_to_watch, recursive=False)
 
     observer.start()
-    print(f"👀 Watching folder: {folder_to_watch} for new or modified CSV files...")
+    print(f"👀 Watching folder: {folder_to_watch} for new or modified CSV files "
+          f"({scheduler.n_workers} workers)...")
 
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
+        scheduler.stop()
 
     observer.join()